@@ -0,0 +1,294 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from rutas import ARCHIVO_DATOS, RAIZ_AGREGADOS, RAIZ_ARCHIVO
+from almacen_columnar import leer_dataset, meses_disponibles
+from esquema import ESQUEMA, aplicar_esquema, dtypes_csv
+from catalogo import a_claves, a_etiquetas, claves
+from iso4406 import COLUMNAS_ISO
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
+from secuencias import bloqueo_archivo
+
+# Agregados diarios y semanales de las muestras (tablas de resumen).
+#
+#   data/agregados/diario/2025-04.parquet    (un registro por día y combinación de claves)
+#   data/agregados/semanal/2025-04.parquet   (por semana terminada en domingo; el mes es el del domingo)
+#   data/agregados/estado.json               (hasta qué byte del CSV está resumido)
+#
+# Por cada combinación de Equipo, Componente, nflota y Criticidad (las claves
+# del catálogo, así se pueden aplicar los mismos filtros que el sidebar) se
+# guarda, para cada analito: cantidad de valores, suma, mínimo, máximo y suma
+# de cuadrados. Con eso se obtienen promedio y desviación de cualquier grupo
+# de días sin volver a las muestras.
+#
+# sincronizar() mantiene las tablas igual que la base SQLite: resume solo la
+# cola nueva del CSV y la combina con los meses que toca (normalmente solo el
+# último). Las muestras que el archivado saca del CSV siguen contadas: cuando
+# hay que rehacer todo se resume también data/archivo. La semana se vuelve a
+# armar desde los días, así que las dos tablas siempre coinciden. Mientras
+# escribe deja el estado marcado como incompleto: si el proceso se corta a
+# mitad, la próxima vez se vuelve a resumir todo en vez de sumar dos veces la
+# misma cola.
+
+CLAVES = ["Equipo", "Componente", "nflota", "Criticidad"]
+
+# Analitos: columnas numéricas del esquema, salvo el número de registro y los
+# códigos ISO 4406 (que se derivan de los conteos de partículas)
+ANALITOS = [c for c, tipo in ESQUEMA.items()
+            if tipo.startswith(("int", "float")) and c != "Numero Registro" and c not in COLUMNAS_ISO]
+
+# Cómo se combinan dos resúmenes de una misma estadística y con qué tipo se guarda
+ESTADISTICAS = {"conteo": ("sum", pa.int32()), "suma": ("sum", pa.float64()), "min": ("min", pa.float32()),
+                "max": ("max", pa.float32()), "suma2": ("sum", pa.float64())}
+
+NIVELES = ["diario", "semanal"]
+
+def _columna(analito, estadistica):
+    return f"{analito}|{estadistica}"
+
+def _archivo_estado(raiz):
+    return os.path.join(raiz, "estado.json")
+
+def _archivo_mes(raiz, nivel, mes):
+    return os.path.join(raiz, nivel, f"{mes}.parquet")
+
+# Función para listar los meses presentes en un nivel
+def _meses(raiz, nivel):
+    carpeta = os.path.join(raiz, nivel)
+    if not os.path.isdir(carpeta):
+        return []
+    return sorted(a[:-len(".parquet")] for a in os.listdir(carpeta) if a.endswith(".parquet") and not a.startswith("."))
+
+# Función para llevar cada día al domingo que cierra su semana (igual que pd.Grouper(freq="W"))
+def fin_semana(dias):
+    return dias + pd.to_timedelta((6 - dias.dt.weekday) % 7, unit="D")
+
+# Función para agrupar una tabla Arrow por día (o semana) y claves.
+#   agregaciones: [(columna de origen, función, columna de salida, tipo)]
+# Se agrupa con Arrow y no con pandas: son ~190 columnas y pandas opera de a una.
+def _agrupar(tabla, agregaciones):
+    sin_nulos = pc.ScalarAggregateOptions(min_count=0)  # Suma de un grupo sin valores = 0
+    pedidas = [(origen, funcion, sin_nulos if funcion == "sum" else None) for origen, funcion, _, _ in agregaciones]
+    resultado = tabla.group_by(["Periodo"] + CLAVES, use_threads=False).aggregate(pedidas)
+    columnas = {c: resultado[c] for c in ["Periodo"] + CLAVES}
+    for origen, funcion, salida, tipo in agregaciones:
+        columnas[salida] = resultado[f"{origen}_{funcion}"].cast(tipo)
+    return pa.table(columnas).sort_by([(c, "ascending") for c in ["Periodo"] + CLAVES])
+
+# Función para resumir un lote de muestras por día y claves
+def _resumir(df):
+    df = a_claves(aplicar_esquema(df), registrar=False)
+    columnas = {"Periodo": df["Fecha"].dt.normalize().astype("datetime64[ns]"), **{c: df[c] for c in CLAVES}}
+    agregaciones = [("Periodo", "count", "filas", pa.int32())]
+    for analito in [c for c in ANALITOS if c in df.columns]:
+        valores = df[analito].astype("float64")
+        columnas[analito] = valores
+        columnas[_columna(analito, "cuadrado")] = valores * valores
+        agregaciones += [(analito, "count", _columna(analito, "conteo"), pa.int32()),
+                         (analito, "sum", _columna(analito, "suma"), pa.float64()),
+                         (analito, "min", _columna(analito, "min"), pa.float32()),
+                         (analito, "max", _columna(analito, "max"), pa.float32()),
+                         (_columna(analito, "cuadrado"), "sum", _columna(analito, "suma2"), pa.float64())]
+    return _agrupar(pa.Table.from_pandas(pd.DataFrame(columnas), preserve_index=False), agregaciones)
+
+# Función para combinar resúmenes (de lotes distintos o de días de una misma semana)
+def _combinar(resumenes):
+    tabla = pa.concat_tables(resumenes)
+    agregaciones = [("filas", "sum", "filas", pa.int32())]
+    for c in tabla.column_names:
+        if "|" in c:
+            funcion, tipo = ESTADISTICAS[c.rsplit("|", 1)[1]]
+            agregaciones.append((c, funcion, c, tipo))
+    return _agrupar(tabla, agregaciones)
+
+# Función para pasar un resumen diario a semanas (Periodo = domingo que cierra la semana)
+def _a_semanas(tabla):
+    semanas = fin_semana(tabla["Periodo"].to_pandas())
+    return tabla.set_column(0, "Periodo", pa.array(semanas, type=tabla.schema.field("Periodo").type))
+
+# Mes de cada Periodo, para repartir un resumen en archivos por mes
+def _meses_de(tabla):
+    return tabla["Periodo"].to_pandas().dt.to_period("M")
+
+# Funciones para leer y escribir el estado (byte del CSV, cabecera, huella y si quedó completo)
+def _leer_estado(raiz):
+    try:
+        with open(_archivo_estado(raiz), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _escribir_estado(raiz, estado):
+    temporal = f"{_archivo_estado(raiz)}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, _archivo_estado(raiz))
+
+# Función para escribir el resumen de un mes de forma atómica
+def _escribir_mes(tabla, raiz, nivel, mes):
+    archivo = _archivo_mes(raiz, nivel, mes)
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    temporal = os.path.join(os.path.dirname(archivo), f".{mes}-{os.getpid()}.parquet")
+    pq.write_table(tabla, temporal)
+    os.replace(temporal, archivo)
+
+def _leer_mes(raiz, nivel, mes):
+    archivo = _archivo_mes(raiz, nivel, mes)
+    return pq.read_table(archivo) if os.path.exists(archivo) else None
+
+# Función para incorporar un resumen diario nuevo: combina los días de cada mes
+# tocado y vuelve a armar las semanas que terminan en esos meses
+def _incorporar(nuevo, raiz):
+    meses = _meses_de(nuevo)
+    for mes in sorted(set(meses)):
+        parte = nuevo.filter(pa.array(meses == mes))
+        anterior = _leer_mes(raiz, "diario", mes)
+        _escribir_mes(parte if anterior is None else _combinar([anterior, parte]), raiz, "diario", mes)
+
+    # Una semana que termina en un mes puede empezar en el anterior
+    for mes in sorted(set(fin_semana(nuevo["Periodo"].to_pandas()).dt.to_period("M"))):
+        dias = [d for d in (_leer_mes(raiz, "diario", mes - 1), _leer_mes(raiz, "diario", mes)) if d is not None]
+        semanas = _a_semanas(pa.concat_tables(dias))
+        semanas = semanas.filter(pa.array(_meses_de(semanas) == mes))
+        _escribir_mes(_combinar([semanas]), raiz, "semanal", mes)
+
+# Función para poner los agregados al día con el CSV: resume solo las filas
+# nuevas. Si el CSV se reescribió (cambió la cabecera o la huella), se achicó o
+# una sincronización anterior quedó a medias, se vuelve a resumir entero: el
+# archivo histórico (muestras viejas que ya no están en el CSV) y luego el CSV.
+def sincronizar(archivo_csv=ARCHIVO_DATOS, raiz=RAIZ_AGREGADOS, raiz_archivo=RAIZ_ARCHIVO):
+    cabecera = leer_cabecera(archivo_csv)
+    if cabecera is None:
+        return 0
+    os.makedirs(raiz, exist_ok=True)
+    with bloqueo_archivo(_archivo_estado(raiz)):  # Un solo proceso sincroniza a la vez
+        estado = _leer_estado(raiz)
+        desde = 0
+        if (estado and estado["completo"] and estado["cabecera"] == ",".join(cabecera)
+                and os.path.getsize(archivo_csv) >= estado["bytes_csv"]
+                and huella_csv(archivo_csv, estado["bytes_csv"]) == estado["huella"]):
+            desde = estado["bytes_csv"]
+            if os.path.getsize(archivo_csv) == desde:
+                return 0  # Nada nuevo
+        usadas = [c for c in cabecera if c == "Fecha" or c in CLAVES or c in ANALITOS]
+        resumenes, filas = [], 0
+        if desde == 0:
+            for nivel in NIVELES:
+                shutil.rmtree(os.path.join(raiz, nivel), ignore_errors=True)
+            for mes in meses_disponibles(raiz_archivo):
+                periodo = pd.Period(mes, freq="M")
+                viejas = leer_dataset(usadas, periodo.start_time, periodo.end_time, raiz_archivo, asegurar=False)
+                if len(viejas):
+                    resumenes.append(_resumir(viejas))
+                    filas += len(viejas)
+
+        tipos = dtypes_csv(usadas)
+        for texto, desde in leer_cola_csv(archivo_csv, desde):
+            bloque = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, usecols=usadas, dtype=tipos)
+            resumenes.append(_resumir(bloque))
+            filas += len(bloque)
+
+        estado = {"bytes_csv": desde, "cabecera": ",".join(cabecera), "completo": False}
+        _escribir_estado(raiz, estado)
+        if resumenes:
+            _incorporar(_combinar(resumenes), raiz)
+        _escribir_estado(raiz, {**estado, "huella": huella_csv(archivo_csv, desde), "completo": True})
+        return filas
+
+# Función para tomar como punto de partida un CSV reescrito sin muestras nuevas
+# (el archivado mueve las viejas al archivo histórico, que ya están resumidas):
+# solo se actualizan el byte y la huella, sin volver a resumir nada. Se llama
+# con los agregados al día y con el CSV bloqueado para los escritores.
+def adoptar_csv(archivo_csv=ARCHIVO_DATOS, raiz=RAIZ_AGREGADOS):
+    with bloqueo_archivo(_archivo_estado(raiz)):
+        estado = _leer_estado(raiz)
+        if not estado or not estado["completo"]:
+            return  # La próxima sincronización los rehace desde el archivo y el CSV
+        tamano = os.path.getsize(archivo_csv)
+        _escribir_estado(raiz, {**estado, "bytes_csv": tamano, "huella": huella_csv(archivo_csv, tamano)})
+
+# Función para leer una tabla de agregados con las etiquetas del catálogo.
+#   desde / hasta: rango de fechas sobre el periodo (día, o domingo que cierra la semana);
+#                  los meses fuera del rango ni siquiera se abren
+#   filtros: {dimensión: [etiquetas]}; se traducen a claves y se filtran al leer
+#   analitos: lista de analitos a leer (None = todos)
+def leer_agregados(nivel="semanal", desde=None, hasta=None, filtros=None, analitos=None, raiz=RAIZ_AGREGADOS):
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+    archivos = []
+    for mes in _meses(raiz, nivel):
+        periodo = pd.Period(mes, freq="M")
+        if (desde is None or periodo.end_time >= desde) and (hasta is None or periodo.start_time <= hasta):
+            archivos.append(_archivo_mes(raiz, nivel, mes))
+    if not archivos:
+        return pd.DataFrame(columns=["Periodo", "filas"] + CLAVES)
+
+    dataset = ds.dataset(archivos, format="parquet")
+    filtro = None
+    condiciones = []
+    if desde is not None:
+        condiciones.append(ds.field("Periodo") >= pa.scalar(desde.to_datetime64()))
+    if hasta is not None:
+        condiciones.append(ds.field("Periodo") <= pa.scalar(hasta.to_datetime64()))
+    for dimension, valores in (filtros or {}).items():
+        condiciones.append(ds.field(dimension).isin(claves(dimension, list(valores), registrar=False)))
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+    columnas = None
+    if analitos is not None:
+        columnas = ["Periodo", "filas"] + CLAVES + [_columna(a, e) for a in analitos for e in ESTADISTICAS]
+    return a_etiquetas(dataset.to_table(columns=columnas, filter=filtro).to_pandas())
+
+# Función para obtener promedio, desviación estándar, mínimo y máximo de un
+# analito agrupando los agregados por las columnas pedidas
+def estadisticas(agregados, analito, por):
+    suma = agregados.groupby(por, observed=True, sort=True).agg(
+        conteo=(_columna(analito, "conteo"), "sum"), suma=(_columna(analito, "suma"), "sum"),
+        suma2=(_columna(analito, "suma2"), "sum"), minimo=(_columna(analito, "min"), "min"),
+        maximo=(_columna(analito, "max"), "max"))
+    n = suma["conteo"].where(suma["conteo"] > 0)
+    promedio = suma["suma"] / n
+    varianza = (suma["suma2"] - suma["suma"] * promedio) / (n - 1)
+    return pd.DataFrame({"conteo": suma["conteo"], "promedio": promedio,
+                         "desviacion": np.sqrt(varianza.clip(lower=0)),
+                         "minimo": suma["minimo"], "maximo": suma["maximo"]}).reset_index()
+
+# Función para armar la tendencia semanal de un analito (promedio por semana y
+# por "por"), con las mismas semanas que pd.Grouper(key="Fecha", freq="W").
+# Con un "desde" se parte de la tabla diaria, así la primera semana incluye
+# solo los días del periodo, igual que si se agruparan las muestras.
+def tendencia_semanal(analito, por="Componente", desde=None, filtros=None, raiz=RAIZ_AGREGADOS):
+    if desde is None:
+        agregados = leer_agregados("semanal", filtros=filtros, analitos=[analito], raiz=raiz)
+    else:
+        agregados = leer_agregados("diario", desde=pd.Timestamp(desde).normalize(), filtros=filtros,
+                                   analitos=[analito], raiz=raiz)
+    if agregados.empty:
+        return pd.DataFrame(columns=["Fecha", por, analito])
+    if desde is not None:
+        agregados = agregados.assign(Periodo=fin_semana(agregados["Periodo"]))
+    resumen = estadisticas(agregados, analito, ["Periodo", por])
+    resumen = resumen[resumen["conteo"] > 0]
+    return resumen.rename(columns={"Periodo": "Fecha", "promedio": analito})[["Fecha", por, analito, "conteo", "desviacion"]]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actualiza los agregados diarios y semanales desde el CSV de muestras")
+    parser.add_argument("--archivo-csv", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz", default=RAIZ_AGREGADOS)
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    filas = sincronizar(args.archivo_csv, args.raiz)
+    segundos = time.perf_counter() - inicio
+    tamanos = {n: len(leer_agregados(n, analitos=[], raiz=args.raiz)) for n in NIVELES}
+    print(f"{filas:,} muestras nuevas resumidas en {segundos:.2f} s; filas por tabla: {tamanos}")
@@ -0,0 +1,330 @@
+import os
+import glob
+import io
+import json
+import shutil
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from rutas import ARCHIVO_DATOS, RAIZ_ALMACEN
+from esquema import DIMENSIONES, aplicar_esquema, dtypes_csv, esquema_arrow
+from catalogo import DIMENSIONES_CATALOGO, a_claves, a_etiquetas, claves
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
+from secuencias import bloqueo_archivo
+
+# Almacén columnar particionado por mes (Parquet) para las muestras.
+#
+#   data/dataset/2025-04/parte-<...>.parquet   (lotes recién agregados)
+#   data/dataset/2025-04/datos.parquet         (mes ya compactado)
+#
+# Cada lote nuevo se agrega como un archivo "parte" dentro de su mes; compactar()
+# junta las partes de un mes en un único datos.parquet. Los lectores solo abren
+# los meses que caen dentro del rango pedido y solo las columnas que necesitan.
+#
+# Las dimensiones del catálogo (equipo, componente, aceite, ...) se guardan como
+# claves enteras; leer_dataset() vuelve a unir las etiquetas (ver catalogo.py).
+#
+# El almacén se deriva del CSV, igual que la base SQLite y los agregados: los
+# escritores solo agregan al CSV y asegurar_almacen() (la llaman los lectores)
+# pasa al almacén la cola nueva, desde el byte anotado en data/dataset/.estado.json
+# junto con la cabecera y la huella del CSV. Si el CSV se reescribió o una
+# sincronización anterior quedó a medias, el almacén se vuelve a construir
+# entero, así que el CSV y el almacén nunca quedan con filas distintas.
+
+PARTES_ANTES_DE_COMPACTAR = 64  # Partes por mes que dispara la compactación automática
+
+# Versión del formato en disco. Un almacén de una versión anterior se vuelve a
+# construir desde el CSV (el almacén siempre se puede derivar del CSV).
+FORMATO_ALMACEN = 2  # 2: dimensiones como claves del catálogo
+
+# Periodos que ofrecen los dashboards (días hacia atrás; None = todo el histórico)
+PERIODOS = {
+    "Último mes": 30,
+    "Últimos 3 meses": 90,
+    "Último año": 365,
+    "Todo el histórico": None,
+}
+
+# Función para normalizar un lote antes de escribirlo: tipos del esquema
+# (enteros y reales chicos) y claves del catálogo, iguales en todas las partes.
+# Las etiquetas ya las registró el escritor del CSV; aquí solo se buscan.
+def _normalizar(df):
+    return a_claves(aplicar_esquema(df), registrar=False)
+
+# Funciones para leer y escribir el estado (byte del CSV, cabecera, huella y si quedó completo)
+def _archivo_estado(raiz):
+    return os.path.join(raiz, ".estado.json")
+
+def _leer_estado(raiz):
+    try:
+        with open(_archivo_estado(raiz), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _escribir_estado(raiz, estado):
+    temporal = f"{_archivo_estado(raiz)}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, _archivo_estado(raiz))
+
+# Función para saber si el estado corresponde al CSV: misma cabecera y mismos
+# bytes ya pasados al almacén (el archivo solo creció desde entonces)
+def _estado_vigente(estado, archivo_csv, cabecera):
+    return (estado is not None and estado["completo"] and estado["cabecera"] == ",".join(cabecera)
+            and os.path.getsize(archivo_csv) >= estado["bytes_csv"]
+            and huella_csv(archivo_csv, estado["bytes_csv"]) == estado["huella"])
+
+# Funciones para obtener el CSV del que se deriva un almacén y al revés: están
+# uno junto al otro (data/datos_generados.csv y data/dataset, y lo mismo en cada perfil de escala)
+def _csv_del_almacen(raiz):
+    return os.path.join(os.path.dirname(raiz), os.path.basename(ARCHIVO_DATOS))
+
+def almacen_del_csv(archivo_csv):
+    return os.path.join(os.path.dirname(archivo_csv), os.path.basename(RAIZ_ALMACEN))
+
+# Función para saber hasta qué byte del CSV tiene el almacén (y con qué huella);
+# None si no existe o si una sincronización está a medias
+def estado_almacen(raiz=RAIZ_ALMACEN):
+    estado = _leer_estado(raiz)
+    return estado if estado and estado["completo"] else None
+
+# Funciones para leer y escribir la versión del formato de un almacén
+def _archivo_formato(raiz):
+    return os.path.join(raiz, ".formato")
+
+def leer_formato(raiz=RAIZ_ALMACEN):
+    try:
+        with open(_archivo_formato(raiz)) as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return 1  # Almacenes creados antes de que existiera la marca
+
+def _marcar_formato(raiz):
+    if not os.path.exists(_archivo_formato(raiz)):
+        os.makedirs(raiz, exist_ok=True)
+        with open(_archivo_formato(raiz), "w") as f:
+            f.write(f"{FORMATO_ALMACEN}\n")
+
+# Función para abrir un conjunto de archivos Parquet con el esquema común. Las
+# partes escritas antes del esquema (int64, float64, texto) se convierten al leer.
+def _abrir(archivos):
+    diccionarios = [c for c in DIMENSIONES if c not in DIMENSIONES_CATALOGO]
+    formato = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=diccionarios))
+    columnas = pq.read_schema(archivos[0])
+    esquema = esquema_arrow(columnas.names, claves=DIMENSIONES_CATALOGO)
+    extras = [campo for campo in columnas if campo.name not in esquema.names and campo.name != "__index_level_0__"]
+    return ds.dataset(archivos, format=formato, schema=pa.schema(list(esquema) + extras))
+
+# Función para obtener la carpeta de un mes ("2025-04")
+def _carpeta_mes(raiz, periodo):
+    return os.path.join(raiz, str(periodo))
+
+# Función para listar los meses presentes en el almacén
+def meses_disponibles(raiz=RAIZ_ALMACEN):
+    if not os.path.isdir(raiz):
+        return []
+    return sorted(m for m in os.listdir(raiz) if os.path.isdir(os.path.join(raiz, m)) and not m.startswith("."))
+
+# Función para agregar un lote al almacén: una parte nueva por cada mes presente en el lote.
+# compresion: códec de Parquet ("snappy" para el almacén, "zstd" para el archivo histórico)
+def guardar_lote(df, raiz=RAIZ_ALMACEN, compactar_desde=PARTES_ANTES_DE_COMPACTAR, compresion="snappy"):
+    if df.empty:
+        return 0
+    if not meses_disponibles(raiz):
+        _marcar_formato(raiz)
+    df = _normalizar(df)
+    meses = df["Fecha"].dt.to_period("M")
+    for periodo, df_mes in df.groupby(meses, sort=True):
+        carpeta = _carpeta_mes(raiz, periodo)
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"parte-{time.time_ns()}-{os.getpid()}.parquet"
+        temporal = os.path.join(carpeta, "." + nombre)
+        df_mes.to_parquet(temporal, index=False, compression=compresion)
+        os.replace(temporal, os.path.join(carpeta, nombre))  # La parte aparece completa o no aparece
+        if compactar_desde and len(glob.glob(os.path.join(carpeta, "parte-*.parquet"))) >= compactar_desde:
+            compactar_mes(carpeta, compresion)
+    return len(df)
+
+# Función para juntar todas las partes de un mes en un único datos.parquet
+def compactar_mes(carpeta, compresion="snappy"):
+    archivos = _archivos_mes(carpeta)
+    if len(archivos) <= 1:
+        return
+    tabla = _abrir(archivos).to_table()
+    tabla = tabla.sort_by("Fecha")
+    temporal = os.path.join(carpeta, ".datos.parquet")
+    pq.write_table(tabla, temporal, compression=compresion)
+    os.replace(temporal, os.path.join(carpeta, "datos.parquet"))
+    for archivo in archivos:
+        if not archivo.endswith("datos.parquet"):
+            os.remove(archivo)
+
+def _compactar_meses(raiz, compresion="snappy"):
+    for mes in meses_disponibles(raiz):
+        compactar_mes(_carpeta_mes(raiz, mes), compresion)
+
+# Función para compactar todos los meses del almacén (bajo el bloqueo del
+# almacén, para no cruzarse con una sincronización)
+def compactar(raiz=RAIZ_ALMACEN, compresion="snappy"):
+    with bloqueo_archivo(raiz):
+        _compactar_meses(raiz, compresion)
+
+# Función para quitar del almacén las muestras anteriores a una fecha (las que
+# pasaron al archivo histórico): los meses enteros se borran y el mes del corte
+# se reescribe sin esas filas
+def descartar_antes(corte, raiz=RAIZ_ALMACEN):
+    corte = pd.Timestamp(corte)
+    for mes in meses_disponibles(raiz):
+        periodo = pd.Period(mes, freq="M")
+        carpeta = _carpeta_mes(raiz, mes)
+        if periodo.end_time < corte:
+            shutil.rmtree(carpeta)
+        elif periodo.start_time < corte:
+            archivos = _archivos_mes(carpeta)
+            tabla = _abrir(archivos).to_table(filter=ds.field("Fecha") >= pa.scalar(corte.to_datetime64()))
+            temporal = os.path.join(carpeta, ".datos.parquet")
+            pq.write_table(tabla.sort_by("Fecha"), temporal)
+            os.replace(temporal, os.path.join(carpeta, "datos.parquet"))
+            for archivo in archivos:
+                if not archivo.endswith("datos.parquet"):
+                    os.remove(archivo)
+
+# Función para listar los archivos Parquet de un mes (sin temporales)
+def _archivos_mes(carpeta):
+    return sorted(glob.glob(os.path.join(carpeta, "*.parquet")))
+
+# Función para pasar al almacén las líneas de un CSV a partir del byte "desde",
+# por bloques para no cargarlo entero; devuelve (filas, byte_siguiente)
+def _agregar_cola(archivo_csv, cabecera, raiz, desde):
+    filas = 0
+    tipos = dtypes_csv(cabecera)
+    for texto, desde in leer_cola_csv(archivo_csv, desde):
+        bloque = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=tipos)
+        filas += guardar_lote(bloque, raiz)
+    return filas, desde
+
+# Función para importar el CSV histórico al almacén
+def importar_csv(archivo_csv=ARCHIVO_DATOS, raiz=RAIZ_ALMACEN):
+    # Se construye en una carpeta temporal y se publica con un rename, así un
+    # lector nunca ve un almacén a medias
+    cabecera = leer_cabecera(archivo_csv)
+    if cabecera is None:
+        return 0
+    temporal = f"{raiz}.importando-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    _marcar_formato(temporal)
+    filas, hasta = _agregar_cola(archivo_csv, cabecera, temporal, 0)
+    _compactar_meses(temporal)
+    _escribir_estado(temporal, {"bytes_csv": hasta, "cabecera": ",".join(cabecera),
+                                "huella": huella_csv(archivo_csv, hasta), "completo": True})
+    try:
+        os.rename(temporal, raiz)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)  # Otro proceso lo publicó primero
+    return filas
+
+# Función para poner el almacén al día con su CSV (por defecto, el que está
+# junto al almacén). Lo llaman los lectores antes de leer: si el CSV no creció
+# no se toma ningún bloqueo. Se construye entero la primera vez, si el formato
+# cambió, si el CSV se reescribió (cabecera o huella distintas) o si una
+# sincronización anterior quedó a medias; si no, solo se agrega la cola nueva.
+# Devuelve las filas que se pasaron al almacén.
+def asegurar_almacen(raiz=RAIZ_ALMACEN, archivo_csv=None):
+    archivo_csv = archivo_csv or _csv_del_almacen(raiz)
+    cabecera = leer_cabecera(archivo_csv)
+    if cabecera is None:
+        return 0
+    estado = _leer_estado(raiz)
+    if _estado_vigente(estado, archivo_csv, cabecera) and os.path.getsize(archivo_csv) == estado["bytes_csv"]:
+        return 0  # Al día
+    with bloqueo_archivo(raiz):  # Un solo proceso sincroniza a la vez
+        estado = _leer_estado(raiz)
+        if not _estado_vigente(estado, archivo_csv, cabecera) or leer_formato(raiz) < FORMATO_ALMACEN:
+            return reconstruir_almacen(raiz, archivo_csv)
+        if os.path.getsize(archivo_csv) == estado["bytes_csv"]:
+            return 0  # Lo sincronizó otro proceso mientras se esperaba el bloqueo
+        # Marcado como incompleto mientras se escriben partes: si el proceso se
+        # corta a mitad, la próxima vez se reconstruye en vez de repetir filas
+        _escribir_estado(raiz, {**estado, "completo": False})
+        filas, hasta = _agregar_cola(archivo_csv, cabecera, raiz, estado["bytes_csv"])
+        _escribir_estado(raiz, {**estado, "bytes_csv": hasta, "huella": huella_csv(archivo_csv, hasta)})
+        return filas
+
+# Función para tomar como punto de partida un CSV reescrito sin muestras nuevas
+# (el archivado y la migración de fechas), sin volver a importar nada: el
+# almacén tiene que estar al día con el CSV anterior, y se llama con el CSV
+# bloqueado para los escritores. Con "antes", primero se descartan del almacén
+# las muestras anteriores a esa fecha (las que pasaron al archivo histórico).
+def adoptar_csv(archivo_csv=ARCHIVO_DATOS, raiz=RAIZ_ALMACEN, antes=None):
+    with bloqueo_archivo(raiz):
+        estado = _leer_estado(raiz)
+        if not estado or not estado["completo"]:
+            return  # La próxima sincronización lo reconstruye desde el CSV
+        if antes is not None:
+            descartar_antes(antes, raiz)
+        tamano = os.path.getsize(archivo_csv)
+        _escribir_estado(raiz, {**estado, "bytes_csv": tamano, "huella": huella_csv(archivo_csv, tamano)})
+
+# Función para volver a construir el almacén completo desde el CSV
+def reconstruir_almacen(raiz=RAIZ_ALMACEN, archivo_csv=ARCHIVO_DATOS):
+    shutil.rmtree(raiz, ignore_errors=True)
+    return importar_csv(archivo_csv, raiz)
+
+# Función para obtener los nombres de columnas del almacén sin leer datos
+def columnas_disponibles(raiz=RAIZ_ALMACEN):
+    asegurar_almacen(raiz)
+    for mes in meses_disponibles(raiz):
+        archivos = _archivos_mes(_carpeta_mes(raiz, mes))
+        if archivos:
+            return pq.read_schema(archivos[0]).names
+    return []
+
+# Función para leer el almacén.
+#   columnas: lista de columnas a leer (None = todas)
+#   desde / hasta: rango de fechas; los meses fuera del rango ni siquiera se abren
+#   filtros: {dimensión: [etiquetas]}; se traducen a claves y se filtran al leer
+#   solo_claves: True para devolver las dimensiones como claves enteras, sin etiquetas
+#   asegurar: False para almacenes que no se derivan de un CSV (el archivo histórico)
+def leer_dataset(columnas=None, desde=None, hasta=None, raiz=RAIZ_ALMACEN, filtros=None, solo_claves=False,
+                 asegurar=True):
+    if asegurar:
+        asegurar_almacen(raiz)
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    archivos = []
+    for mes in meses_disponibles(raiz):
+        periodo = pd.Period(mes, freq="M")
+        if desde is not None and periodo.end_time < desde:
+            continue
+        if hasta is not None and periodo.start_time > hasta:
+            continue
+        archivos.extend(_archivos_mes(_carpeta_mes(raiz, mes)))
+    if not archivos:
+        return pd.DataFrame(columns=columnas)
+
+    dataset = _abrir(archivos)
+    filtro = None
+    if desde is not None:
+        filtro = ds.field("Fecha") >= pa.scalar(desde.to_datetime64())
+    if hasta is not None:
+        condicion = ds.field("Fecha") <= pa.scalar(hasta.to_datetime64())
+        filtro = condicion if filtro is None else filtro & condicion
+    for dimension, valores in (filtros or {}).items():
+        condicion = ds.field(dimension).isin(claves(dimension, list(valores), registrar=False))
+        filtro = condicion if filtro is None else filtro & condicion
+    df = dataset.to_table(columns=columnas, filter=filtro).to_pandas()
+    return df if solo_claves else a_etiquetas(df)
+
+# Función para convertir un periodo de PERIODOS en la fecha inicial a leer.
+# Se redondea al día para que el caché de Streamlit no cambie en cada ejecución.
+def inicio_periodo(periodo):
+    dias = PERIODOS[periodo]
+    if dias is None:
+        return None
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=dias)
@@ -0,0 +1,186 @@
+import argparse
+import io
+import os
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from rutas import ARCHIVO_DATOS, ARCHIVO_SQLITE
+from esquema import ESQUEMA, aplicar_esquema, dtypes_csv
+from catalogo import DIMENSIONES_CATALOGO, a_claves, a_etiquetas, claves
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
+
+# Backend opcional en SQLite (solo biblioteca estándar) para los dashboards.
+#
+# La base se deriva del CSV igual que el almacén columnar: sincronizar() lee
+# solo lo que se agregó al CSV desde la última vez (guarda el byte hasta donde
+# leyó) y lo inserta. Las dimensiones del catálogo se guardan como claves y
+# Fecha como entero (nanosegundos desde 1970), así los índices compuestos
+# (Equipo, Componente, Fecha) y (Criticidad, Fecha) resuelven los filtros del
+# sidebar y solo las filas que coinciden llegan a pandas.
+#
+# Se activa con la variable de entorno BACKEND_DATOS=sqlite.
+
+BACKEND_DATOS = os.environ.get("BACKEND_DATOS", "parquet")
+
+TABLA = "muestras"
+
+INDICES = {
+    "idx_equipo_componente_fecha": ["Equipo", "Componente", "Fecha"],
+    "idx_criticidad_fecha": ["Criticidad", "Fecha"],
+}
+
+# Función para saber si los dashboards deben leer desde SQLite
+def usar_sqlite():
+    return BACKEND_DATOS == "sqlite"
+
+# Función para citar un nombre de columna (los nombres tienen espacios, °, µ, ...)
+def _q(nombre):
+    return '"' + nombre.replace('"', '""') + '"'
+
+# Tipo SQLite de cada columna del esquema
+def _tipo_sql(columna):
+    tipo = ESQUEMA[columna]
+    if columna == "Fecha" or columna in DIMENSIONES_CATALOGO or tipo.startswith("int"):
+        return "INTEGER"
+    if tipo.startswith("float"):
+        return "REAL"
+    return "TEXT"
+
+# Función para abrir la base y crear la tabla, los índices y la tabla de control si no existen
+def conectar(archivo=ARCHIVO_SQLITE):
+    carpeta = os.path.dirname(archivo)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    conexion = sqlite3.connect(archivo, timeout=60, isolation_level=None)
+    conexion.execute("PRAGMA journal_mode=WAL")  # Los lectores no bloquean al que sincroniza
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    columnas = ", ".join(f"{_q(c)} {_tipo_sql(c)}" for c in ESQUEMA)
+    conexion.execute(f"CREATE TABLE IF NOT EXISTS {TABLA} ({columnas})")
+    for nombre, columnas_indice in INDICES.items():
+        conexion.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {TABLA} ({', '.join(map(_q, columnas_indice))})")
+    conexion.execute("CREATE TABLE IF NOT EXISTS control (clave TEXT PRIMARY KEY, valor TEXT)")
+    return conexion
+
+def _leer_control(conexion, clave, defecto=None):
+    fila = conexion.execute("SELECT valor FROM control WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else defecto
+
+def _escribir_control(conexion, clave, valor):
+    conexion.execute("INSERT OR REPLACE INTO control (clave, valor) VALUES (?, ?)", (clave, str(valor)))
+
+# Función para convertir un lote al formato de la tabla: claves, Fecha entera y
+# las columnas del esquema en su orden (las que falten quedan en NULL)
+def _filas_sql(df):
+    df = a_claves(aplicar_esquema(df), registrar=False)
+    df = df.assign(Fecha=df["Fecha"].astype("datetime64[ns]").astype(np.int64))
+    df = df.reindex(columns=list(ESQUEMA))
+    # tolist() entrega tipos de Python, que es lo que acepta sqlite3 (NaN se guarda como NULL)
+    return zip(*(df[c].tolist() for c in df.columns))
+
+# Función para insertar un lote en la tabla (dentro de la transacción en curso)
+def _insertar(conexion, df):
+    marcadores = ", ".join("?" * len(ESQUEMA))
+    conexion.executemany(f"INSERT INTO {TABLA} VALUES ({marcadores})", _filas_sql(df))
+    return len(df)
+
+# Función para poner la base al día con el CSV: inserta solo las filas nuevas.
+# Si el CSV se reescribió (cambió la cabecera o la huella de lo ya leído, p. ej.
+# al archivar o migrar fechas) o se achicó, se vuelve a cargar entero.
+def sincronizar(archivo_csv=ARCHIVO_DATOS, archivo=ARCHIVO_SQLITE):
+    cabecera = leer_cabecera(archivo_csv)
+    if cabecera is None:
+        return 0
+    conexion = conectar(archivo)
+    try:
+        conexion.execute("BEGIN IMMEDIATE")  # Un solo proceso sincroniza a la vez
+        desde = int(_leer_control(conexion, "bytes_csv", 0))
+        if (_leer_control(conexion, "cabecera_csv") != ",".join(cabecera) or os.path.getsize(archivo_csv) < desde
+                or desde and _leer_control(conexion, "huella_csv") != huella_csv(archivo_csv, desde)):
+            conexion.execute(f"DELETE FROM {TABLA}")
+            desde = 0
+        tipos = dtypes_csv(cabecera)
+        filas = 0
+        for texto, desde in leer_cola_csv(archivo_csv, desde):
+            bloque = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=tipos)
+            filas += _insertar(conexion, bloque)
+        _escribir_control(conexion, "bytes_csv", desde)
+        _escribir_control(conexion, "cabecera_csv", ",".join(cabecera))
+        _escribir_control(conexion, "huella_csv", huella_csv(archivo_csv, desde))
+        conexion.execute("COMMIT")
+        return filas
+    except BaseException:
+        conexion.execute("ROLLBACK")
+        raise
+    finally:
+        conexion.close()
+
+# Función para armar la condición WHERE a partir del periodo y los filtros
+def _condicion(desde=None, hasta=None, filtros=None):
+    condiciones, parametros = [], []
+    for dimension, valores in (filtros or {}).items():
+        valores = list(valores)
+        if dimension in DIMENSIONES_CATALOGO:
+            valores = [int(c) for c in claves(dimension, valores, registrar=False)]
+        condiciones.append(f"{_q(dimension)} IN ({', '.join('?' * len(valores))})")
+        parametros.extend(valores)
+    if desde is not None:
+        condiciones.append(f"{_q('Fecha')} >= ?")
+        parametros.append(pd.Timestamp(desde).value)
+    if hasta is not None:
+        condiciones.append(f"{_q('Fecha')} <= ?")
+        parametros.append(pd.Timestamp(hasta).value)
+    return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), parametros
+
+# Función para leer muestras con los filtros resueltos en SQL.
+#   filtros: {columna: [valores]}; las dimensiones se traducen a claves
+#   limite: para leer solo las "limite" muestras más recientes
+def leer_sqlite(columnas=None, desde=None, hasta=None, filtros=None, limite=None, archivo=ARCHIVO_SQLITE):
+    columnas = list(ESQUEMA) if columnas is None else list(columnas)
+    where, parametros = _condicion(desde, hasta, filtros)
+    consulta = f"SELECT {', '.join(map(_q, columnas))} FROM {TABLA}{where}"
+    if limite is not None:
+        consulta += f" ORDER BY {_q('Fecha')} DESC LIMIT {int(limite)}"
+    conexion = conectar(archivo)
+    try:
+        df = pd.read_sql_query(consulta, conexion, params=parametros)
+    finally:
+        conexion.close()
+    if "Fecha" in df.columns:
+        df["Fecha"] = pd.to_datetime(df["Fecha"], unit="ns")
+    return aplicar_esquema(a_etiquetas(df))
+
+# Función para obtener los valores presentes de una dimensión (opciones de los filtros)
+def valores_dimension(dimension, desde=None, hasta=None, archivo=ARCHIVO_SQLITE):
+    where, parametros = _condicion(desde, hasta)
+    conexion = conectar(archivo)
+    try:
+        filas = conexion.execute(f"SELECT DISTINCT {_q(dimension)} FROM {TABLA}{where}", parametros).fetchall()
+    finally:
+        conexion.close()
+    valores = sorted(f[0] for f in filas if f[0] is not None)
+    if dimension in DIMENSIONES_CATALOGO:
+        # -1 es una etiqueta que no estaba en el catálogo; a_etiquetas recarga el
+        # catálogo si hay claves que registró otro proceso
+        conocidas = pd.DataFrame({dimension: np.array([v for v in valores if v >= 0], dtype=np.int64)})
+        return a_etiquetas(conocidas)[dimension].tolist()
+    return valores
+
+# Función para contar las muestras de un periodo sin leerlas
+def contar(desde=None, hasta=None, filtros=None, archivo=ARCHIVO_SQLITE):
+    where, parametros = _condicion(desde, hasta, filtros)
+    conexion = conectar(archivo)
+    try:
+        return conexion.execute(f"SELECT COUNT(*) FROM {TABLA}{where}", parametros).fetchone()[0]
+    finally:
+        conexion.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sincroniza la base SQLite con el CSV de muestras")
+    parser.add_argument("--archivo-csv", default=ARCHIVO_DATOS)
+    parser.add_argument("--archivo", default=ARCHIVO_SQLITE)
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    filas = sincronizar(args.archivo_csv, args.archivo)
+    segundos = time.perf_counter() - inicio
+    print(f"{filas:,} filas nuevas en {args.archivo} en {segundos:.2f} s")
@@ -2,6 +2,11 @@ import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
+from almacen_columnar import inicio_periodo, PERIODOS
+from carga_incremental import CargadorIncremental
+from archivo_historico import agregar_archivo
+from agregados import sincronizar as sincronizar_agregados, tendencia_semanal
+from iso4406 import con_codigo_iso
 
 # Configurar la página
 st.set_page_config(
@@ -38,17 +43,37 @@ st.markdown("""
 # Título
 st.title("📊 Dashboard de Monitoreo Análisis Tribológico")
 
-# Función para cargar datos
-@st.cache_data(ttl=60)  # Actualiza los datos cada 60 segundos
-def cargar_datos():
-    try:
-        return pd.read_csv("data/datos_generados.csv")
-    except FileNotFoundError:
-        st.error("El archivo 'datos_generados.csv' no existe. Asegúrate de que el script de generación de datos esté funcionando.")
-        return pd.DataFrame()
+# Cargador incremental, uno por proceso y periodo, compartido por todas las
+# sesiones: carga el periodo desde el almacén y después solo lee las filas
+# nuevas del CSV (el inicio del periodo cambia una vez por día)
+@st.cache_resource(max_entries=len(PERIODOS))
+def cargador_datos(desde=None):
+    return CargadorIncremental(desde=desde)
+
+# Función para cargar datos (solo el periodo elegido). Todas las sesiones
+# comparten el mismo DataFrame (cache_resource) en vez de tener cada una su copia.
+@st.cache_resource(ttl=60)  # Actualiza los datos cada 60 segundos
+def cargar_datos(desde=None):
+    df = cargador_datos(desde).actualizar()
+    df = agregar_archivo(df, desde)  # Solo si el periodo va más atrás que los datos calientes
+    if df.empty:
+        st.error("No hay datos en el archivo. Asegúrate de que el script de generación de datos esté funcionando.")
+    return df
+
+# Tendencia semanal desde los agregados (data/agregados): se leen los resúmenes
+# por día/semana ya calculados en vez de agrupar todas las muestras
+@st.cache_data(ttl=60)
+def cargar_tendencia(analito, desde=None, equipos=(), componentes=(), criticidades=()):
+    sincronizar_agregados()
+    filtros = {"Equipo": equipos, "Componente": componentes, "Criticidad": criticidades}
+    return tendencia_semanal(analito, desde=desde, filtros={c: v for c, v in filtros.items() if v})
+
+# Periodo a cargar
+st.sidebar.header("📅 Periodo")
+periodo = st.sidebar.selectbox("Selecciona Periodo:", list(PERIODOS), index=len(PERIODOS) - 1)
 
 # Cargar datos
-df = cargar_datos()
+df = cargar_datos(inicio_periodo(periodo)).copy(deep=False)  # Copia liviana: los cambios no tocan el compartido
 
 # Verificar si el DataFrame está vacío
 if df.empty:
@@ -56,7 +81,7 @@ if df.empty:
 else:
     # Mostrar vista previa de los datos completos (colapsable)
     with st.expander("📋 Datos Completos"):
-        st.dataframe(df)
+        st.dataframe(con_codigo_iso(df))
 
     # Filtros
     st.sidebar.header("🔍 Filtros")
@@ -75,7 +100,7 @@ else:
 
     # Mostrar datos filtrados (colapsable)
     with st.expander("🎯 Datos Filtrados"):
-        st.dataframe(df_filtrado)
+        st.dataframe(con_codigo_iso(df_filtrado))
 
     # Indicador de Semáforo
     st.markdown("#### 🚦 Indicador de Semáforo")
@@ -130,12 +155,8 @@ else:
     fig, ax = plt.subplots(figsize=(12, 6))
 
     # Agrupar los datos por semana (o mes) y componente para reducir la cantidad de puntos
-    df_filtrado['Fecha'] = pd.to_datetime(df_filtrado['Fecha'])  # Asegurarse de que la columna Fecha sea datetime
-    df_agrupado = (
-        df_filtrado.groupby([pd.Grouper(key="Fecha", freq="W"), "Componente"])  # Agrupar por fecha y componente
-        .mean()
-        .reset_index()
-    )
+    df_agrupado = cargar_tendencia("Viscosidad 100°C cSt(mm2/s)", inicio_periodo(periodo), tuple(equipo_seleccionado),
+                                   tuple(componente_seleccionado), tuple(criticidad_seleccionada))
 
     # Gráfico de dispersión
     sns.scatterplot(
@@ -2,6 +2,12 @@ import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
+from almacen_columnar import inicio_periodo, PERIODOS
+from carga_incremental import CargadorIncremental
+from archivo_historico import agregar_archivo
+from agregados import sincronizar as sincronizar_agregados, tendencia_semanal
+from iso4406 import con_codigo_iso
+from almacen_sqlite import usar_sqlite, sincronizar, leer_sqlite, valores_dimension
 
 # Configurar la página
 st.set_page_config(
@@ -97,17 +103,71 @@ div.stButton > button:hover {
 st.title("📊 Dashboard de Monitoreo Análisis Tribológico")
 st.title("Muestra Capturada cada 2 hrs")
 
-# Función para cargar datos
-@st.cache_data(ttl=60)  # Actualiza los datos cada 60 segundos
-def cargar_datos():
-    try:
-        return pd.read_csv("data/datos_generados.csv")
-    except FileNotFoundError:
-        st.error("El archivo 'datos_generados.csv' no existe. Asegúrate de que el script de generación de datos esté funcionando.")
-        return pd.DataFrame()
+# Cargador incremental, uno por proceso y periodo, compartido por todas las
+# sesiones: carga el periodo desde el almacén y después solo lee las filas
+# nuevas del CSV (el inicio del periodo cambia una vez por día)
+@st.cache_resource(max_entries=len(PERIODOS))
+def cargador_datos(desde=None):
+    return CargadorIncremental(desde=desde)
 
-# Cargar datos
-df = cargar_datos()
+# Función para cargar datos (solo el periodo elegido). Todas las sesiones
+# comparten el mismo DataFrame (cache_resource) en vez de tener cada una su copia.
+@st.cache_resource(ttl=60)  # Actualiza los datos cada 60 segundos
+def cargar_datos(desde=None):
+    df = cargador_datos(desde).actualizar()
+    df = agregar_archivo(df, desde)  # Solo si el periodo va más atrás que los datos calientes
+    if df.empty:
+        st.error("No hay datos en el archivo. Asegúrate de que el script de generación de datos esté funcionando.")
+    return df
+
+# Tendencia semanal desde los agregados (data/agregados): se leen los resúmenes
+# por día/semana ya calculados en vez de agrupar todas las muestras
+@st.cache_data(ttl=60)
+def cargar_tendencia(analito, desde=None, equipos=(), componentes=(), criticidades=()):
+    sincronizar_agregados()
+    filtros = {"Equipo": equipos, "Componente": componentes, "Criticidad": criticidades}
+    return tendencia_semanal(analito, desde=desde, filtros={c: v for c, v in filtros.items() if v})
+
+# Backend SQLite (BACKEND_DATOS=sqlite): los filtros se resuelven con SQL sobre
+# índices y solo las filas que coinciden se cargan en pandas. SQLite tiene solo
+# las muestras calientes: si el periodo llega al archivo histórico, se suman las
+# archivadas con los mismos filtros
+@st.cache_data(ttl=60)
+def cargar_opciones_sqlite(desde=None):
+    sincronizar()
+    dimensiones = ["Equipo", "Componente", "Criticidad"]
+    opciones = {d: valores_dimension(d, desde=desde) for d in dimensiones}
+    viejas = agregar_archivo(pd.DataFrame(), desde, columnas=dimensiones)
+    if not viejas.empty:
+        opciones = {d: sorted(set(v) | set(viejas[d].dropna().astype(str))) for d, v in opciones.items()}
+    return opciones
+
+@st.cache_data(ttl=60)
+def cargar_recientes_sqlite(desde=None, limite=5_000):
+    df = leer_sqlite(desde=desde, limite=limite)
+    if len(df) < limite:
+        df = agregar_archivo(df, desde)
+        df = df.sort_values("Fecha", ascending=False, kind="stable").head(limite)
+    return df
+
+@st.cache_data(ttl=60)
+def cargar_filtrado_sqlite(desde=None, equipos=(), componentes=(), criticidades=()):
+    filtros = {"Equipo": equipos, "Componente": componentes, "Criticidad": criticidades}
+    filtros = {c: v for c, v in filtros.items() if v}
+    return agregar_archivo(leer_sqlite(desde=desde, filtros=filtros), desde, filtros=filtros)
+
+# Periodo a cargar
+st.sidebar.header("📅 Periodo")
+periodo = st.sidebar.selectbox("Selecciona Periodo:", list(PERIODOS), index=len(PERIODOS) - 1)
+desde = inicio_periodo(periodo)
+
+# Cargar datos (con SQLite, solo las últimas muestras para la vista completa)
+if usar_sqlite():
+    opciones = cargar_opciones_sqlite(desde)
+    df = cargar_recientes_sqlite(desde)
+else:
+    df = cargar_datos(desde).copy(deep=False)  # Copia liviana: los cambios no tocan el compartido
+    opciones = {c: df[c].unique() for c in ("Equipo", "Componente", "Criticidad")} if not df.empty else {}
 
 # Verificar si el DataFrame está vacío
 if df.empty:
@@ -115,26 +175,30 @@ if df.empty:
 else:
     # Mostrar vista previa de los datos completos (colapsable)
     with st.expander("📋 Datos Completos"):
-        st.dataframe(df)
+        st.dataframe(con_codigo_iso(df))
 
     # Filtros
     st.sidebar.header("🔍 Filtros")
-    equipo_seleccionado = st.sidebar.multiselect("Selecciona Equipo:", df["Equipo"].unique())
-    componente_seleccionado = st.sidebar.multiselect("Selecciona Componente:", df["Componente"].unique())
-    criticidad_seleccionada = st.sidebar.multiselect("Selecciona Nivel de Criticidad:", df["Criticidad"].unique())
+    equipo_seleccionado = st.sidebar.multiselect("Selecciona Equipo:", opciones["Equipo"])
+    componente_seleccionado = st.sidebar.multiselect("Selecciona Componente:", opciones["Componente"])
+    criticidad_seleccionada = st.sidebar.multiselect("Selecciona Nivel de Criticidad:", opciones["Criticidad"])
 
     # Filtrar datos
-    df_filtrado = df
-    if equipo_seleccionado:
-        df_filtrado = df_filtrado[df_filtrado["Equipo"].isin(equipo_seleccionado)]
-    if componente_seleccionado:
-        df_filtrado = df_filtrado[df_filtrado["Componente"].isin(componente_seleccionado)]
-    if criticidad_seleccionada:
-        df_filtrado = df_filtrado[df_filtrado["Criticidad"].isin(criticidad_seleccionada)]
+    if usar_sqlite():
+        df_filtrado = cargar_filtrado_sqlite(desde, tuple(equipo_seleccionado), tuple(componente_seleccionado),
+                                             tuple(criticidad_seleccionada))
+    else:
+        df_filtrado = df
+        if equipo_seleccionado:
+            df_filtrado = df_filtrado[df_filtrado["Equipo"].isin(equipo_seleccionado)]
+        if componente_seleccionado:
+            df_filtrado = df_filtrado[df_filtrado["Componente"].isin(componente_seleccionado)]
+        if criticidad_seleccionada:
+            df_filtrado = df_filtrado[df_filtrado["Criticidad"].isin(criticidad_seleccionada)]
 
     # Mostrar datos filtrados (colapsable)
     with st.expander("🎯 Datos Filtrados"):
-        st.dataframe(df_filtrado)
+        st.dataframe(con_codigo_iso(df_filtrado))
 
     # Indicador de Semáforo
     st.markdown("#### 🚦 Indicador de Semáforo")
@@ -194,12 +258,8 @@ else:
     with col1:
         st.markdown("#### 📈 Tendencia de Viscosidad")
         fig, ax = plt.subplots(figsize=(5, 3))
-        df_filtrado['Fecha'] = pd.to_datetime(df_filtrado['Fecha'])
-        df_agrupado = (
-            df_filtrado.groupby([pd.Grouper(key="Fecha", freq="W"), "Componente"])
-            .mean(numeric_only=True)
-            .reset_index()
-        )
+        df_agrupado = cargar_tendencia("Viscosidad 100°C cSt(mm2/s)", desde, tuple(equipo_seleccionado),
+                                       tuple(componente_seleccionado), tuple(criticidad_seleccionada))
         sns.lineplot(
             data=df_agrupado,
             x="Fecha",
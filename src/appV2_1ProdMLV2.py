@@ -5,6 +5,15 @@ import plotly.express as px
 import joblib
 import os
 from pathlib import Path
+from bosque_compacto import BosqueCompacto
+from almacen_columnar import inicio_periodo, PERIODOS
+from carga_incremental import CargadorIncremental
+from archivo_historico import agregar_archivo
+from agregados import sincronizar as sincronizar_agregados, tendencia_semanal
+from iso4406 import con_codigo_iso
+from almacen_sqlite import usar_sqlite, sincronizar, leer_sqlite, valores_dimension
+from criticidad import calcular_criticidad
+from catalogo import etiquetas, aceite_por_componente
 
 # Configuración de la página
 st.set_page_config(
@@ -25,29 +34,29 @@ st.set_page_config(
 def cargar_modelo():
     # Método 100% confiable para encontrar la ruta
     base_dir = Path(__file__).resolve().parent.parent  # Sube dos niveles desde src/
-    ruta_modelo = base_dir / "data" / "modelo_entrenado.joblib"
+    ruta_modelo = base_dir / "data" / "modelo_compacto.npz"  # Bosque exportado a arreglos NumPy
     
     # Debug (opcional, quita después de verificar)
     st.write(f"Buscando modelo en: {ruta_modelo}")
     if not ruta_modelo.exists():
         st.error(f"ERROR: Archivo no encontrado. Directorio actual: {list(Path('.').glob('*'))}")
     
-    return joblib.load(ruta_modelo)
+    return BosqueCompacto.cargar(ruta_modelo)
 
 
-# Cargar los nombres de características
+# Cargar el pipeline de características ajustado junto al modelo
 @st.cache_resource
-def cargar_feature_names():
-    return joblib.load("data/feature_names.joblib")
+def cargar_pipeline():
+    return joblib.load("data/pipeline_caracteristicas.joblib")
 
-feature_names = cargar_feature_names()
+pipeline = cargar_pipeline()
 
 # Función para hacer predicciones
 def predecir_criticidad(datos):
-    # Codificar las variables categóricas
-    datos_encoded = pd.get_dummies(datos).reindex(columns=feature_names, fill_value=0)
+    # Codificar directamente a la matriz que espera el modelo
+    X = pipeline.transformar(datos)
     # Hacer la predicción
-    prediccion = modelo.predict(datos_encoded)
+    prediccion = modelo.predict(X)
     return prediccion
 
 # Función para generar valores automáticos de minerales y otros parámetros
@@ -72,37 +81,16 @@ def generar_valores_automaticos(equipo, componente, aceite_lubricante):
 # Interfaz de usuario para hacer predicciones
 st.subheader("Predicción Automática de Criticidad")
 
-# Equipos generados en el script
-equipos = [
-    "CATERPILLAR 797F", "CATERPILLAR 988H", "CATERPILLAR 24M", "KOMATSU 930-E4",
-    "KOMATSU 930E-4SE", "KOMATSU 980 E5", "KOMATSU 930 E3", "KOMATSU 930 E4", "KOMATSU 930 E5",
-    "KOMATSU 950 E3", "CAEX", "KOMATSU 950 E4", "KOMATSU 960 E2-K"
-]
+# Equipos del catálogo compartido
+equipos = etiquetas("Equipo")
 equipo = st.selectbox("Selecciona Equipo:", equipos)
 
-# Componentes generados en el script
-componentes = [
-    "MANDO FINAL", "TRANSMISIÓN", "DIFERENCIAL DEL", "MOTOR", "SISTEMA HIDRAULICO",
-    "MANDO FINAL TRA.DER", "MANDO FINAL TRA.IZQ", "MASA DERECHA", "MASA IZQUIERDA",
-    "MOTOR TRACCION IZQ", "MOTOR TRACCION DER", "DIFERENCIAL TRA"
-]
+# Componentes del catálogo compartido
+componentes = etiquetas("Componente")
 componente = st.selectbox("Selecciona Componente:", componentes)
 
 # Aceites Lubricantes asociados a los componentes
-aceites_lubricantes = {
-    "MANDO FINAL": "MOBIL MOBILTRANS HD 30",
-    "TRANSMISIÓN": "MOBIL MOBILTRANS HD 30",
-    "DIFERENCIAL DEL": "MOBIL MOBILTRANS HD 30",
-    "MOTOR": "MOBIL DELVAC 15W40",
-    "SISTEMA HIDRAULICO": "MOBIL DTE 24",
-    "MANDO FINAL TRA.DER": "MOBIL MOBILTRANS HD 30",
-    "MANDO FINAL TRA.IZQ": "MOBIL MOBILTRANS HD 30",
-    "MASA DERECHA": "MOBIL MOBILTRANS HD 30",
-    "MASA IZQUIERDA": "MOBIL MOBILTRANS HD 30",
-    "MOTOR TRACCION IZQ": "MOBIL SHC GEAR 680",
-    "MOTOR TRACCION DER": "MOBIL SHC GEAR 680",
-    "DIFERENCIAL TRA": "MOBIL MOBILTRANS HD 30"
-}
+aceites_lubricantes = aceite_por_componente()
 aceite_lubricante = aceites_lubricantes.get(componente, "No especificado")
 st.write(f"Aceite Lubricante: {aceite_lubricante}")
 
@@ -123,6 +111,10 @@ input_data = pd.DataFrame({
 if st.button("Predecir"):
     prediccion = predecir_criticidad(input_data)
     st.success(f"Nivel de Criticidad Predicho: {prediccion[0]}")
+    st.info(f"Nivel de Criticidad según Límites: {calcular_criticidad(input_data)[0]}")
+    faltantes = pipeline.faltantes(input_data)
+    if faltantes:
+        st.caption(f"Completados con la mediana del entrenamiento: {', '.join(faltantes)}")
 ######################################### Fin Modelo de ML ###################################
 
 
@@ -163,17 +155,71 @@ div.stButton > button:hover {
 st.title("📊 Dashboard de Monitoreo Análisis Tribológico")
 st.title("Muestra Generada cada 2 hrs")
 
-# Función para cargar datos
-@st.cache_data(ttl=60)  # Actualiza los datos cada 60 segundos
-def cargar_datos():
-    try:
-        return pd.read_csv("data/datos_generados.csv")
-    except FileNotFoundError:
-        st.error("El archivo 'datos_generados.csv' no existe. Asegúrate de que el script de generación de datos esté funcionando.")
-        return pd.DataFrame()
-
-# Cargar datos
-df = cargar_datos()
+# Cargador incremental, uno por proceso y periodo, compartido por todas las
+# sesiones: carga el periodo desde el almacén y después solo lee las filas
+# nuevas del CSV (el inicio del periodo cambia una vez por día)
+@st.cache_resource(max_entries=len(PERIODOS))
+def cargador_datos(desde=None):
+    return CargadorIncremental(desde=desde)
+
+# Función para cargar datos (solo el periodo elegido). Todas las sesiones
+# comparten el mismo DataFrame (cache_resource) en vez de tener cada una su copia.
+@st.cache_resource(ttl=60)  # Actualiza los datos cada 60 segundos
+def cargar_datos(desde=None):
+    df = cargador_datos(desde).actualizar()
+    df = agregar_archivo(df, desde)  # Solo si el periodo va más atrás que los datos calientes
+    if df.empty:
+        st.error("No hay datos en el archivo. Asegúrate de que el script de generación de datos esté funcionando.")
+    return df
+
+# Tendencia semanal desde los agregados (data/agregados): se leen los resúmenes
+# por día/semana ya calculados en vez de agrupar todas las muestras
+@st.cache_data(ttl=60)
+def cargar_tendencia(analito, desde=None, equipos=(), componentes=(), criticidades=()):
+    sincronizar_agregados()
+    filtros = {"Equipo": equipos, "Componente": componentes, "Criticidad": criticidades}
+    return tendencia_semanal(analito, desde=desde, filtros={c: v for c, v in filtros.items() if v})
+
+# Backend SQLite (BACKEND_DATOS=sqlite): los filtros se resuelven con SQL sobre
+# índices y solo las filas que coinciden se cargan en pandas. SQLite tiene solo
+# las muestras calientes: si el periodo llega al archivo histórico, se suman las
+# archivadas con los mismos filtros
+@st.cache_data(ttl=60)
+def cargar_opciones_sqlite(desde=None):
+    sincronizar()
+    dimensiones = ["Equipo", "Componente", "Criticidad"]
+    opciones = {d: valores_dimension(d, desde=desde) for d in dimensiones}
+    viejas = agregar_archivo(pd.DataFrame(), desde, columnas=dimensiones)
+    if not viejas.empty:
+        opciones = {d: sorted(set(v) | set(viejas[d].dropna().astype(str))) for d, v in opciones.items()}
+    return opciones
+
+@st.cache_data(ttl=60)
+def cargar_recientes_sqlite(desde=None, limite=5_000):
+    df = leer_sqlite(desde=desde, limite=limite)
+    if len(df) < limite:
+        df = agregar_archivo(df, desde)
+        df = df.sort_values("Fecha", ascending=False, kind="stable").head(limite)
+    return df
+
+@st.cache_data(ttl=60)
+def cargar_filtrado_sqlite(desde=None, equipos=(), componentes=(), criticidades=()):
+    filtros = {"Equipo": equipos, "Componente": componentes, "Criticidad": criticidades}
+    filtros = {c: v for c, v in filtros.items() if v}
+    return agregar_archivo(leer_sqlite(desde=desde, filtros=filtros), desde, filtros=filtros)
+
+# Periodo a cargar
+st.sidebar.header("📅 Periodo")
+periodo = st.sidebar.selectbox("Selecciona Periodo:", list(PERIODOS), index=len(PERIODOS) - 1)
+desde = inicio_periodo(periodo)
+
+# Cargar datos (con SQLite, solo las últimas muestras para la vista completa)
+if usar_sqlite():
+    opciones = cargar_opciones_sqlite(desde)
+    df = cargar_recientes_sqlite(desde)
+else:
+    df = cargar_datos(desde).copy(deep=False)  # Copia liviana: los cambios no tocan el compartido
+    opciones = {c: df[c].unique() for c in ("Equipo", "Componente", "Criticidad")} if not df.empty else {}
 
 # Verificar si el DataFrame está vacío
 if df.empty:
@@ -181,26 +227,30 @@ if df.empty:
 else:
     # Mostrar vista previa de los datos completos (colapsable)
     with st.expander("📋 Datos Completos"):
-        st.dataframe(df)
+        st.dataframe(con_codigo_iso(df))
 
     # Filtros
     st.sidebar.header("🔍 Filtros")
-    equipo_seleccionado = st.sidebar.multiselect("Selecciona Equipo:", df["Equipo"].unique())
-    componente_seleccionado = st.sidebar.multiselect("Selecciona Componente:", df["Componente"].unique())
-    criticidad_seleccionada = st.sidebar.multiselect("Selecciona Nivel de Criticidad:", df["Criticidad"].unique())
+    equipo_seleccionado = st.sidebar.multiselect("Selecciona Equipo:", opciones["Equipo"])
+    componente_seleccionado = st.sidebar.multiselect("Selecciona Componente:", opciones["Componente"])
+    criticidad_seleccionada = st.sidebar.multiselect("Selecciona Nivel de Criticidad:", opciones["Criticidad"])
 
     # Filtrar datos
-    df_filtrado = df
-    if equipo_seleccionado:
-        df_filtrado = df_filtrado[df_filtrado["Equipo"].isin(equipo_seleccionado)]
-    if componente_seleccionado:
-        df_filtrado = df_filtrado[df_filtrado["Componente"].isin(componente_seleccionado)]
-    if criticidad_seleccionada:
-        df_filtrado = df_filtrado[df_filtrado["Criticidad"].isin(criticidad_seleccionada)]
+    if usar_sqlite():
+        df_filtrado = cargar_filtrado_sqlite(desde, tuple(equipo_seleccionado), tuple(componente_seleccionado),
+                                             tuple(criticidad_seleccionada))
+    else:
+        df_filtrado = df
+        if equipo_seleccionado:
+            df_filtrado = df_filtrado[df_filtrado["Equipo"].isin(equipo_seleccionado)]
+        if componente_seleccionado:
+            df_filtrado = df_filtrado[df_filtrado["Componente"].isin(componente_seleccionado)]
+        if criticidad_seleccionada:
+            df_filtrado = df_filtrado[df_filtrado["Criticidad"].isin(criticidad_seleccionada)]
 
     # Mostrar datos filtrados (colapsable)
     with st.expander("🎯 Datos Filtrados"):
-        st.dataframe(df_filtrado)
+        st.dataframe(con_codigo_iso(df_filtrado))
 
     # Indicador de Semáforo
     st.markdown("#### 🚦 Indicador de Semáforo")
@@ -260,17 +310,8 @@ else:
 # Gráfico de Dispersión: Tendencia de Viscosidad
 with col1:
     st.markdown("#### 📈 Dispersión de Viscosidad")
-    df_filtrado['Fecha'] = pd.to_datetime(df_filtrado['Fecha'], format='mixed', errors='coerce')
-    
-    # Verificación opcional
-    if df_filtrado['Fecha'].isna().any():
-        st.warning("Advertencia: Algunas fechas no pudieron ser convertidas correctamente")
-    
-    df_agrupado = (
-        df_filtrado.groupby([pd.Grouper(key="Fecha", freq="W"), "Componente"])
-        .mean(numeric_only=True)
-        .reset_index()
-    )
+    df_agrupado = cargar_tendencia("Viscosidad 100°C cSt(mm2/s)", desde, tuple(equipo_seleccionado),
+                                   tuple(componente_seleccionado), tuple(criticidad_seleccionada))
 # Gráfico de Distribución de Residuo Ferroso
 with col2:
     st.markdown("#### 📊 Distribución de Residuo Ferroso")
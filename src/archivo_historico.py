@@ -0,0 +1,206 @@
+import argparse
+import glob
+import io
+import json
+import os
+import shutil
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from rutas import ARCHIVO_DATOS, RAIZ_ALMACEN, RAIZ_AGREGADOS, RAIZ_ARCHIVO
+from esquema import aplicar_esquema, dtypes_csv
+import almacen_columnar
+from almacen_columnar import compactar_mes, guardar_lote, leer_dataset, meses_disponibles
+from escritor_datos import leer_cola_csv, leer_cabecera
+from carga_incremental import concatenar
+from secuencias import bloqueo_archivo
+import agregados
+
+# Niveles de datos: calientes (CSV y almacén) y archivo histórico (frío).
+#
+#   data/datos_generados.csv                   (últimos DIAS_CALIENTES días)
+#   data/archivo/2023-04/datos.parquet ...     (muestras más viejas, Parquet con zstd)
+#
+# archivar() mueve las muestras anteriores al corte desde el CSV al archivo:
+# el CSV se reescribe con las líneas que quedan (tal cual, sin volver a
+# serializarlas). La base SQLite y el caché de columnas se achican solos,
+# porque se derivan del CSV; el almacén descarta las muestras archivadas y
+# adopta el CSV nuevo, sin volver a importarlo. Los dashboards y el entrenamiento
+# leen solo los datos calientes; el archivo se abre únicamente en consultas
+# históricas explícitas (leer_historico, o un periodo que va más atrás que el corte).
+#
+# Consistencia entre niveles:
+#   - Las filas se cuentan antes de publicar nada: calientes + archivadas = antes.
+#   - Los agregados se ponen al día antes de reescribir el CSV y luego solo
+#     adoptan el CSV nuevo, así que siguen contando las muestras archivadas.
+#   - Las muestras se escriben primero en data/archivo.pendiente/ con una marca
+#     que guarda el inodo del CSV nuevo. Si el proceso se corta, la próxima vez
+#     se termina de mover lo pendiente (si el CSV ya se reemplazó) o se descarta
+#     (si no), nunca quedan filas repetidas ni perdidas.
+#   - Los generadores escriben bajo el mismo bloqueo del CSV, así que esperan
+#     mientras se reescribe.
+
+DIAS_CALIENTES = int(os.environ.get("DIAS_CALIENTES", 365))  # Cubre el periodo "Último año" de los dashboards
+COMPRESION_ARCHIVO = "zstd"
+MARCA_PENDIENTE = "marca.json"
+
+# Función para obtener la fecha de corte: lo anterior va al archivo
+def corte_caliente(dias=DIAS_CALIENTES):
+    return pd.Timestamp.today().normalize() - pd.Timedelta(days=dias)
+
+def _carpeta_pendiente(raiz_archivo):
+    return raiz_archivo + ".pendiente"
+
+# Función para contar las filas de un almacén Parquet sin leer datos (metadatos)
+def _contar_almacen(raiz):
+    return sum(pq.ParquetFile(archivo).metadata.num_rows
+               for mes in meses_disponibles(raiz) for archivo in glob.glob(os.path.join(raiz, mes, "*.parquet")))
+
+# Función para contar las filas del CSV (líneas completas, sin la cabecera)
+def _contar_csv(archivo_csv):
+    if leer_cabecera(archivo_csv) is None:
+        return 0
+    return sum(texto.count("\n") for texto, _ in leer_cola_csv(archivo_csv))
+
+# Función para contar las muestras de cada nivel
+def contar_muestras(archivo_csv=ARCHIVO_DATOS, raiz_archivo=RAIZ_ARCHIVO):
+    calientes, archivadas = _contar_csv(archivo_csv), _contar_almacen(raiz_archivo)
+    return {"calientes": calientes, "archivadas": archivadas, "total": calientes + archivadas}
+
+# Función para leer hasta qué fecha llega el archivo (None si está vacío)
+def archivo_hasta(raiz_archivo=RAIZ_ARCHIVO):
+    try:
+        with open(os.path.join(raiz_archivo, ".hasta"), encoding="utf-8") as f:
+            return pd.Timestamp(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+# Función para terminar (o descartar) un archivado que quedó a medias
+def _resolver_pendiente(archivo_csv, raiz_archivo):
+    for temporal in glob.glob(f"{archivo_csv}.archivando-*"):
+        os.remove(temporal)  # CSV nuevo de un archivado que no llegó a reemplazarse
+    pendiente = _carpeta_pendiente(raiz_archivo)
+    if not os.path.isdir(pendiente):
+        return
+    try:
+        with open(os.path.join(pendiente, MARCA_PENDIENTE), encoding="utf-8") as f:
+            marca = json.load(f)
+    except FileNotFoundError:
+        marca = None
+    if marca is not None and os.stat(archivo_csv).st_ino == marca["inodo"]:
+        _publicar_pendiente(pendiente, raiz_archivo, pd.Timestamp(marca["hasta"]))  # El CSV ya no tiene esas filas
+    shutil.rmtree(pendiente)
+
+# Función para mover las partes pendientes al archivo y compactar los meses tocados
+def _publicar_pendiente(pendiente, raiz_archivo, hasta):
+    os.makedirs(raiz_archivo, exist_ok=True)
+    formato = os.path.join(raiz_archivo, ".formato")
+    if not os.path.exists(formato):
+        shutil.copyfile(os.path.join(pendiente, ".formato"), formato)
+    for mes in meses_disponibles(pendiente):
+        destino = os.path.join(raiz_archivo, mes)
+        os.makedirs(destino, exist_ok=True)
+        for parte in glob.glob(os.path.join(pendiente, mes, "*.parquet")):
+            os.replace(parte, os.path.join(destino, os.path.basename(parte)))
+        compactar_mes(destino, COMPRESION_ARCHIVO)
+    anterior = archivo_hasta(raiz_archivo)
+    with open(os.path.join(raiz_archivo, ".hasta"), "w", encoding="utf-8") as f:
+        f.write(f"{max(hasta, anterior) if anterior is not None else hasta}\n")
+
+# Función para mover al archivo las muestras anteriores al corte
+def archivar(dias=DIAS_CALIENTES, archivo_csv=ARCHIVO_DATOS, raiz_archivo=RAIZ_ARCHIVO, raiz=RAIZ_ALMACEN,
+             raiz_agregados=RAIZ_AGREGADOS):
+    cabecera = leer_cabecera(archivo_csv)
+    if cabecera is None:
+        return 0
+    corte = corte_caliente(dias)
+    pendiente = _carpeta_pendiente(raiz_archivo)
+    with bloqueo_archivo(archivo_csv):  # Los escritores esperan mientras se reescribe
+        _resolver_pendiente(archivo_csv, raiz_archivo)
+        agregados.sincronizar(archivo_csv, raiz_agregados, raiz_archivo)  # Todo resumido antes de mover
+        almacen_columnar.asegurar_almacen(raiz, archivo_csv)  # Y todo en el almacén
+
+        inicio = time.perf_counter()
+        archivadas_antes = _contar_almacen(raiz_archivo)
+        tipos = dtypes_csv(cabecera)
+        temporal = f"{archivo_csv}.archivando-{os.getpid()}"
+        filas = calientes = archivadas = 0
+        hasta = None  # Fecha de la muestra archivada más nueva
+        with open(archivo_csv, "rb") as f, open(temporal, "wb") as salida:
+            salida.write(f.readline())  # La cabecera tal cual
+            for texto, _ in leer_cola_csv(archivo_csv):
+                lineas = texto.encode("utf-8").splitlines(keepends=True)
+                bloque = aplicar_esquema(pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=tipos))
+                if len(bloque) != len(lineas):
+                    raise ValueError(f"{archivo_csv}: no se pudo asociar cada fila con su línea; no se archiva nada")
+                viejas = (bloque["Fecha"] < corte).to_numpy()
+                if viejas.any():
+                    guardar_lote(bloque[viejas], pendiente, compactar_desde=None, compresion=COMPRESION_ARCHIVO)
+                    maxima = bloque["Fecha"][viejas].max()
+                    hasta = maxima if hasta is None else max(hasta, maxima)
+                salida.write(b"".join(linea for linea, vieja in zip(lineas, viejas) if not vieja))
+                filas += len(lineas)
+                archivadas += int(viejas.sum())
+                calientes += int((~viejas).sum())
+            salida.flush()
+            os.fsync(salida.fileno())
+
+        if archivadas == 0:
+            os.remove(temporal)
+            shutil.rmtree(pendiente, ignore_errors=True)
+            return 0
+        if filas != calientes + archivadas or _contar_almacen(pendiente) != archivadas or _contar_csv(temporal) != calientes:
+            os.remove(temporal)
+            shutil.rmtree(pendiente, ignore_errors=True)
+            raise RuntimeError(f"El conteo de filas no cuadra al archivar {archivo_csv}; no se cambió nada")
+
+        # Marca con el inodo del CSV nuevo (os.replace lo conserva) y recién entonces se reemplaza
+        with open(os.path.join(pendiente, MARCA_PENDIENTE), "w", encoding="utf-8") as f:
+            json.dump({"inodo": os.stat(temporal).st_ino, "hasta": str(hasta), "filas": archivadas}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, archivo_csv)
+        agregados.adoptar_csv(archivo_csv, raiz_agregados)
+        _resolver_pendiente(archivo_csv, raiz_archivo)
+        almacen_columnar.adoptar_csv(archivo_csv, raiz, antes=corte)
+
+    if _contar_almacen(raiz_archivo) != archivadas_antes + archivadas:
+        raise RuntimeError(f"{raiz_archivo}: se esperaban {archivadas_antes + archivadas:,} filas archivadas")
+    print(f"{archivadas:,} muestras anteriores a {corte:%Y-%m-%d} archivadas en {raiz_archivo}, "
+          f"{calientes:,} quedan en {archivo_csv} ({time.perf_counter() - inicio:.2f} s)")
+    return archivadas
+
+# Función para leer muestras de los dos niveles (consulta histórica explícita):
+# solo se abren los meses del archivo que caen dentro del rango
+def leer_historico(columnas=None, desde=None, hasta=None, filtros=None, raiz=RAIZ_ALMACEN, raiz_archivo=RAIZ_ARCHIVO):
+    viejas = leer_dataset(columnas, desde, hasta, raiz_archivo, filtros, asegurar=False)
+    calientes = leer_dataset(columnas, desde, hasta, raiz, filtros)
+    if viejas.empty:
+        return calientes
+    return concatenar(viejas, calientes) if not calientes.empty else viejas
+
+# Función para completar con el archivo los datos calientes de un dashboard
+# cuando el periodo pedido va más atrás que lo que quedó caliente (las muestras
+# de los dos niveles no se repiten, así que basta con sumar las archivadas).
+# "filtros" se aplica también a las archivadas, para los resultados ya filtrados
+def agregar_archivo(df, desde=None, raiz_archivo=RAIZ_ARCHIVO, columnas=None, filtros=None):
+    hasta = archivo_hasta(raiz_archivo)
+    if hasta is None or (desde is not None and pd.Timestamp(desde) > hasta):
+        return df
+    viejas = leer_dataset(columnas, desde, None, raiz_archivo, filtros, asegurar=False)
+    if viejas.empty:
+        return df
+    return concatenar(viejas, df) if not df.empty else viejas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mueve las muestras viejas del CSV al archivo histórico comprimido")
+    parser.add_argument("--dias", type=int, default=DIAS_CALIENTES, help="Días de muestras que quedan calientes")
+    parser.add_argument("--archivo-csv", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz-archivo", default=RAIZ_ARCHIVO)
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    parser.add_argument("--raiz-agregados", default=RAIZ_AGREGADOS)
+    parser.add_argument("--contar", action="store_true", help="Solo mostrar cuántas muestras hay en cada nivel")
+    args = parser.parse_args()
+    if not args.contar:
+        archivar(args.dias, args.archivo_csv, args.raiz_archivo, args.raiz, args.raiz_agregados)
+    print(contar_muestras(args.archivo_csv, args.raiz_archivo))
@@ -0,0 +1,93 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from almacen_columnar import leer_dataset
+from esquema import leer_csv
+from almacen_sqlite import sincronizar, leer_sqlite
+from cache_columnas import leer_datos
+from carga_incremental import CargadorIncremental
+from perfiles_escala import PERFILES, SEMILLA_PERFILES, FECHA_FIN, asegurar_perfil
+
+# Benchmark de carga sobre un perfil de escala fijo (ver perfiles_escala.py):
+# CSV completo (tipos inferidos y tipos del esquema) contra el almacén columnar
+# completo, con proyección de columnas y con poda por rango de fechas; y el
+# filtro de los dashboards (un equipo, nivel crítico) en pandas contra SQLite
+# con índices. También el caché .npy mapeado en memoria y la carga de los
+# dashboards: el cargador incremental (carga completa desde el almacén contra
+# leer del CSV solo las filas agregadas al final).
+
+COLUMNAS_TENDENCIA = ["Fecha", "Componente", "Viscosidad 100°C cSt(mm2/s)"]
+FILAS_COLA = 1000  # Filas que se agregan al CSV para medir la lectura incremental
+FILTROS_DASHBOARD = {"Equipo": ["CAEX"], "Criticidad": ["Critico"]}
+
+# Función para medir el tiempo de una llamada (mejor de varias repeticiones)
+def medir(funcion, repeticiones=3):
+    mejor, resultado = float("inf"), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+def reportar(nombre, segundos, df):
+    memoria = df.memory_usage(deep=True).sum() / 1e6
+    print(f"{nombre:<38} {segundos:8.3f} s  {len(df):>10,} filas  {df.shape[1]:>3} columnas  {memoria:9.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de datos por perfil de escala")
+    parser.add_argument("--perfil", choices=list(PERFILES), default="mediano")
+    parser.add_argument("--semilla", type=int, default=SEMILLA_PERFILES)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    rutas = asegurar_perfil(args.perfil, args.semilla)
+    print(f"Perfil '{args.perfil}' ({rutas['carpeta']})")
+    r = args.repeticiones
+    reportar("CSV completo (pd.read_csv)", *medir(lambda: pd.read_csv(rutas["csv"]), r))
+    reportar("CSV completo (esquema.leer_csv)", *medir(lambda: leer_csv(rutas["csv"]), r))
+    reportar("almacén completo", *medir(lambda: leer_dataset(raiz=rutas["almacen"]), r))
+    reportar("almacén, 3 columnas", *medir(lambda: leer_dataset(COLUMNAS_TENDENCIA, raiz=rutas["almacen"]), r))
+    ultimo_trimestre = pd.Timestamp(FECHA_FIN) - pd.DateOffset(months=3)
+    reportar("almacén, último trimestre", *medir(lambda: leer_dataset(desde=ultimo_trimestre, raiz=rutas["almacen"]), r))
+
+    def filtrar_en_pandas():
+        df = leer_dataset(raiz=rutas["almacen"])
+        return df[df["Equipo"].isin(FILTROS_DASHBOARD["Equipo"]) & df["Criticidad"].isin(FILTROS_DASHBOARD["Criticidad"])]
+    reportar("almacén + isin (equipo, crítico)", *medir(filtrar_en_pandas, r))
+    inicio = time.perf_counter()
+    sincronizar(rutas["csv"], rutas["sqlite"])
+    print(f"(SQLite sincronizado en {time.perf_counter() - inicio:.2f} s)")
+    reportar("SQLite indexado (equipo, crítico)", *medir(lambda: leer_sqlite(filtros=FILTROS_DASHBOARD, archivo=rutas["sqlite"]), r))
+    leer_datos(raiz=rutas["almacen"], raiz_cache=rutas["cache"])  # Construye el caché fuera de la medición
+    reportar("caché .npy mapeado", *medir(lambda: leer_datos(raiz=rutas["almacen"], raiz_cache=rutas["cache"]), r))
+    medir_incremental(rutas["csv"], r)
+
+# Carga incremental sobre una copia del CSV del perfil (con su propio almacén):
+# carga completa, y luego lectura de FILAS_COLA filas agregadas al final (se
+# repiten las últimas del archivo)
+def medir_incremental(archivo_csv, repeticiones):
+    with tempfile.TemporaryDirectory() as carpeta:
+        copia = os.path.join(carpeta, "datos_generados.csv")
+        shutil.copyfile(archivo_csv, copia)
+        with open(copia, "rb") as f:
+            cola = b"".join(f.readlines()[-FILAS_COLA:])
+        reportar("incremental, carga completa", *medir(lambda: CargadorIncremental(copia).actualizar(), repeticiones))
+        cargador = CargadorIncremental(copia)
+        cargador.actualizar()
+        mejor = float("inf")
+        for _ in range(repeticiones):
+            with open(copia, "ab") as f:
+                f.write(cola)
+            inicio = time.perf_counter()
+            df = cargador.actualizar()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        reportar(f"incremental, cola de {FILAS_COLA:,} filas", mejor, df)
+        inicio = time.perf_counter()
+        cargador.actualizar()
+        print(f"(sin filas nuevas: {(time.perf_counter() - inicio) * 1000:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import time
+import numpy as np
+from motor_generacion import crear_generador, generar_lote, ajustar_por_criticidad, sortear_criticidad
+from criticidad import NIVELES_CRITICIDAD
+
+# Benchmark: compara la ruta anterior (df.apply(ajustar_valores, axis=1))
+# contra el motor por columnas de motor_generacion.
+
+# Copia de la función por filas que usaban los generadores, solo como referencia
+def ajustar_valores_por_fila(row):
+    criticidad = row["Criticidad"]
+    if criticidad == "Normal":
+        row["Silicio (Si) ppm"] = np.random.randint(0, 15)
+        row["Hierro (Fe) ppm"] = np.random.randint(0, 100)
+        row["Aluminio (Al) ppm"] = np.random.randint(0, 10)
+        row["Cobre (Cu) ppm"] = np.random.randint(0, 15)
+        row["TAN mg KOH/g"] = np.round(np.random.uniform(0, 2.0), 2)
+        row["Residuo Ferroso Total mg/kg"] = np.random.randint(0, 200)
+    elif criticidad == "Atencion":
+        row["Silicio (Si) ppm"] = np.random.randint(15, 25)
+        row["Hierro (Fe) ppm"] = np.random.randint(100, 200)
+        row["Aluminio (Al) ppm"] = np.random.randint(10, 20)
+        row["Cobre (Cu) ppm"] = np.random.randint(15, 30)
+        row["TAN mg KOH/g"] = np.round(np.random.uniform(2.0, 3.0), 2)
+        row["Residuo Ferroso Total mg/kg"] = np.random.randint(200, 500)
+    elif criticidad == "Critico":
+        row["Silicio (Si) ppm"] = np.random.randint(25, 50)
+        row["Hierro (Fe) ppm"] = np.random.randint(200, 300)
+        row["Aluminio (Al) ppm"] = np.random.randint(20, 30)
+        row["Cobre (Cu) ppm"] = np.random.randint(30, 50)
+        row["TAN mg KOH/g"] = np.round(np.random.uniform(3.0, 4.0), 2)
+        row["Residuo Ferroso Total mg/kg"] = np.random.randint(500, 600)
+    return row
+
+# Función para medir el tiempo de una llamada (mejor de varias repeticiones)
+def medir(funcion, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+# Función para mostrar una línea de resultados
+def reportar(nombre, n, segundos):
+    print(f"{nombre:<32} {n:>10,} filas  {segundos:9.4f} s  {n / segundos:>14,.0f} filas/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de generación por columnas")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 1_000_000])
+    parser.add_argument("--max-filas-apply", type=int, default=10_000,
+                        help="Tamaño máximo para la ruta con df.apply (es muy lenta)")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = crear_generador(args.semilla)
+    for n in args.filas:
+        print(f"\n--- {n:,} filas ---")
+        df = generar_lote(n, rng)
+
+        if n <= args.max_filas_apply:
+            df_obj = df.astype({"Criticidad": object})
+            reportar("ajuste con df.apply (anterior)", n, medir(lambda: df_obj.apply(ajustar_valores_por_fila, axis=1), 1))
+
+        codigos = sortear_criticidad(rng, n)
+        columnas = {}
+        reportar("ajuste por columnas", n, medir(lambda: ajustar_por_criticidad(columnas, codigos, rng)))
+        reportar("lote completo (generar_lote)", n, medir(lambda: generar_lote(n, rng)))
+
+        # Verificar que los rangos por nivel se mantienen
+        for nivel, nombre in enumerate(NIVELES_CRITICIDAD):
+            mascara = codigos == nivel
+            if mascara.any():
+                print(f"  {nombre:<9} Fe [{columnas['Hierro (Fe) ppm'][mascara].min()}, "
+                      f"{columnas['Hierro (Fe) ppm'][mascara].max()}]  "
+                      f"TAN [{columnas['TAN mg KOH/g'][mascara].min()}, {columnas['TAN mg KOH/g'][mascara].max()}]")
+
+if __name__ == "__main__":
+    main()
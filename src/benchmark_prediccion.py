@@ -0,0 +1,89 @@
+import argparse
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from rutas import RAIZ_ALMACEN
+from almacen_columnar import leer_dataset
+from caracteristicas import COLUMNAS_CATEGORICAS
+from bosque_compacto import ARCHIVO_BOSQUE, BosqueCompacto, exportar_bosque
+from train_model import ARCHIVO_MODELO, ARCHIVO_PIPELINE
+
+# Benchmark de la preparación de características para predecir: get_dummies +
+# reindex (lo que hacían los dashboards) contra el pipeline guardado junto al
+# modelo, para una fila (DataFrame y diccionario, como la interfaz) y para lotes.
+# Se mide solo la preparación y también preparación + predict del modelo.
+# Después, el bosque de sklearn contra el bosque compacto (bosque_compacto.py):
+# tiempo de carga y latencia de predict sobre la misma matriz.
+
+TAMANOS_LOTE = [1, 100, 1000, 10_000]
+TAMANOS_BOSQUE = [1, 10, 100, 1000]
+
+# Función para medir la latencia de una llamada: mejor de "repeticiones" rondas
+# de "llamadas" llamadas seguidas, en microsegundos por llamada
+def medir(funcion, llamadas, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        mejor = min(mejor, (time.perf_counter() - inicio) / llamadas)
+    return mejor * 1e6
+
+def reportar(nombre, filas, microsegundos):
+    print(f"{nombre:<40} {filas:>7,} filas  {microsegundos:12.1f} µs  {microsegundos / filas:9.2f} µs/fila")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia de la preparación de características")
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    parser.add_argument("--modelo", default=ARCHIVO_MODELO)
+    parser.add_argument("--pipeline", default=ARCHIVO_PIPELINE)
+    parser.add_argument("--compacto", default=ARCHIVO_BOSQUE)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    modelo, pipeline = joblib.load(args.modelo), joblib.load(args.pipeline)
+    df = leer_dataset(columnas=pipeline.numericas + list(pipeline.categorias), raiz=args.raiz)
+    df = df.tail(max(TAMANOS_LOTE)).reset_index(drop=True)
+
+    def anterior(datos):
+        return pd.get_dummies(datos, columns=COLUMNAS_CATEGORICAS).reindex(columns=pipeline.nombres, fill_value=0)
+
+    if not np.array_equal(anterior(df).to_numpy(dtype=np.float64), pipeline.transformar(df)):
+        raise RuntimeError("El pipeline no arma la misma matriz que get_dummies + reindex")
+    print(f"Matrices iguales en {len(df):,} filas, {len(pipeline.nombres)} características\n")
+
+    r = args.repeticiones
+    fila = {c: df[c].iloc[0] for c in df.columns}
+    reportar("una fila, diccionario -> pipeline", 1, medir(lambda: pipeline.transformar(fila), 200, r))
+    for filas in TAMANOS_LOTE:
+        lote = df.head(filas)
+        llamadas = max(1, 200 // filas)
+        reportar("get_dummies + reindex", filas, medir(lambda: anterior(lote), llamadas, r))
+        reportar("pipeline.transformar", filas, medir(lambda: pipeline.transformar(lote), llamadas, r))
+        reportar("get_dummies + reindex + predict", filas, medir(lambda: modelo.predict(anterior(lote).to_numpy()), llamadas, r))
+        reportar("pipeline.transformar + predict", filas, medir(lambda: modelo.predict(pipeline.transformar(lote)), llamadas, r))
+    medir_bosque(modelo, pipeline.transformar(df), args, r)
+
+# Bosque de sklearn (joblib) contra el bosque compacto
+def medir_bosque(modelo, X, args, repeticiones):
+    if not os.path.exists(args.compacto):
+        exportar_bosque(modelo, args.compacto)
+    compacto = BosqueCompacto.cargar(args.compacto)
+    if not np.array_equal(modelo.predict_proba(X), compacto.predict_proba(X)):
+        raise RuntimeError("El bosque compacto no da las mismas probabilidades que sklearn")
+    print(f"\nProbabilidades idénticas en {len(X):,} filas ({compacto.n_estimators} árboles, "
+          f"profundidad {compacto.profundidad})")
+    print(f"{'carga joblib':<40} {medir(lambda: joblib.load(args.modelo), 1, repeticiones) / 1e3:12.1f} ms  "
+          f"{os.path.getsize(args.modelo) / 1e3:8.0f} KB")
+    print(f"{'carga compacto':<40} {medir(lambda: BosqueCompacto.cargar(args.compacto), 1, repeticiones) / 1e3:12.1f} ms  "
+          f"{os.path.getsize(args.compacto) / 1e3:8.0f} KB")
+    for filas in TAMANOS_BOSQUE:
+        lote = X[:filas]
+        llamadas = max(1, 100 // filas)
+        reportar("sklearn predict", filas, medir(lambda: modelo.predict(lote), llamadas, repeticiones))
+        reportar("compacto predict", filas, medir(lambda: compacto.predict(lote), llamadas, repeticiones))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import os
+import time
+import numpy as np
+
+# Bosque de criticidad exportado a arreglos NumPy contiguos, para predecir en
+# los dashboards sin cargar sklearn ni el modelo con joblib.
+#
+#   data/modelo_compacto.npz
+#     caracteristica  (int32, un elemento por nodo de todos los árboles)
+#     umbral          (float64)
+#     hijos           (int32, [derecho, izquierdo] con índices globales)
+#     nan_izquierda   (bool, a dónde va un valor faltante en cada nodo)
+#     valores         (float64, probabilidades de cada clase en el nodo)
+#     raices          (int32, primer nodo de cada árbol)
+#     clases, profundidad
+#
+# Las hojas apuntan a sí mismas, así que el recorrido es por niveles: todas las
+# filas avanzan un nivel en todos los árboles a la vez, con operaciones sobre
+# arreglos (n filas x árboles), hasta que todas llegan a una hoja. Las comparaciones
+# se hacen como en sklearn (X en float32 contra umbrales float64) y las
+# probabilidades se suman árbol por árbol en el mismo orden y se dividen por la
+# cantidad de árboles, así que predict y predict_proba dan exactamente lo mismo
+# que el RandomForestClassifier.
+
+ARCHIVO_BOSQUE = "data/modelo_compacto.npz"
+FILAS_POR_BLOQUE = 256
+
+# Función para aplanar un RandomForestClassifier (una sola salida) en arreglos
+def aplanar_bosque(modelo):
+    caracteristicas, umbrales, hijos, nan_izquierda, valores, raices = [], [], [], [], [], []
+    inicio = 0
+    for estimador in modelo.estimators_:
+        arbol = estimador.tree_
+        hoja = arbol.children_left < 0
+        propios = np.arange(arbol.node_count)
+        izquierdo = np.where(hoja, propios, arbol.children_left) + inicio
+        derecho = np.where(hoja, propios, arbol.children_right) + inicio
+        # value ya trae la fracción de cada clase en el nodo (sklearn >= 1.4, el
+        # mismo que admite faltantes) y DecisionTreeClassifier.predict_proba la
+        # devuelve tal cual: volver a normalizar cambia el último decimal
+        valor = arbol.value[:, 0, :modelo.n_classes_]
+        caracteristicas.append(np.where(hoja, 0, arbol.feature).astype(np.int32))
+        umbrales.append(np.where(hoja, 0.0, arbol.threshold))
+        hijos.append(np.column_stack([derecho, izquierdo]).astype(np.int32))
+        nan_izquierda.append(np.asarray(arbol.missing_go_to_left, dtype=bool))
+        valores.append(valor)
+        raices.append(inicio)
+        inicio += arbol.node_count
+    return {
+        "caracteristica": np.concatenate(caracteristicas),
+        "umbral": np.concatenate(umbrales),
+        "hijos": np.concatenate(hijos),
+        "nan_izquierda": np.concatenate(nan_izquierda),
+        "valores": np.concatenate(valores),
+        "raices": np.asarray(raices, dtype=np.int32),
+        "clases": np.asarray(modelo.classes_).astype(str),
+        "profundidad": np.int32(max(e.tree_.max_depth for e in modelo.estimators_)),
+    }
+
+# Función para exportar el bosque al archivo compacto (temporal + rename)
+def exportar_bosque(modelo, archivo=ARCHIVO_BOSQUE):
+    temporal = f"{archivo}.{os.getpid()}.tmp.npz"
+    np.savez(temporal, **aplanar_bosque(modelo))
+    os.replace(temporal, archivo)
+    return archivo
+
+class BosqueCompacto:
+    def __init__(self, arreglos):
+        # Índices como intp (los usa take sin convertir) e hijos aplanados: 2 * nodo + (va a la izquierda)
+        self.caracteristica = arreglos["caracteristica"].astype(np.intp)
+        self.umbral = arreglos["umbral"]
+        self.hijos = arreglos["hijos"].astype(np.intp).ravel()
+        self.nan_izquierda = arreglos["nan_izquierda"]
+        self.valores = arreglos["valores"]
+        self.raices = arreglos["raices"].astype(np.intp)
+        self.classes_ = arreglos["clases"]
+        self.profundidad = int(arreglos["profundidad"])
+        self.hoja = self.hijos[0::2] == np.arange(len(self.umbral))
+
+    @classmethod
+    def cargar(cls, archivo=ARCHIVO_BOSQUE):
+        with np.load(archivo) as arreglos:
+            return cls({nombre: arreglos[nombre] for nombre in arreglos.files})
+
+    @property
+    def n_estimators(self):
+        return len(self.raices)
+
+    # Función para obtener la hoja de cada fila en cada árbol (n filas x árboles).
+    # En cada nivel solo siguen los pares (fila, árbol) que todavía no llegaron a una hoja.
+    def hojas(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        filas, columnas = X.shape
+        X = X.ravel()
+        faltantes = bool(np.isnan(X).any())
+        nodos = np.tile(self.raices, filas)
+        activos = np.arange(nodos.size)
+        actuales = nodos
+        inicio_fila = np.repeat(np.arange(filas, dtype=np.intp) * columnas, len(self.raices))
+        for _ in range(self.profundidad):
+            valores = X.take(inicio_fila + self.caracteristica.take(actuales))
+            izquierda = valores <= self.umbral.take(actuales)
+            if faltantes:
+                izquierda |= np.isnan(valores) & self.nan_izquierda.take(actuales)
+            actuales = self.hijos.take(2 * actuales + izquierda)
+            nodos[activos] = actuales
+            siguen = np.flatnonzero(~self.hoja.take(actuales))
+            if not len(siguen):
+                break
+            activos, actuales, inicio_fila = activos.take(siguen), actuales.take(siguen), inicio_fila.take(siguen)
+        return nodos.reshape(filas, len(self.raices))
+
+    # Probabilidades por bloques de FILAS_POR_BLOQUE filas (los arreglos de cada
+    # nivel entran en caché); valores[(árboles, n)] se suma por el primer eje:
+    # árbol por árbol, en orden, igual que sklearn
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        proba = np.empty((len(X), len(self.classes_)), dtype=np.float64)
+        for inicio in range(0, len(X), FILAS_POR_BLOQUE):
+            hojas = self.hojas(X[inicio:inicio + FILAS_POR_BLOQUE])
+            proba[inicio:inicio + len(hojas)] = np.add.reduce(self.valores[hojas.T], axis=0)
+        proba /= len(self.raices)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+if __name__ == "__main__":
+    from train_model import ARCHIVO_MODELO
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Exporta el bosque entrenado a arreglos NumPy")
+    parser.add_argument("--modelo", default=ARCHIVO_MODELO)
+    parser.add_argument("--archivo", default=ARCHIVO_BOSQUE)
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    modelo = joblib.load(args.modelo)
+    exportar_bosque(modelo, args.archivo)
+    print(f"{modelo.n_estimators} árboles exportados a {args.archivo} "
+          f"({os.path.getsize(args.archivo) / 1e3:.0f} KB, {time.perf_counter() - inicio:.2f} s)")
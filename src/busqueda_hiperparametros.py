@@ -0,0 +1,197 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from almacen_columnar import leer_dataset, columnas_disponibles
+from caracteristicas import PipelineCaracteristicas
+from bosque_compacto import BosqueCompacto, aplanar_bosque
+from train_model import ARCHIVO_HIPERPARAMETROS, columnas_a_eliminar
+
+# Búsqueda de hiperparámetros del bosque de criticidad por mitades sucesivas
+# (successive halving), en un pool de procesos y con un presupuesto de tiempo.
+#
+# Se sortean CANDIDATOS combinaciones de ESPACIO. En la primera ronda cada una
+# se entrena con pocas filas; en cada ronda sigue 1 de cada FACTOR (las de
+# mejor exactitud en validación) y las filas se multiplican por FACTOR, hasta
+# que la última ronda usa todo el conjunto de entrenamiento. La partición
+# entrenamiento/validación es la misma del entrenamiento completo (80/20, semilla 42).
+#
+# La matriz codificada se arma una sola vez y se guarda como .npy en una carpeta
+# temporal; cada proceso la abre mapeada en memoria, así que los candidatos no
+# vuelven a leer el almacén ni a codificar, y la matriz no viaja por el pool.
+#
+# De cada candidato se anota en data/busqueda_hiperparametros.csv la exactitud,
+# el tiempo de ajuste y la latencia de predicción con el bosque compacto (una
+# fila, y por fila en un lote de FILAS_LOTE_LATENCIA), que es lo que usan los
+# dashboards. Con varios procesos en una máquina con pocos núcleos, las
+# latencias y tiempos se miden con los otros candidatos corriendo al lado.
+#
+# El presupuesto se revisa mientras se esperan resultados: al agotarse se
+# termina el pool (multiprocessing.Pool), con los candidatos que no empezaron
+# y los que están entrenando (sus resultados se descartan), y gana el mejor de la ronda más
+# avanzada que haya dado resultados. Los parámetros ganadores
+# van a data/hiperparametros.json, que usa el próximo entrenamiento completo.
+
+ARCHIVO_BUSQUEDA = "data/busqueda_hiperparametros.csv"
+ESPACIO = {
+    "n_estimators": [50, 100, 200],  # Por debajo de MAX_ARBOLES, para que el incremental tenga margen
+    "max_depth": [None, 8, 12, 16],
+    "min_samples_leaf": [1, 2, 5, 10],
+    "max_features": ["sqrt", 0.5],
+}
+CANDIDATOS = 27
+FACTOR = 3
+FILAS_MINIMAS = 500
+PRESUPUESTO_SEGUNDOS = 600
+FILAS_LOTE_LATENCIA = 1000
+COLUMNAS_REGISTRO = ["fecha", "ronda", "filas", "n_estimators", "max_depth", "min_samples_leaf", "max_features",
+                     "exactitud", "segundos_ajuste", "latencia_fila_us", "latencia_lote_us_fila"]
+
+_matrices = {}  # Matrices ya abiertas en este proceso, por carpeta
+
+# Función para guardar la matriz codificada (entrenamiento y validación) en "carpeta"
+def preparar_matrices(carpeta):
+    columnas = [c for c in columnas_disponibles() if c not in columnas_a_eliminar]
+    df = leer_dataset(columnas=columnas)
+    # Primero la partición (la misma que train_test_split sobre X e y) y el
+    # pipeline ajustado solo con entrenamiento, para no filtrar la validación
+    entrenamiento, validacion = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    pipeline = PipelineCaracteristicas.ajustar(df.iloc[entrenamiento])
+    _, y = np.unique(df["Criticidad"].astype(str).to_numpy(), return_inverse=True)  # La clase como código
+    for sufijo, filas in {"": entrenamiento, "_val": validacion}.items():
+        X = pipeline.transformar(df.iloc[filas]).astype(np.float32)  # float32 como lo usa el bosque
+        np.save(os.path.join(carpeta, f"X{sufijo}.npy"), np.ascontiguousarray(X))
+        np.save(os.path.join(carpeta, f"y{sufijo}.npy"), np.ascontiguousarray(y[filas]))
+    return len(entrenamiento)
+
+def _abrir_matrices(carpeta):
+    if carpeta not in _matrices:
+        _matrices[carpeta] = {nombre: np.load(os.path.join(carpeta, f"{nombre}.npy"), mmap_mode="r")
+                              for nombre in ("X", "y", "X_val", "y_val")}
+    return _matrices[carpeta]
+
+# Función para medir la latencia de predict del bosque compacto (mejor de varias llamadas, en µs)
+def _latencia(bosque, X, llamadas):
+    mejor = float("inf")
+    for _ in range(llamadas):
+        inicio = time.perf_counter()
+        bosque.predict(X)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1e6
+
+# Función que corre en el pool: entrena un candidato con las primeras "filas"
+# filas y lo mide sobre la validación
+def evaluar_candidato(carpeta, parametros, filas):
+    datos = _abrir_matrices(carpeta)
+    modelo = RandomForestClassifier(random_state=42, n_jobs=1, **parametros)
+    inicio = time.perf_counter()
+    modelo.fit(datos["X"][:filas], datos["y"][:filas])
+    segundos = time.perf_counter() - inicio
+    bosque = BosqueCompacto(aplanar_bosque(modelo))
+    X_val = np.asarray(datos["X_val"])
+    predicho = modelo.classes_.take(np.argmax(bosque.predict_proba(X_val), axis=1))
+    lote = X_val[:FILAS_LOTE_LATENCIA]
+    return {**parametros, "filas": filas, "exactitud": round(float((predicho == datos["y_val"]).mean()), 4),
+            "segundos_ajuste": round(segundos, 3), "latencia_fila_us": round(_latencia(bosque, X_val[:1], 20), 1),
+            "latencia_lote_us_fila": round(_latencia(bosque, lote, 3) / len(lote), 2)}
+
+# Función para sortear los candidatos del espacio de búsqueda
+def sortear_candidatos(cantidad=CANDIDATOS, semilla=42):
+    nombres = list(ESPACIO)
+    todos = [dict(zip(nombres, valores)) for valores in itertools.product(*(ESPACIO[n] for n in nombres))]
+    return random.Random(semilla).sample(todos, min(cantidad, len(todos)))
+
+# Función para las filas de cada ronda: la última usa todo el entrenamiento
+def filas_por_ronda(filas_totales, candidatos, factor=FACTOR):
+    rondas = max(1, math.ceil(math.log(candidatos, factor)) + 1) if candidatos > 1 else 1
+    return [min(filas_totales, max(FILAS_MINIMAS, filas_totales // factor ** (rondas - 1 - r))) for r in range(rondas)]
+
+# Función para ordenar resultados: mayor exactitud y, a igual exactitud, menor latencia
+def _orden(resultado):
+    return (-resultado["exactitud"], resultado["latencia_fila_us"])
+
+def _registrar(resultados, ronda, archivo=ARCHIVO_BUSQUEDA):
+    nuevo = not os.path.exists(archivo)
+    fecha = f"{datetime.now():%Y-%m-%d %H:%M:%S}"
+    with open(archivo, "a", encoding="utf-8") as f:
+        if nuevo:
+            f.write(",".join(COLUMNAS_REGISTRO) + "\n")
+        for r in resultados:
+            valores = {**r, "fecha": fecha, "ronda": ronda}
+            f.write(",".join("" if valores[c] is None else str(valores[c]) for c in COLUMNAS_REGISTRO) + "\n")
+
+# Función para buscar hiperparámetros; devuelve el mejor resultado (o None)
+def buscar(presupuesto=PRESUPUESTO_SEGUNDOS, candidatos=CANDIDATOS, procesos=None, factor=FACTOR, semilla=42):
+    limite = time.monotonic() + presupuesto
+    vivos = sortear_candidatos(candidatos, semilla)
+    mejores = []  # Resultados de la ronda más avanzada con resultados
+    with tempfile.TemporaryDirectory(prefix="busqueda-") as carpeta:
+        inicio = time.perf_counter()
+        filas_totales = preparar_matrices(carpeta)
+        print(f"Matriz codificada: {filas_totales:,} filas de entrenamiento ({time.perf_counter() - inicio:.2f} s)")
+        pool = multiprocessing.Pool(procesos)
+        try:
+            for ronda, filas in enumerate(filas_por_ronda(filas_totales, len(vivos), factor)):
+                # Cada resultado (o excepción) llega a la cola apenas termina su candidato
+                listos = queue.SimpleQueue()
+                for parametros in vivos:
+                    pool.apply_async(evaluar_candidato, (carpeta, parametros, filas),
+                                     callback=listos.put, error_callback=listos.put)
+                resultados, agotado = [], False
+                for _ in vivos:
+                    try:
+                        resultado = listos.get(timeout=max(0.0, limite - time.monotonic()))
+                    except queue.Empty:
+                        agotado = True
+                        break
+                    if isinstance(resultado, BaseException):
+                        raise resultado
+                    resultados.append(resultado)
+                _registrar(resultados, ronda)
+                resultados.sort(key=_orden)
+                if resultados:
+                    mejores = resultados
+                    print(f"Ronda {ronda}: {len(resultados)}/{len(vivos)} candidatos con {filas:,} filas, "
+                          f"mejor exactitud {resultados[0]['exactitud']:.1%}")
+                if agotado:
+                    print(f"Presupuesto de {presupuesto} s agotado en la ronda {ronda}.")
+                    break
+                vivos = [{n: r[n] for n in ESPACIO} for r in resultados[:max(1, math.ceil(len(resultados) / factor))]]
+        finally:
+            # Sin esperar a los candidatos que siguen entrenando: el presupuesto es
+            # de reloj (si no se agotó, ya no queda ninguno)
+            pool.terminate()
+            pool.join()
+    if not mejores:
+        print("La búsqueda no llegó a evaluar ningún candidato.")
+        return None
+    mejor = mejores[0]
+    parametros = {n: mejor[n] for n in ESPACIO}
+    temporal = f"{ARCHIVO_HIPERPARAMETROS}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"parametros": parametros, "exactitud": mejor["exactitud"], "filas": mejor["filas"],
+                   "fecha": datetime.now().isoformat(timespec="seconds")}, f)
+    os.replace(temporal, ARCHIVO_HIPERPARAMETROS)
+    print(f"Mejores hiperparámetros: {parametros} (exactitud {mejor['exactitud']:.1%}, "
+          f"ajuste {mejor['segundos_ajuste']:.2f} s, {mejor['latencia_fila_us']:.0f} µs por predicción)")
+    return mejor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros del modelo por mitades sucesivas")
+    parser.add_argument("--presupuesto", type=float, default=PRESUPUESTO_SEGUNDOS, help="Segundos de reloj")
+    parser.add_argument("--candidatos", type=int, default=CANDIDATOS)
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--factor", type=int, default=FACTOR)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    buscar(args.presupuesto, args.candidatos, args.procesos, args.factor, args.semilla)
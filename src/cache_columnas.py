@@ -0,0 +1,148 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from rutas import RAIZ_ALMACEN, RAIZ_CACHE
+from almacen_columnar import asegurar_almacen, leer_dataset, meses_disponibles
+
+# Caché de columnas en archivos .npy, para abrirlas mapeadas en memoria.
+#
+#   data/cache_columnas/<firma>/manifiesto.json   (columnas, tipos y diccionarios)
+#   data/cache_columnas/<firma>/c00.npy ...       (una columna por archivo)
+#
+# construir_cache() lee el almacén columnar una vez, ordena por Fecha y guarda
+# cada columna como un arreglo NumPy: números tal cual, Fecha como datetime64,
+# categóricas como códigos + diccionario (en el manifiesto) y texto como bytes
+# de ancho fijo. leer_datos() abre los archivos con np.load(mmap_mode="r"), así
+# que todas las sesiones de Streamlit y todos los procesos comparten las mismas
+# páginas del caché del sistema operativo en vez de tener cada uno su copia.
+#
+# <firma> resume los archivos del almacén (ruta, tamaño y fecha de
+# modificación): si el almacén cambia, la firma cambia y el caché se vuelve a
+# construir en otra carpeta, sin tocar la que puedan estar usando otros procesos.
+#
+# Los dashboards lo usan a través de carga_incremental.py: la carga completa
+# del periodo sale de acá y después se agrega la cola del CSV. El planificador
+# lo vuelve a construir después de sincronizar el almacén (actualizar_cache),
+# así casi nunca lo construye un dashboard.
+
+MANIFIESTO = "manifiesto.json"
+
+# Función para obtener el caché de un almacén: la carpeta cache_columnas junto a él
+def cache_del_almacen(raiz):
+    return os.path.join(os.path.dirname(raiz), os.path.basename(RAIZ_CACHE))
+
+# Función para calcular la firma del almacén sin leer datos
+def firma_almacen(raiz=RAIZ_ALMACEN):
+    h = hashlib.sha1()
+    for mes in meses_disponibles(raiz):
+        for archivo in sorted(glob.glob(os.path.join(raiz, mes, "*.parquet"))):
+            info = os.stat(archivo)
+            h.update(f"{os.path.relpath(archivo, raiz)}:{info.st_size}:{info.st_mtime_ns};".encode())
+    return h.hexdigest()[:16]
+
+# Función para guardar una columna y describirla en el manifiesto
+def _guardar_columna(serie, archivo):
+    descripcion = {"nombre": serie.name, "archivo": os.path.basename(archivo)}
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        descripcion.update(tipo="categorica", categorias=serie.cat.categories.tolist())
+        valores = serie.array.codes
+    elif pd.api.types.is_datetime64_any_dtype(serie):
+        descripcion["tipo"] = "fecha"
+        valores = serie.to_numpy(dtype="datetime64[ns]")
+    elif pd.api.types.is_numeric_dtype(serie):
+        descripcion["tipo"] = "numerica"
+        valores = serie.to_numpy()
+    else:
+        descripcion["tipo"] = "texto"
+        valores = serie.astype(str).to_numpy().astype(np.bytes_)  # Ancho fijo, se puede mapear
+    np.save(archivo, valores)
+    return descripcion
+
+# Función para construir el caché del almacén (si ya existe para la firma actual, no hace nada)
+def construir_cache(raiz=RAIZ_ALMACEN, raiz_cache=RAIZ_CACHE):
+    firma = firma_almacen(raiz)
+    destino = os.path.join(raiz_cache, firma)
+    if os.path.exists(os.path.join(destino, MANIFIESTO)):
+        return destino
+
+    inicio = time.perf_counter()
+    df = leer_dataset(raiz=raiz, asegurar=False)  # El almacén tal como está (el de la firma)
+    if "Fecha" in df.columns:
+        df = df.sort_values("Fecha", kind="stable", ignore_index=True)  # Permite recortar por fecha sin copiar
+    temporal = os.path.join(raiz_cache, f".{firma}-{os.getpid()}")
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    columnas = [_guardar_columna(df[c], os.path.join(temporal, f"c{i:02d}.npy")) for i, c in enumerate(df.columns)]
+    with open(os.path.join(temporal, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump({"firma": firma, "filas": len(df), "columnas": columnas}, f, ensure_ascii=False, indent=2)
+
+    try:
+        os.rename(temporal, destino)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)  # Otro proceso lo construyó primero
+    _borrar_versiones_anteriores(raiz_cache, firma)
+    print(f"Caché de columnas: {len(df):,} filas, {len(columnas)} columnas en {time.perf_counter() - inicio:.2f} s -> {destino}")
+    return destino
+
+# Las versiones anteriores se borran; en Linux/macOS los procesos que las tengan
+# abiertas las siguen leyendo hasta cerrarlas (en Windows el borrado se omite)
+def _borrar_versiones_anteriores(raiz_cache, firma):
+    for carpeta in glob.glob(os.path.join(raiz_cache, "*")):
+        if os.path.basename(carpeta) != firma:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+# Función para abrir una columna mapeada en memoria
+def _abrir_columna(carpeta, descripcion, inicio, fin):
+    valores = np.load(os.path.join(carpeta, descripcion["archivo"]), mmap_mode="r")[inicio:fin]
+    if descripcion["tipo"] == "categorica":
+        return pd.Categorical.from_codes(valores, categories=descripcion["categorias"])
+    if descripcion["tipo"] == "texto":
+        return valores.astype(str)  # Única columna que se copia (texto de Python)
+    return valores
+
+# Función para leer los datos desde el caché (se construye si falta o quedó viejo).
+#   columnas: lista de columnas a abrir (None = todas)
+#   desde / hasta: rango de fechas; se resuelve con una búsqueda binaria sobre Fecha
+#   asegurar: poner antes el almacén al día con el CSV
+def leer_datos(columnas=None, desde=None, hasta=None, raiz=RAIZ_ALMACEN, raiz_cache=RAIZ_CACHE, asegurar=True):
+    if asegurar:
+        asegurar_almacen(raiz)
+    if not meses_disponibles(raiz):
+        return leer_dataset(columnas, desde, hasta, raiz, asegurar=False)  # Almacén vacío
+    carpeta = construir_cache(raiz, raiz_cache)
+    with open(os.path.join(carpeta, MANIFIESTO), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    descripciones = {d["nombre"]: d for d in manifiesto["columnas"]}
+
+    inicio, fin = 0, manifiesto["filas"]
+    if (desde is not None or hasta is not None) and "Fecha" in descripciones:
+        fechas = np.load(os.path.join(carpeta, descripciones["Fecha"]["archivo"]), mmap_mode="r")
+        if desde is not None:
+            inicio = int(np.searchsorted(fechas, pd.Timestamp(desde).to_datetime64(), side="left"))
+        if hasta is not None:
+            fin = int(np.searchsorted(fechas, pd.Timestamp(hasta).to_datetime64(), side="right"))
+
+    nombres = list(descripciones) if columnas is None else list(columnas)
+    arreglos = [_abrir_columna(carpeta, descripciones[n], inicio, fin) for n in nombres]
+    # copy=False: cada columna queda respaldada por su archivo mapeado, sin copias
+    return pd.DataFrame(dict(zip(nombres, arreglos)), copy=False)
+
+# Función para la tarea del planificador: sincroniza el almacén con el CSV y
+# construye el caché de la firma nueva, antes de que lo pida un dashboard
+def actualizar_cache(raiz=RAIZ_ALMACEN, raiz_cache=RAIZ_CACHE):
+    asegurar_almacen(raiz)
+    if meses_disponibles(raiz):
+        construir_cache(raiz, raiz_cache)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el caché de columnas .npy del almacén")
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    parser.add_argument("--raiz-cache", default=RAIZ_CACHE)
+    args = parser.parse_args()
+    actualizar_cache(args.raiz, args.raiz_cache)
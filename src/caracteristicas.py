@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Preparación de las características del modelo de criticidad, ajustada en el
+# entrenamiento y guardada junto al modelo (data/pipeline_caracteristicas.joblib).
+#
+# Reemplaza a pd.get_dummies + feature_names.joblib: al ajustar se fijan el
+# orden de las columnas numéricas, las categorías de cada columna categórica
+# (las del catálogo, aunque no aparezcan en los datos) y la mediana de cada
+# columna numérica. transformar() arma directamente la matriz NumPy en el mismo
+# orden que usaba get_dummies (numéricas y luego "<columna>_<categoría>"), sin
+# reindexar un DataFrame.
+#
+# Una columna numérica que no llega (la interfaz solo manda algunos análisis)
+# se completa con la mediana del entrenamiento, no con 0, y queda anotada en
+# faltantes(). Una categoría desconocida deja todas sus columnas en 0, igual que
+# el reindex de antes (las categorías nuevas esperan al próximo entrenamiento completo).
+
+COLUMNAS_CATEGORICAS = ["Equipo", "Componente", "Aceite Lubricante"]
+COLUMNA_OBJETIVO = "Criticidad"
+
+class PipelineCaracteristicas:
+    def __init__(self, numericas, categorias, medianas):
+        self.numericas = list(numericas)
+        self.categorias = {columna: list(valores) for columna, valores in categorias.items()}
+        self.medianas = np.asarray(medianas, dtype=np.float64)
+        self.nombres = self.numericas + [f"{columna}_{valor}" for columna, valores in self.categorias.items()
+                                         for valor in valores]
+        self._preparar_indices()
+
+    # Índices de búsqueda por categoría (no se guardan; se rearman al cargar): un
+    # diccionario para valores sueltos y un pd.Index para columnas completas
+    def _preparar_indices(self):
+        self._indices = {columna: pd.Index(valores) for columna, valores in self.categorias.items()}
+        self._posiciones = {columna: {valor: i for i, valor in enumerate(valores)}
+                            for columna, valores in self.categorias.items()}
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["_indices"], estado["_posiciones"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._preparar_indices()
+
+    # Función para ajustar el pipeline a un DataFrame de entrenamiento
+    @classmethod
+    def ajustar(cls, df, categoricas=COLUMNAS_CATEGORICAS):
+        categoricas = [c for c in categoricas if c in df.columns]
+        numericas = [c for c in df.columns if c not in categoricas and c != COLUMNA_OBJETIVO]
+        categorias = {}
+        for columna in categoricas:
+            serie = df[columna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                categorias[columna] = serie.cat.categories.tolist()  # Todas las del catálogo
+            else:
+                categorias[columna] = sorted(serie.dropna().unique().tolist())
+        medianas = df[numericas].median().to_numpy(dtype=np.float64) if numericas else []
+        return cls(numericas, categorias, medianas)
+
+    # Función para saber qué columnas numéricas no trae "datos" (se completan con la mediana)
+    def faltantes(self, datos):
+        return [c for c in self.numericas if c not in datos]
+
+    # Función para armar la matriz de características (float64, columnas en el
+    # orden de self.nombres). Acepta un DataFrame o un diccionario de columnas
+    # (valores sueltos para una sola fila, o listas/arreglos para varias).
+    def transformar(self, datos):
+        es_tabla = isinstance(datos, pd.DataFrame)
+        if es_tabla:
+            filas = len(datos)
+        else:
+            valor = next(iter(datos.values()), None)
+            filas = 1 if np.ndim(valor) == 0 else len(valor)
+        X = np.zeros((filas, len(self.nombres)), dtype=np.float64)
+        X[:, :len(self.numericas)] = self.medianas
+        presentes = [i for i, columna in enumerate(self.numericas) if columna in datos]
+        if es_tabla:
+            # Una sola conversión para todas las columnas numéricas
+            X[:, presentes] = datos[[self.numericas[i] for i in presentes]].to_numpy(dtype=np.float64)
+        else:
+            for i in presentes:
+                X[:, i] = datos[self.numericas[i]]
+        inicio = len(self.numericas)
+        for columna, posiciones in self._posiciones.items():
+            if columna in datos:
+                valores = datos[columna]
+                if np.ndim(valores) == 0:
+                    posicion = posiciones.get(valores)
+                    if posicion is not None:
+                        X[:, inicio + posicion] = 1.0
+                else:
+                    codigos = self._indices[columna].get_indexer(valores)
+                    conocidas = np.flatnonzero(codigos >= 0)
+                    X[conocidas, inicio + codigos[conocidas]] = 1.0
+            inicio += len(posiciones)
+        return X
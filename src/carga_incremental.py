@@ -0,0 +1,124 @@
+import io
+import os
+import threading
+import time
+import pandas as pd
+from rutas import ARCHIVO_DATOS
+from esquema import aplicar_esquema, dtypes_csv
+from catalogo import a_claves, a_etiquetas
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
+from almacen_columnar import almacen_del_csv, asegurar_almacen, estado_almacen
+from cache_columnas import cache_del_almacen, leer_datos
+
+# Carga incremental de las muestras para los dashboards, para un periodo
+# ("desde"; None = todo lo caliente).
+#
+# La carga completa se lee del caché de columnas del almacén (cache_columnas.py:
+# archivos .npy mapeados en memoria, así todas las sesiones y procesos comparten
+# las mismas páginas del sistema operativo), junto con el byte del CSV hasta
+# donde llega el almacén. Los generadores solo
+# agregan filas al final de data/datos_generados.csv, así que después el
+# cargador recuerda hasta qué byte leyó y en cada actualización lee del CSV solo
+# la cola nueva y la agrega al DataFrame que ya tiene en memoria. Cuando el
+# almacén ya incluye esa cola (lo sincroniza el planificador), se vuelve a la
+# carga completa para que el DataFrame quede otra vez respaldado por el caché.
+#
+# Para detectar que el archivo se truncó o se reescribió (por ejemplo una
+# migración o el archivado, que lo reemplazan con os.replace) guarda la huella
+# del inodo, los primeros bytes y los últimos bytes ya leídos; si el archivo se
+# achicó, es otro archivo o la huella cambió, vuelve a cargar desde el almacén.
+
+# Función para concatenar dos DataFrames de muestras conservando las columnas
+# categóricas (las categorías que falten en el primero se agregan al final)
+def concatenar(df, cola):
+    for c in cola.columns:
+        if c in df.columns and isinstance(cola[c].dtype, pd.CategoricalDtype) and isinstance(df[c].dtype, pd.CategoricalDtype):
+            nuevas = cola[c].cat.categories.difference(df[c].cat.categories, sort=False)
+            if len(nuevas):
+                df = df.assign(**{c: df[c].cat.add_categories(nuevas)})
+            cola = cola.assign(**{c: cola[c].cat.set_categories(df[c].cat.categories)})
+    return pd.concat([df, cola], ignore_index=True)
+
+class CargadorIncremental:
+    # archivo: CSV de muestras. desde: primera fecha del periodo (None = todo).
+    # raiz: almacén columnar derivado del CSV (por defecto, el que está junto a él).
+    def __init__(self, archivo=ARCHIVO_DATOS, desde=None, raiz=None):
+        self.archivo = archivo
+        self.desde = pd.Timestamp(desde) if desde is not None else None
+        self.raiz = raiz or almacen_del_csv(archivo)
+        self.raiz_cache = cache_del_almacen(self.raiz)
+        self.df = None
+        self.base = None  # Lo leído del caché (mapeado en memoria)
+        self.cola = None  # Lo leído del CSV después de lo que tenía el almacén
+        self.bytes_base = 0  # Byte del CSV hasta donde llega self.base
+        self.desplazamiento = 0  # Byte hasta donde se leyó (fin de la última línea completa)
+        self.filas = 0
+        self.recargas = 0  # Cargas completas (desde el almacén)
+        self.lecturas_cola = 0  # Lecturas de solo lo agregado
+        self._huella = None
+        self._lock = threading.Lock()  # Las sesiones de Streamlit corren en hilos
+
+    # Función para saber si lo ya leído sigue intacto (el archivo solo creció)
+    def _sigue_igual(self):
+        if self.df is None or os.path.getsize(self.archivo) < self.desplazamiento:
+            return False
+        return huella_csv(self.archivo, self.desplazamiento) == self._huella
+
+    # Función para la carga completa: el periodo desde el caché del almacén y el
+    # byte del CSV hasta donde llega. Si otro proceso sincroniza el almacén
+    # mientras se lee, el estado cambia y se vuelve a leer.
+    def _leer_almacen(self):
+        while True:
+            asegurar_almacen(self.raiz, self.archivo)
+            estado = estado_almacen(self.raiz)
+            df = leer_datos(desde=self.desde, raiz=self.raiz, raiz_cache=self.raiz_cache, asegurar=False)
+            if estado is not None and estado_almacen(self.raiz) == estado:
+                return df, estado["bytes_csv"], estado["huella"]
+
+    # Función para leer desde un byte hasta el final: devuelve el lote (o None) y el byte siguiente
+    def _leer_desde(self, desde, cabecera):
+        tipos = dtypes_csv(cabecera)
+        bloques = []
+        for texto, desde in leer_cola_csv(self.archivo, desde):
+            bloques.append(pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=tipos))
+        if not bloques:
+            return None, desde
+        # Dimensiones con las categorías del catálogo, iguales en todos los lotes
+        # (solo búsqueda: las etiquetas nuevas las registran los escritores)
+        df = a_claves(aplicar_esquema(pd.concat(bloques, ignore_index=True)), registrar=False)
+        if self.desde is not None:
+            df = df[df["Fecha"] >= self.desde]  # Un backfill puede agregar fechas viejas
+        return a_etiquetas(df), desde
+
+    # Función para poner el DataFrame al día y devolverlo
+    def actualizar(self):
+        with self._lock:
+            cabecera = leer_cabecera(self.archivo)
+            if cabecera is None:
+                return pd.DataFrame()
+            completa = not self._sigue_igual()
+            if not completa and self.cola is not None:
+                # El almacén ya tiene la cola en memoria: volver al caché compartido
+                estado = estado_almacen(self.raiz)
+                completa = estado is not None and estado["bytes_csv"] > self.bytes_base
+            if not completa and os.path.getsize(self.archivo) == self.desplazamiento:
+                return self.df  # Nada nuevo
+
+            inicio = time.perf_counter()
+            if completa:
+                self.base, self.desplazamiento, self._huella = self._leer_almacen()
+                if self.base.columns.empty:
+                    self.base = aplicar_esquema(pd.DataFrame(columns=cabecera))  # Almacén vacío
+                self.bytes_base, self.cola, self.df = self.desplazamiento, None, self.base
+                self.recargas += 1
+            cola, desplazamiento = self._leer_desde(self.desplazamiento, cabecera)
+            if cola is not None and len(cola):
+                self.cola = cola if self.cola is None else concatenar(self.cola, cola)
+                self.df = concatenar(self.base, self.cola) if len(self.base) else self.cola
+                self.lecturas_cola += not completa
+            if desplazamiento != self.desplazamiento:
+                self.desplazamiento = desplazamiento
+                self._huella = huella_csv(self.archivo, self.desplazamiento)
+            self.filas = len(self.df)
+            self.segundos_ultima = time.perf_counter() - inicio
+            return self.df
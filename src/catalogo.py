@@ -0,0 +1,118 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from rutas import ARCHIVO_CATALOGO
+from secuencias import bloqueo_archivo
+
+# Catálogo de dimensiones (equipos, componentes, aceites, números de flota, ...)
+# con claves enteras.
+#
+# data/catalogo.json guarda, para cada dimensión, la lista de etiquetas: la
+# clave de una etiqueta es su posición en la lista, por eso las etiquetas solo
+# se agregan al final y nunca se reordenan ni se borran. El almacén columnar
+# guarda solo las claves (int16); las etiquetas se unen al leer, como categóricas
+# cuyos códigos son las mismas claves, así que filtros, agrupaciones y one-hot
+# trabajan sobre enteros chicos.
+#
+# El archivo se lee una sola vez por proceso. Las etiquetas nuevas (por
+# ejemplo, las unidades de un perfil de escala) las registran solo los
+# escritores del CSV, bajo un bloqueo de archivo igual que el asignador de
+# secuencias; los lectores (dashboards, almacén, SQLite, agregados) solo
+# buscan, y si no encuentran una etiqueta vuelven a leer el archivo una vez.
+
+# Dimensiones que se guardan como claves en el almacén
+DIMENSIONES_CATALOGO = ["Equipo", "Componente", "Aceite Lubricante", "nflota", "cambioLubricanate", "Criticidad"]
+
+_catalogos = {}  # Catálogos ya leídos en este proceso, por archivo
+
+# Función para leer el catálogo (una vez por proceso, salvo que se pida recargar)
+def cargar_catalogo(archivo=ARCHIVO_CATALOGO, recargar=False):
+    if recargar or archivo not in _catalogos:
+        with open(archivo, encoding="utf-8") as f:
+            _catalogos[archivo] = json.load(f)
+    return _catalogos[archivo]
+
+# Función para escribir el catálogo de forma atómica (temporal + fsync + rename)
+def _escribir_catalogo(catalogo, archivo):
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(catalogo, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, archivo)
+
+# Función para obtener las etiquetas de una dimensión (la posición es la clave)
+def etiquetas(dimension, archivo=ARCHIVO_CATALOGO):
+    return cargar_catalogo(archivo)[dimension]
+
+# Función para obtener el aceite lubricante asociado a cada componente
+def aceite_por_componente(archivo=ARCHIVO_CATALOGO):
+    return cargar_catalogo(archivo)["aceite_por_componente"]
+
+# Función para agregar etiquetas nuevas al final de una dimensión
+def registrar_etiquetas(dimension, nuevas, archivo=ARCHIVO_CATALOGO):
+    with bloqueo_archivo(archivo):
+        catalogo = cargar_catalogo(archivo, recargar=True)  # Otro proceso pudo agregar etiquetas
+        existentes = set(catalogo[dimension])
+        agregar = [e for e in dict.fromkeys(nuevas) if e not in existentes]
+        if agregar:
+            catalogo[dimension].extend(agregar)
+            _escribir_catalogo(catalogo, archivo)
+    return catalogo[dimension]
+
+# Función para obtener la posición de cada valor en las etiquetas (-1 si no está o es nulo)
+def _posiciones(dimension, valores, archivo):
+    indice = pd.Index(etiquetas(dimension, archivo))
+    if isinstance(getattr(valores, "dtype", None), pd.CategoricalDtype):
+        # Se buscan solo las categorías; el código -1 (nulo) toma el -1 agregado al final
+        valores = pd.Categorical(valores)
+        return np.append(indice.get_indexer(valores.categories), -1)[valores.codes]
+    return indice.get_indexer(np.asarray(valores, dtype=object))
+
+# Función para obtener las etiquetas de "valores" que no están en el catálogo (sin nulos)
+def _desconocidas(dimension, valores, codigos):
+    nuevas = pd.unique(np.asarray(valores, dtype=object)[codigos < 0])
+    return [e for e in nuevas if not pd.isna(e)]
+
+# Función para convertir las etiquetas de una dimensión en claves int16. Las
+# etiquetas desconocidas se registran en el catálogo; con registrar=False
+# (lectores) solo se vuelve a leer el archivo, por si otro proceso las
+# registró, y las que siguen sin estar quedan en -1, igual que los nulos.
+def claves(dimension, valores, archivo=ARCHIVO_CATALOGO, registrar=True):
+    codigos = _posiciones(dimension, valores, archivo)
+    if (codigos < 0).any():
+        nuevas = _desconocidas(dimension, valores, codigos)
+        if nuevas:
+            if registrar:
+                registrar_etiquetas(dimension, nuevas, archivo)
+            else:
+                cargar_catalogo(archivo, recargar=True)
+            codigos = _posiciones(dimension, valores, archivo)
+    return codigos.astype(np.int16)
+
+# Función para reemplazar las columnas de dimensión de un DataFrame por sus claves
+def a_claves(df, archivo=ARCHIVO_CATALOGO, registrar=True):
+    presentes = [c for c in DIMENSIONES_CATALOGO if c in df.columns]
+    return df.assign(**{c: claves(c, df[c], archivo, registrar) for c in presentes}) if presentes else df
+
+# Función para registrar las etiquetas nuevas de un lote antes de escribirlo
+# (la llaman los escritores del CSV); si todas están, no toca el archivo
+def registrar_dimensiones(df, archivo=ARCHIVO_CATALOGO):
+    for c in DIMENSIONES_CATALOGO:
+        if c in df.columns:
+            claves(c, df[c], archivo)
+
+# Función para unir las etiquetas a las claves (categóricas con las claves como códigos)
+def a_etiquetas(df, archivo=ARCHIVO_CATALOGO):
+    columnas = {}
+    for c in DIMENSIONES_CATALOGO:
+        if c not in df.columns or not pd.api.types.is_integer_dtype(df[c]):
+            continue
+        valores = df[c].to_numpy()
+        categorias = etiquetas(c, archivo)
+        if len(valores) and valores.max() >= len(categorias):
+            categorias = cargar_catalogo(archivo, recargar=True)[c]  # Claves agregadas por otro proceso
+        columnas[c] = pd.Categorical.from_codes(valores, categories=categorias)
+    return df.assign(**columnas) if columnas else df
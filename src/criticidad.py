@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# Reglas de criticidad por umbrales, evaluadas sobre columnas completas.
+# Reemplaza a calcular_criticidad(row) + df.apply(..., axis=1) y se puede usar
+# desde los generadores, los dashboards y el entrenamiento.
+
+NIVELES_CRITICIDAD = ["Normal", "Atencion", "Critico"]
+
+# Tabla de límites: a partir de "Atencion" (inclusive) el análisis pasa a
+# Atención y a partir de "Critico" (inclusive) pasa a Crítico
+LIMITES_CRITICIDAD = {
+    "Silicio (Si) ppm": {"Atencion": 15, "Critico": 25},
+    "Hierro (Fe) ppm": {"Atencion": 100, "Critico": 200},
+    "Aluminio (Al) ppm": {"Atencion": 10, "Critico": 20},
+    "Cobre (Cu) ppm": {"Atencion": 15, "Critico": 30},
+    "TAN mg KOH/g": {"Atencion": 2.0, "Critico": 3.0},
+    "Residuo Ferroso Total mg/kg": {"Atencion": 200, "Critico": 500},
+}
+
+# Función para obtener el nivel de criticidad como código (0 Normal, 1 Atencion, 2 Critico).
+# Acepta un DataFrame o un diccionario de columnas; la fila toma el peor nivel entre los análisis.
+def nivel_criticidad(datos):
+    nivel = None
+    for columna, limites in LIMITES_CRITICIDAD.items():
+        valores = np.asarray(datos[columna], dtype=np.float64)
+        nivel_columna = (valores >= limites["Atencion"]).astype(np.int8)
+        nivel_columna[valores >= limites["Critico"]] = 2
+        nivel = nivel_columna if nivel is None else np.maximum(nivel, nivel_columna)
+    return nivel
+
+# Función para calcular la etiqueta de criticidad de cada fila
+def calcular_criticidad(datos):
+    return pd.Categorical.from_codes(nivel_criticidad(datos), categories=NIVELES_CRITICIDAD)
@@ -0,0 +1,240 @@
+import csv
+import hashlib
+import os
+import time
+import pandas as pd
+from rutas import ARCHIVO_DATOS
+from esquema import fechas_csv
+from catalogo import registrar_dimensiones
+from secuencias import bloqueo_archivo
+
+# Escritura solo-agregar sobre data/datos_generados.csv: cada lote nuevo se
+# escribe al final del archivo sin volver a leer ni reescribir el histórico,
+# así que guardar 50 filas cuesta lo mismo con 1.000 o con 10 millones de filas.
+#
+# Cada lote se escribe bajo el bloqueo "<archivo>.lock", el mismo que toma el
+# archivado histórico mientras reescribe el CSV; si el archivo fue reemplazado
+# entre un lote y otro, el escritor lo vuelve a abrir antes de escribir.
+#
+# Con un índice de muestras (indice_muestras.IndiceMuestras), escribir_nuevos()
+# descarta bajo ese mismo bloqueo las filas cuya clave (Numero Registro) ya está
+# en el CSV, así dos procesos no pueden colar el mismo número a la vez. Con
+# "numerar", las filas que quedan se completan (p. ej. con Numero Registro del
+# asignador) después de filtrar y antes de escribir, también bajo el bloqueo.
+#
+# Antes de escribir un lote (ya validado, bajo el bloqueo del CSV) se registran
+# en el catálogo sus etiquetas nuevas: los que leen el CSV (dashboards, almacén, SQLite, agregados) solo las buscan.
+
+# Función para leer solo la cabecera de un CSV (None si no existe o está vacío)
+def leer_cabecera(archivo):
+    try:
+        with open(archivo, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), None)
+    except FileNotFoundError:
+        return None
+
+# Función para saber si un CSV guarda Fecha como entero (migrado, o nuevo) o
+# como texto: se mira solo la primera fila
+def fechas_enteras(archivo):
+    try:
+        with open(archivo, "r", encoding="utf-8", newline="") as f:
+            lector = csv.reader(f)
+            cabecera, fila = next(lector, None), next(lector, None)
+    except FileNotFoundError:
+        return True
+    if cabecera is None or fila is None or "Fecha" not in cabecera:
+        return True
+    return fila[cabecera.index("Fecha")].lstrip("-").isdigit()
+
+# Función para leer lo que se agregó a un CSV a partir de un byte dado, por
+# bloques de líneas completas (una última línea a medio escribir se deja para
+# la próxima lectura). Entrega (texto, byte_siguiente) por cada bloque; si
+# "desde" es 0 se salta la cabecera.
+def leer_cola_csv(archivo, desde=0, bytes_por_bloque=64 * 1024 * 1024):
+    with open(archivo, "rb") as f:
+        f.seek(desde)
+        if desde == 0:
+            desde += len(f.readline())
+        while True:
+            lineas = f.readlines(bytes_por_bloque)
+            if lineas and not lineas[-1].endswith(b"\n"):
+                lineas.pop()  # Línea incompleta: la termina de escribir otro proceso
+            if not lineas:
+                return
+            bloque = b"".join(lineas)
+            desde += len(bloque)
+            yield bloque.decode("utf-8"), desde
+
+# Función para calcular la huella de lo ya leído de un CSV (inodo, primeros y
+# últimos bytes antes de "hasta"). Si cambia, el archivo se reemplazó o se
+# reescribió y quien lo lee por cola tiene que volver a leerlo entero.
+def huella_csv(archivo, hasta, bytes_huella=4096):
+    with open(archivo, "rb") as f:
+        info = os.fstat(f.fileno())
+        inicio = f.read(min(bytes_huella, hasta))
+        f.seek(max(0, hasta - bytes_huella))
+        fin = f.read(min(bytes_huella, hasta))
+    return hashlib.sha1(f"{info.st_dev}:{info.st_ino}|".encode() + inicio + b"|" + fin).hexdigest()
+
+class EscritorCSV:
+    # archivo: CSV de destino. lotes_por_sync: cada cuántos lotes se hace
+    # flush + fsync (1 = después de cada lote). indice: IndiceMuestras para
+    # escribir_nuevos() (opcional). registrar: anotar las etiquetas nuevas en el
+    # catálogo (False para CSV que no son del esquema de muestras).
+    def __init__(self, archivo=ARCHIVO_DATOS, lotes_por_sync=1, indice=None, registrar=True):
+        carpeta = os.path.dirname(archivo)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.archivo = archivo
+        self.lotes_por_sync = lotes_por_sync
+        self.indice = indice
+        self.registrar = registrar
+        # La cabecera y el formato de Fecha se leen bajo el bloqueo, al abrir el
+        # archivo en el primer lote (otro proceso puede estar escribiendo)
+        self.columnas = None
+        self.fechas_enteras = True  # Fecha se escribe igual que lo que ya hay
+        self._f = None
+        self._lotes_sin_sync = 0
+        self.filas_escritas = 0
+        self.segundos = 0.0
+
+    # Si el archivo no termina en salto de línea (un corte a mitad de una
+    # línea), agregarlo antes del primer lote. Se llama con el bloqueo tomado.
+    def _asegurar_salto_final(self):
+        if self.columnas is None:
+            return
+        with open(self.archivo, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    # Función para pasar un lote a texto CSV con el orden de columnas del archivo
+    def _serializar(self, df):
+        if self.columnas is None:
+            # Archivo nuevo: la cabecera se escribe una sola vez (se anota al escribirla)
+            return fechas_csv(df).to_csv(header=True, index=False)
+        sobrantes = [c for c in df.columns if c not in self.columnas]
+        if sobrantes:
+            raise ValueError(f"El lote trae columnas que no están en la cabecera de {self.archivo}: {sobrantes}")
+        # Respetar el orden de la cabecera existente
+        return fechas_csv(df.reindex(columns=self.columnas), self.fechas_enteras).to_csv(header=False, index=False)
+
+    # Función para agregar un lote (DataFrame) al final del archivo
+    def escribir(self, df):
+        inicio = time.perf_counter()
+        with bloqueo_archivo(self.archivo):
+            self._reabrir_si_cambio()  # Antes de serializar: el archivo pudo migrarse
+            texto = self._serializar(df)
+            if self.registrar:
+                registrar_dimensiones(df)  # Solo si el lote pasó la validación de columnas
+            self._escribir_bloqueado(texto, df.columns)
+        self.filas_escritas += len(df)
+        self.segundos += time.perf_counter() - inicio
+        return len(df)
+
+    # Función para agregar solo las filas de un lote que no estén ya en el
+    # archivo según el índice; devuelve las filas que se escribieron
+    def escribir_nuevos(self, df, numerar=None):
+        inicio = time.perf_counter()
+        with bloqueo_archivo(self.archivo):
+            self._reabrir_si_cambio()
+            self.indice.actualizar()  # Lo que agregaron otros procesos desde el último lote
+            df = self.indice.filtrar(df)
+            if numerar is not None and not df.empty:
+                df = numerar(df)
+            if not df.empty:
+                texto = self._serializar(df)
+                if self.registrar:
+                    registrar_dimensiones(df)
+                self._escribir_bloqueado(texto, df.columns)
+                self.indice.registrar(df, os.fstat(self._f.fileno()).st_size)
+        self.filas_escritas += len(df)
+        self.segundos += time.perf_counter() - inicio
+        return df
+
+    # Función para conocer la cabecera antes del primer lote, p. ej. para
+    # serializar en otros procesos: abre el archivo bajo el bloqueo y, si es
+    # nuevo, escribe "columnas" como cabecera. Devuelve (columnas, fechas_enteras).
+    def preparar(self, columnas):
+        with bloqueo_archivo(self.archivo):
+            self._reabrir_si_cambio()
+            if self.columnas is None:
+                self._escribir_bloqueado(pd.DataFrame(columns=list(columnas)).to_csv(index=False), columnas)
+        return self.columnas, self.fechas_enteras
+
+    # Función para agregar texto CSV ya serializado (sin cabecera) al final del
+    # archivo; el archivo ya tiene que tener cabecera (ver preparar)
+    def escribir_texto(self, texto, filas):
+        inicio = time.perf_counter()
+        with bloqueo_archivo(self.archivo):
+            self._reabrir_si_cambio()
+            if self.columnas is None:
+                raise ValueError(f"{self.archivo} no tiene cabecera: hay que llamar a preparar() antes")
+            self._escribir_bloqueado(texto)
+        self.filas_escritas += filas
+        self.segundos += time.perf_counter() - inicio
+        return filas
+
+    # Función para escribir texto con el bloqueo ya tomado; "columnas" es la
+    # cabecera que lleva el texto si el archivo todavía no tenía
+    def _escribir_bloqueado(self, texto, columnas=None):
+        self._f.write(texto)
+        if self.columnas is None:
+            self.columnas, self.fechas_enteras = list(columnas), True
+        self._f.flush()  # Dentro del bloqueo, para que el archivado y el índice no dejen nada en el buffer
+        self._lotes_sin_sync += 1
+        if self._lotes_sin_sync >= self.lotes_por_sync:
+            self.sincronizar()
+
+    # Con el bloqueo tomado: abrir el archivo en el primer lote o, si otro
+    # proceso lo reemplazó (archivado histórico, migración), abrir el nuevo. Si
+    # todavía no tiene cabecera se vuelve a mirar, por si otro escritor la puso.
+    def _reabrir_si_cambio(self):
+        try:
+            mismo = self._f is not None and os.path.samestat(os.fstat(self._f.fileno()), os.stat(self.archivo))
+        except FileNotFoundError:
+            mismo = False
+        if mismo and self.columnas is not None:
+            return
+        if self._f is not None:
+            self._f.close()
+        self.columnas = leer_cabecera(self.archivo)
+        self.fechas_enteras = fechas_enteras(self.archivo)  # Puede haberse migrado
+        self._asegurar_salto_final()
+        self._f = open(self.archivo, "a", encoding="utf-8", newline="")
+
+    # Función para bajar a disco lo escrito (flush + fsync)
+    def sincronizar(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._lotes_sin_sync = 0
+
+    def filas_por_segundo(self):
+        return self.filas_escritas / self.segundos if self.segundos else 0.0
+
+    def cerrar(self):
+        if self._f is not None and not self._f.closed:
+            self.sincronizar()
+            self._f.close()
+        if self.indice is not None:
+            with bloqueo_archivo(self.archivo):
+                self.indice.volcar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+# Función para guardar un lote en el CSV (reemplaza la versión que leía,
+# concatenaba y reescribía todo el archivo). El almacén columnar, SQLite y los
+# agregados se derivan del CSV y toman el lote en su próxima sincronización.
+# Con un índice de muestras, las filas ya ingresadas no se vuelven a guardar.
+def guardar_datos(df_nuevos, archivo=ARCHIVO_DATOS, indice=None):
+    with EscritorCSV(archivo, indice=indice) as escritor:
+        if indice is None:
+            escritor.escribir(df_nuevos)
+        else:
+            escritor.escribir_nuevos(df_nuevos)
+    print(f"{escritor.filas_escritas} filas agregadas a {archivo} ({escritor.filas_por_segundo():,.0f} filas/s)")
+    return escritor.filas_escritas
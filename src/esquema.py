@@ -0,0 +1,125 @@
+import pandas as pd
+import pyarrow as pa
+
+# Esquema único de las muestras: el tipo de cada columna, compartido por los
+# generadores, el almacén columnar, train_model.py y los dashboards.
+#
+# En lugar de dejar que pandas infiera int64/float64/object, cada columna usa el
+# tipo más chico que alcanza para sus valores: categóricas para las dimensiones,
+# int8/int16/int32 para ppm, índices y conteos, y float32 para viscosidad, TAN y
+# porcentajes. El orden del diccionario es el orden de columnas del CSV.
+#
+# Fecha se guarda en el CSV como entero (nanosegundos desde 1970, sin zona
+# horaria): read_csv la lee como int64 y pasarla a datetime64[ns] no requiere
+# interpretar texto. Los CSV anteriores tienen texto ISO (con o sin hora y
+# microsegundos) hasta que se migran con migrar_fechas.py; mientras tanto se
+# siguen leyendo, y los escritores respetan el formato que ya tiene el archivo.
+
+# Columnas de dimensión (texto repetido): se guardan como categóricas
+DIMENSIONES = ["Equipo", "Componente", "Aceite Lubricante", "nflota", "cambioLubricanate",
+               "Numero Serie Equipo", "Criticidad"]
+
+ESQUEMA = {
+    "Fecha": "datetime64[ns]",
+    "Equipo": "category",
+    "Componente": "category",
+    "Aceite Lubricante": "category",
+    "nflota": "category",
+    "cambioLubricanate": "category",
+    "Contenido de agua %": "float32",
+    "Punto de inflamacion °C": "int16",
+    "Glicol %": "float32",
+    "Nitracion A/cm": "int16",
+    "Oxidación A/cm": "int16",
+    "Hollín %": "float32",
+    "Sulfatacion A/cm": "int16",
+    "Diesel %": "float32",
+    "N de part >4µm": "int32",
+    "N° de part >6µm": "int32",
+    "N° de part>14µm": "int32",
+    "ISO 4406 >4µm": "int8",
+    "ISO 4406 >6µm": "int8",
+    "ISO 4406 >14µm": "int8",
+    "Viscosidad 100°C cSt(mm2/s)": "float32",
+    "Viscosidad 40°C cSt(mm2/s)": "float32",
+    "TAN mg KOH/g": "float32",
+    "TBN mg KOH/g": "int16",
+    "Plata (Ag) ppm": "int16",
+    "Aluminio (Al) ppm": "int16",
+    "Bario (Ba) ppm": "int16",
+    "Boro (B) ppm": "int16",
+    "Calcio (Ca) ppm": "int16",
+    "Cromo (Cr) ppm": "int16",
+    "Cobre (Cu) ppm": "int16",
+    "Hierro (Fe) ppm": "int16",
+    "Potasio (K) ppm": "int16",
+    "Magnesio (Mg) ppm": "int16",
+    "Molibdeno (Mo) ppm": "int16",
+    "Sodio (Na) ppm": "int16",
+    "Níquel (Ni) ppm": "int16",
+    "Plomo (Pb) ppm": "int16",
+    "Fósforo (P) ppm": "int16",
+    "Silicio (Si) ppm": "int16",
+    "Estaño (Sn) ppm": "int16",
+    "Titanio (Ti) ppm": "int16",
+    "Vanadio (V) ppm": "int16",
+    "Zinc (Zn) ppm": "int16",
+    "Residuo Ferroso Total mg/kg": "int16",
+    "Numero Muestra": "str",
+    "Numero Registro": "int64",
+    "Numero Serie Equipo": "category",
+    "Criticidad": "category",
+}
+
+# Tipos Arrow equivalentes, para que todas las partes del almacén tengan el mismo esquema
+_TIPOS_ARROW = {
+    "datetime64[ns]": pa.timestamp("ns"),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "str": pa.string(),
+    "int8": pa.int8(),
+    "int16": pa.int16(),
+    "int32": pa.int32(),
+    "int64": pa.int64(),
+    "float32": pa.float32(),
+}
+
+# Función para pasar Fecha a datetime64[ns] desde cualquiera de sus formatos
+def _a_fechas(fecha):
+    if pd.api.types.is_integer_dtype(fecha):
+        return fecha.astype("datetime64[ns]")  # CSV migrado: nanosegundos desde 1970
+    if not pd.api.types.is_datetime64_any_dtype(fecha):
+        fecha = pd.to_datetime(fecha, format="ISO8601")  # CSV de texto, sin migrar
+    return fecha if fecha.dtype == "datetime64[ns]" else fecha.astype("datetime64[ns]")
+
+# Función para convertir un DataFrame a los tipos del esquema. Las columnas que
+# no están en el esquema (p. ej. las del generador antiguo) se dejan como vienen.
+def aplicar_esquema(df):
+    if "Fecha" in df.columns and df["Fecha"].dtype != "datetime64[ns]":
+        df = df.assign(Fecha=_a_fechas(df["Fecha"]))
+    tipos = {c: t for c, t in ESQUEMA.items() if c in df.columns and c != "Fecha" and df[c].dtype != t}
+    return df.astype(tipos) if tipos else df
+
+# Función para obtener el argumento dtype de pd.read_csv según el esquema: el
+# tipo de cada columna se declara en vez de inferirse, salvo Fecha: en un CSV
+# migrado sale int64 y en uno de texto sale str (aplicar_esquema acepta las dos).
+def dtypes_csv(columnas=None):
+    columnas = ESQUEMA if columnas is None else [c for c in columnas if c in ESQUEMA]
+    return {c: ESQUEMA[c] for c in columnas if c != "Fecha"}
+
+# Función para preparar Fecha antes de escribir un lote al CSV: entero en
+# nanosegundos, o el texto de siempre si el archivo todavía no está migrado
+def fechas_csv(df, enteras=True):
+    if "Fecha" not in df.columns or not enteras:
+        return df
+    return df.assign(Fecha=_a_fechas(df["Fecha"]).astype("int64"))
+
+# Función para leer un CSV de muestras con los tipos del esquema
+def leer_csv(archivo, **kwargs):
+    columnas = pd.read_csv(archivo, nrows=0).columns
+    return aplicar_esquema(pd.read_csv(archivo, dtype=dtypes_csv(columnas), **kwargs))
+
+# Función para obtener el esquema Arrow de una lista de columnas. Las columnas
+# de "claves" se guardan como claves enteras del catálogo (int16).
+def esquema_arrow(columnas, claves=()):
+    return pa.schema([pa.field(c, pa.int16() if c in claves else _TIPOS_ARROW[ESQUEMA[c]])
+                      for c in columnas if c in ESQUEMA])
@@ -2,7 +2,13 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
-import os
+from escritor_datos import EscritorCSV
+
+# Generador simple original. Sus columnas ("Hierro (ppm)", "Viscosidad", ...)
+# no son las del esquema de data/datos_generados.csv, así que escribe en su
+# propio CSV (sin pasar sus etiquetas al catálogo compartido); los dashboards
+# y el modelo usan generar_datos_Mejorado.py.
+ARCHIVO_DATOS_SIMPLES = "data/datos_simples.csv"
 
 # Parámetros
 num_registros = 20  # Número de registros a generar cada vez
@@ -22,28 +28,12 @@ def generar_datos_aleatorios():
     }
     return pd.DataFrame(datos)
 
-# Función para guardar datos en el archivo CSV
-def guardar_datos(df_nuevos, archivo="data/datos_generados.csv"):
-    # Crear la carpeta 'data' si no existe
-    os.makedirs(os.path.dirname(archivo), exist_ok=True)
-
-    try:
-        # Leer el archivo existente
-        df_existente = pd.read_csv(archivo)
-        # Concatenar los datos nuevos con los existentes
-        df_final = pd.concat([df_existente, df_nuevos], ignore_index=True)
-    except FileNotFoundError:
-        # Si el archivo no existe, usar solo los datos nuevos
-        df_final = df_nuevos
-
-    # Guardar el archivo actualizado
-    df_final.to_csv(archivo, index=False)
-
 # Bucle para generar datos cada 1 minuto
 if __name__ == "__main__":
     while True:
         print("Generando 20 nuevos registros...")
         df_nuevos = generar_datos_aleatorios()
-        guardar_datos(df_nuevos)
+        with EscritorCSV(ARCHIVO_DATOS_SIMPLES, registrar=False) as escritor:
+            escritor.escribir(df_nuevos)
         print("Datos guardados. Esperando 1 minuto...\n")
         time.sleep(60)  # Esperar 1 minuto (60 segundos)
\ No newline at end of file
@@ -2,96 +2,38 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
-import os
+from escritor_datos import guardar_datos
+from criticidad import calcular_criticidad
+from iso4406 import agregar_codigos_iso
+from esquema import aplicar_esquema
+from catalogo import etiquetas, aceite_por_componente
+from secuencias import AsignadorSecuencias, DIGITOS_MUESTRA
+from indice_muestras import IndiceMuestras
 
 # Parámetros
 num_registros = 50  # Número de registros a generar cada vez
-equipos = ["CATERPILLAR 797F", "CATERPILLAR 988H", "CATERPILLAR 24M", "KOMATSU 930-E4",
-           "KOMATSU 930E-4SE", "KOMATSU 980 E5", "KOMATSU 930 E3", "KOMATSU 930 E4", "KOMATSU 930 E5",
-           "KOMATSU 950 E3", "CAEX", "KOMATSU 950 E4", "KOMATSU 960 E2-K"]
-componentes = ["MANDO FINAL", "TRANSMISIÓN", "DIFERENCIAL DEL", "MOTOR", "SISTEMA HIDRAULICO",
-               "MANDO FINAL TRA.DER", "MANDO FINAL TRA.IZQ", "MASA DERECHA", "MASA IZQUIERDA",
-               "MOTOR TRACCION IZQ", "MOTOR TRACCION DER", "DIFERENCIAL TRA"]
-nflota = ["911", "912", "913", "914", "915", "511", "512", "513", "515", "RT1", "RT2", "RT3", "RT4", "G126", "G127", "G128", "G129"]
-cambioLubricanate = ["Muestreo", "Cambio Aceite"]
+
+# Dimensiones desde el catálogo compartido (data/catalogo.json)
+equipos = etiquetas("Equipo")
+nflota = etiquetas("nflota")
+cambioLubricanate = etiquetas("cambioLubricanate")
 
 # Asociación de componentes con aceites lubricantes
-componentes_aceites = {
-    "MANDO FINAL": "MOBIL MOBILTRANS HD 30",
-    "TRANSMISIÓN": "MOBIL MOBILTRANS HD 30",
-    "DIFERENCIAL DEL": "MOBIL MOBILTRANS HD 30",
-    "MOTOR": "MOBIL DELVAC 15W40",
-    "SISTEMA HIDRAULICO": "MOBIL DTE 24",
-    "MANDO FINAL TRA.DER": "MOBIL MOBILTRANS HD 30",
-    "MANDO FINAL TRA.IZQ": "MOBIL MOBILTRANS HD 30",
-    "MASA DERECHA": "MOBIL MOBILTRANS HD 30",
-    "MASA IZQUIERDA": "MOBIL MOBILTRANS HD 30",
-    "MOTOR TRACCION IZQ": "MOBIL SHC GEAR 680",
-    "MOTOR TRACCION DER": "MOBIL SHC GEAR 680",
-    "DIFERENCIAL TRA": "MOBIL MOBILTRANS HD 30"
-}
-
-# Variables globales para mantener el estado correlativo
+componentes_aceites = aceite_por_componente()
+
+# Letras posibles del número de muestra
 NUM_MUESTRA_LETRAS = "ABCDE"
-NUM_MUESTRA_DIGITOS = 0  # Inicializar en 0 (comenzará en 1)
-NUM_REGISTRO = 0  # Inicializar en 0 (comenzará en 1)
-
-# Función para leer el estado actual desde un archivo (si existe)
-def cargar_estado():
-    global NUM_MUESTRA_DIGITOS, NUM_REGISTRO
-    try:
-        with open("data/estado_generador.txt", "r") as f:
-            lineas = f.readlines()
-            
-            # Verificar que haya suficientes líneas en el archivo
-            if len(lineas) >= 2:
-                NUM_MUESTRA_DIGITOS = int(lineas[0].strip())
-                NUM_REGISTRO = int(lineas[1].strip())
-            else:
-                # Si no hay suficientes líneas, inicializar con valores predeterminados
-                NUM_MUESTRA_DIGITOS = 0
-                NUM_REGISTRO = 0
-    except FileNotFoundError:
-        # Si el archivo no existe, usar valores iniciales
-        NUM_MUESTRA_DIGITOS = 0
-        NUM_REGISTRO = 0
-
-# Función para guardar el estado actual en un archivo
-def guardar_estado():
-    with open("data/estado_generador.txt", "w") as f:
-        f.write(f"{NUM_MUESTRA_DIGITOS}\n")
-        f.write(f"{NUM_REGISTRO}\n")
-
-# Función para calcular la criticidad basada en los valores generados
-def calcular_criticidad(row):
-    criticidad = "Normal"
-    
-    # Condiciones para Atención
-    if (row["Silicio (Si) ppm"] >= 15 or
-        row["Hierro (Fe) ppm"] >= 100 or
-        row["Aluminio (Al) ppm"] >= 10 or
-        row["Cobre (Cu) ppm"] >= 15 or
-        row["TAN mg KOH/g"] >= 2.0 or
-        row["Residuo Ferroso Total mg/kg"] >= 200):
-        criticidad = "Atencion"
-    
-    # Condiciones para Crítico
-    if (row["Silicio (Si) ppm"] >= 25 or
-        row["Hierro (Fe) ppm"] >= 200 or
-        row["Aluminio (Al) ppm"] >= 20 or
-        row["Cobre (Cu) ppm"] >= 30 or
-        row["TAN mg KOH/g"] >= 3.0 or
-        row["Residuo Ferroso Total mg/kg"] >= 500):
-        criticidad = "Critico"
-    
-    return criticidad
+
+# Números correlativos: se reservan por bloques en data/estado_generador.txt
+asignador = AsignadorSecuencias()
+
+# Números ya ingresados: si un lote se vuelve a mandar tras un corte, no se duplica
+indice = IndiceMuestras()
 
 # Función para generar datos aleatorios
 def generar_datos_aleatorios():
-    global NUM_MUESTRA_DIGITOS, NUM_REGISTRO
-
-    # Cargar el estado actual
-    cargar_estado()
+    # Reservar la numeración del lote
+    num_muestra_digitos, num_registro = asignador.reservar(num_registros)
 
     # Generar nuevos datos
     datos = {
@@ -112,7 +54,6 @@ def generar_datos_aleatorios():
         "N de part >4µm": np.random.randint(1000, 10000, size=num_registros),
         "N° de part >6µm": np.random.randint(500, 5000, size=num_registros),
         "N° de part>14µm": np.random.randint(100, 1000, size=num_registros),
-        "Código ISO 4406": [f"{np.random.randint(18, 22)}/{np.random.randint(16, 20)}/{np.random.randint(13, 17)}" for _ in range(num_registros)],
         "Viscosidad 100°C cSt(mm2/s)": np.round(np.random.uniform(10, 20), 2),
         "Viscosidad 40°C cSt(mm2/s)": np.round(np.random.uniform(80, 120), 2),
         "TAN mg KOH/g": np.round(np.random.uniform(0, 3), 2),
@@ -147,12 +88,12 @@ def generar_datos_aleatorios():
     for _ in range(num_registros):
         # Generar número de muestra
         letra_muestra = np.random.choice(list(NUM_MUESTRA_LETRAS))
-        NUM_MUESTRA_DIGITOS += 1
-        numero_muestra = f"{letra_muestra}{NUM_MUESTRA_DIGITOS:05d}"  # Formato: A00001, B00002, etc.
+        num_muestra_digitos += 1
+        numero_muestra = f"{letra_muestra}{num_muestra_digitos:0{DIGITOS_MUESTRA}d}"  # Formato: A0000001, B0000002, etc.
 
         # Generar número de registro
-        NUM_REGISTRO += 1
-        numero_registro = f"{NUM_REGISTRO:07d}"  # Formato: 0000001, 0000002, etc.
+        num_registro += 1
+        numero_registro = f"{num_registro:07d}"  # Formato: 0000001, 0000002, etc.
 
         # Generar número de serie del equipo
         numero_serie_equipo = f"LAJ{np.random.randint(0, 1000):03d}"  # Formato: LAJ001, LAJ999, etc.
@@ -166,38 +107,22 @@ def generar_datos_aleatorios():
         componente_seleccionado = datos["Componente"][-1]
         datos["Aceite Lubricante"].append(componentes_aceites.get(componente_seleccionado, "No especificado"))
 
-    # Guardar el estado actualizado
-    guardar_estado()
-
     # Convertir a DataFrame
     df = pd.DataFrame(datos)
 
-    # Calcular la criticidad para cada fila
-    df["Criticidad"] = df.apply(calcular_criticidad, axis=1)
-
-    return df
-
-# Función para guardar datos en el archivo CSV
-def guardar_datos(df_nuevos, archivo="data/datos_generados.csv"):
-    # Crear la carpeta 'data' si no existe
-    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    # Códigos ISO 4406 calculados a partir de los conteos de partículas
+    df = agregar_codigos_iso(df)
 
-    try:
-        # Intentar leer el archivo existente
-        df_existente = pd.read_csv(archivo)
-        df_final = pd.concat([df_existente, df_nuevos], ignore_index=True)
-    except FileNotFoundError:
-        # Si el archivo no existe, usar solo los datos nuevos
-        df_final = df_nuevos
+    # Calcular la criticidad de todas las filas con la tabla de límites
+    df["Criticidad"] = calcular_criticidad(df)
 
-    # Guardar el archivo actualizado
-    df_final.to_csv(archivo, index=False)
+    return aplicar_esquema(df)
 
 # Bucle para generar datos cada 1 minuto
 if __name__ == "__main__":
     while True:
         print("Generando 20 nuevos registros...")
         df_nuevos = generar_datos_aleatorios()
-        guardar_datos(df_nuevos)
+        guardar_datos(df_nuevos, indice=indice)
         print("Datos guardados. Esperando 1 minutos...\n")
         time.sleep(60)  # Esperar 1 minuto (60 segundos)
\ No newline at end of file
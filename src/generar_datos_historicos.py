@@ -1,231 +1,112 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
 import os
+from escritor_datos import EscritorCSV, ARCHIVO_DATOS
+from almacen_columnar import almacen_del_csv, asegurar_almacen
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from motor_generacion import crear_generador, generar_lote
+from esquema import ESQUEMA, fechas_csv
+from secuencias import AsignadorSecuencias
 
 # Parámetros
 num_registros_diarios = 5  # Número de registros a generar por día
-equipos = ["CATERPILLAR 797F", "CATERPILLAR 988H", "CATERPILLAR 24M", "KOMATSU 930-E4",
-           "KOMATSU 930E-4SE", "KOMATSU 980 E5", "KOMATSU 930 E3", "KOMATSU 930 E4", "KOMATSU 930 E5",
-           "KOMATSU 950 E3", "CAEX", "KOMATSU 950 E4", "KOMATSU 960 E2-K"]
-componentes = ["MANDO FINAL", "TRANSMISIÓN", "DIFERENCIAL DEL", "MOTOR", "SISTEMA HIDRAULICO",
-               "MANDO FINAL TRA.DER", "MANDO FINAL TRA.IZQ", "MASA DERECHA", "MASA IZQUIERDA",
-               "MOTOR TRACCION IZQ", "MOTOR TRACCION DER", "DIFERENCIAL TRA"]
-nflota = ["911", "912", "913", "914", "915", "511", "512", "513", "515", "RT1", "RT2", "RT3", "RT4", "G126", "G127", "G128", "G129"]
-cambioLubricanate = ["Muestreo", "Cambio Aceite"]
 
-# Asociación de componentes con aceites lubricantes
-componentes_aceites = {
-    "MANDO FINAL": "MOBIL MOBILTRANS HD 30",
-    "TRANSMISIÓN": "MOBIL MOBILTRANS HD 30",
-    "DIFERENCIAL DEL": "MOBIL MOBILTRANS HD 30",
-    "MOTOR": "MOBIL DELVAC 15W40",
-    "SISTEMA HIDRAULICO": "MOBIL DTE 24",
-    "MANDO FINAL TRA.DER": "MOBIL MOBILTRANS HD 30",
-    "MANDO FINAL TRA.IZQ": "MOBIL MOBILTRANS HD 30",
-    "MASA DERECHA": "MOBIL MOBILTRANS HD 30",
-    "MASA IZQUIERDA": "MOBIL MOBILTRANS HD 30",
-    "MOTOR TRACCION IZQ": "MOBIL SHC GEAR 680",
-    "MOTOR TRACCION DER": "MOBIL SHC GEAR 680",
-    "DIFERENCIAL TRA": "MOBIL MOBILTRANS HD 30"
-}
-
-# Variables globales para mantener el estado correlativo
-NUM_MUESTRA_LETRAS = "ABCDE"
-NUM_MUESTRA_DIGITOS = 0  # Inicializar en 0 (comenzará en 1)
-NUM_REGISTRO = 0  # Inicializar en 0 (comenzará en 1)
-
-# Función para leer el estado actual desde un archivo (si existe)
-def cargar_estado():
-    global NUM_MUESTRA_DIGITOS, NUM_REGISTRO
-    try:
-        with open("data/estado_generador.txt", "r") as f:
-            lineas = f.readlines()
-            if len(lineas) >= 2:
-                NUM_MUESTRA_DIGITOS = int(lineas[0].strip())
-                NUM_REGISTRO = int(lineas[1].strip())
-            else:
-                NUM_MUESTRA_DIGITOS = 0
-                NUM_REGISTRO = 0
-    except FileNotFoundError:
-        NUM_MUESTRA_DIGITOS = 0
-        NUM_REGISTRO = 0
-
-# Función para guardar el estado actual en un archivo
-def guardar_estado():
-    with open("data/estado_generador.txt", "w") as f:
-        f.write(f"{NUM_MUESTRA_DIGITOS}\n")
-        f.write(f"{NUM_REGISTRO}\n")
-
-# Función para generar criticidad basada en probabilidades
-def generar_criticidad():
-    criticidades = ["Normal"] * 65 + ["Atencion"] * 20 + ["Critico"] * 15
-    return np.random.choice(criticidades)
-
-# Función para ajustar valores según la criticidad asignada
-def ajustar_valores(row):
-    criticidad = row["Criticidad"]
-    if criticidad == "Normal":
-        row["Silicio (Si) ppm"] = np.random.randint(0, 15)
-        row["Hierro (Fe) ppm"] = np.random.randint(0, 100)
-        row["Aluminio (Al) ppm"] = np.random.randint(0, 10)
-        row["Cobre (Cu) ppm"] = np.random.randint(0, 15)
-        row["TAN mg KOH/g"] = np.round(np.random.uniform(0, 2.0), 2)
-        row["Residuo Ferroso Total mg/kg"] = np.random.randint(0, 200)
-    elif criticidad == "Atencion":
-        row["Silicio (Si) ppm"] = np.random.randint(15, 25)
-        row["Hierro (Fe) ppm"] = np.random.randint(100, 200)
-        row["Aluminio (Al) ppm"] = np.random.randint(10, 20)
-        row["Cobre (Cu) ppm"] = np.random.randint(15, 30)
-        row["TAN mg KOH/g"] = np.round(np.random.uniform(2.0, 3.0), 2)
-        row["Residuo Ferroso Total mg/kg"] = np.random.randint(200, 500)
-    elif criticidad == "Critico":
-        row["Silicio (Si) ppm"] = np.random.randint(25, 50)
-        row["Hierro (Fe) ppm"] = np.random.randint(200, 300)
-        row["Aluminio (Al) ppm"] = np.random.randint(20, 30)
-        row["Cobre (Cu) ppm"] = np.random.randint(30, 50)
-        row["TAN mg KOH/g"] = np.round(np.random.uniform(3.0, 4.0), 2)
-        row["Residuo Ferroso Total mg/kg"] = np.random.randint(500, 600)
-    return row
-
-# Función para generar datos aleatorios con distribución de criticidad controlada
-def generar_datos_historicos(fecha_inicio, fecha_fin):
-    global NUM_MUESTRA_DIGITOS, NUM_REGISTRO
-    cargar_estado()
-
-    # Crear un rango de fechas entre la fecha inicial y la fecha final
-    rango_fechas = pd.date_range(start=fecha_inicio, end=fecha_fin, freq='D')
-
-    datos = {
-        "Fecha": [],
-        "Equipo": [],
-        "Componente": [],
-        "Aceite Lubricante": [],
-        "nflota": [],
-        "cambioLubricanate": [],
-        "Contenido de agua %": [],
-        "Punto de inflamacion °C": [],
-        "Glicol %": [],
-        "Nitracion A/cm": [],
-        "Oxidación A/cm": [],
-        "Hollín %": [],
-        "Sulfatacion A/cm": [],
-        "Diesel %": [],
-        "N de part >4µm": [],
-        "N° de part >6µm": [],
-        "N° de part>14µm": [],
-        "Código ISO 4406": [],
-        "Viscosidad 100°C cSt(mm2/s)": [],
-        "Viscosidad 40°C cSt(mm2/s)": [],
-        "TAN mg KOH/g": [],
-        "TBN mg KOH/g": [],
-        "Plata (Ag) ppm": [],
-        "Aluminio (Al) ppm": [],
-        "Bario (Ba) ppm": [],
-        "Boro (B) ppm": [],
-        "Calcio (Ca) ppm": [],
-        "Cromo (Cr) ppm": [],
-        "Cobre (Cu) ppm": [],
-        "Hierro (Fe) ppm": [],
-        "Potasio (K) ppm": [],
-        "Magnesio (Mg) ppm": [],
-        "Molibdeno (Mo) ppm": [],
-        "Sodio (Na) ppm": [],
-        "Níquel (Ni) ppm": [],
-        "Plomo (Pb) ppm": [],
-        "Fósforo (P) ppm": [],
-        "Silicio (Si) ppm": [],
-        "Estaño (Sn) ppm": [],
-        "Titanio (Ti) ppm": [],
-        "Vanadio (V) ppm": [],
-        "Zinc (Zn) ppm": [],
-        "Residuo Ferroso Total mg/kg": [],
-        "Numero Muestra": [],
-        "Numero Registro": [],
-        "Numero Serie Equipo": []
-    }
-
-    for fecha in rango_fechas:
-        for _ in range(num_registros_diarios):
-            letra_muestra = np.random.choice(list(NUM_MUESTRA_LETRAS))
-            NUM_MUESTRA_DIGITOS += 1
-            numero_muestra = f"{letra_muestra}{NUM_MUESTRA_DIGITOS:05d}"
-            NUM_REGISTRO += 1
-            numero_registro = f"{NUM_REGISTRO:07d}"
-            numero_serie_equipo = f"LAJ{np.random.randint(0, 1000):03d}"
-
-            componente_seleccionado = np.random.choice(list(componentes_aceites.keys()))
-            aceite_lubricante = componentes_aceites[componente_seleccionado]
-
-            datos["Fecha"].append(fecha)
-            datos["Equipo"].append(np.random.choice(equipos))
-            datos["Componente"].append(componente_seleccionado)
-            datos["Aceite Lubricante"].append(aceite_lubricante)
-            datos["nflota"].append(np.random.choice(nflota))
-            datos["cambioLubricanate"].append(np.random.choice(cambioLubricanate))
-            datos["Contenido de agua %"].append(np.round(np.random.uniform(0, 1), 2))
-            datos["Punto de inflamacion °C"].append(np.random.randint(180, 250))
-            datos["Glicol %"].append(np.round(np.random.uniform(0, 0.5), 2))
-            datos["Nitracion A/cm"].append(np.random.randint(0, 5))
-            datos["Oxidación A/cm"].append(np.random.randint(0, 5))
-            datos["Hollín %"].append(np.round(np.random.uniform(0, 2), 2))
-            datos["Sulfatacion A/cm"].append(np.random.randint(0, 5))
-            datos["Diesel %"].append(np.round(np.random.uniform(0, 1), 2))
-            datos["N de part >4µm"].append(np.random.randint(1000, 10000))
-            datos["N° de part >6µm"].append(np.random.randint(500, 5000))
-            datos["N° de part>14µm"].append(np.random.randint(100, 1000))
-            datos["Código ISO 4406"].append(f"{np.random.randint(18, 22)}/{np.random.randint(16, 20)}/{np.random.randint(13, 17)}")
-            datos["Viscosidad 100°C cSt(mm2/s)"].append(np.round(np.random.uniform(10, 20), 2))
-            datos["Viscosidad 40°C cSt(mm2/s)"].append(np.round(np.random.uniform(80, 120), 2))
-            datos["TAN mg KOH/g"].append(np.round(np.random.uniform(0, 3), 2))
-            datos["TBN mg KOH/g"].append(np.random.randint(0, 10))
-            datos["Plata (Ag) ppm"].append(np.random.randint(0, 5))
-            datos["Aluminio (Al) ppm"].append(np.random.randint(0, 30))
-            datos["Bario (Ba) ppm"].append(np.random.randint(0, 10))
-            datos["Boro (B) ppm"].append(np.random.randint(0, 10))
-            datos["Calcio (Ca) ppm"].append(np.random.randint(0, 1000))
-            datos["Cromo (Cr) ppm"].append(np.random.randint(0, 10))
-            datos["Cobre (Cu) ppm"].append(np.random.randint(0, 50))
-            datos["Hierro (Fe) ppm"].append(np.random.randint(0, 300))
-            datos["Potasio (K) ppm"].append(np.random.randint(0, 10))
-            datos["Magnesio (Mg) ppm"].append(np.random.randint(0, 10))
-            datos["Molibdeno (Mo) ppm"].append(np.random.randint(0, 10))
-            datos["Sodio (Na) ppm"].append(np.random.randint(0, 30))
-            datos["Níquel (Ni) ppm"].append(np.random.randint(0, 10))
-            datos["Plomo (Pb) ppm"].append(np.random.randint(0, 10))
-            datos["Fósforo (P) ppm"].append(np.random.randint(0, 10))
-            datos["Silicio (Si) ppm"].append(np.random.randint(0, 50))
-            datos["Estaño (Sn) ppm"].append(np.random.randint(0, 10))
-            datos["Titanio (Ti) ppm"].append(np.random.randint(0, 10))
-            datos["Vanadio (V) ppm"].append(np.random.randint(0, 10))
-            datos["Zinc (Zn) ppm"].append(np.random.randint(0, 100))
-            datos["Residuo Ferroso Total mg/kg"].append(np.random.randint(0, 600))
-            datos["Numero Muestra"].append(numero_muestra)
-            datos["Numero Registro"].append(numero_registro)
-            datos["Numero Serie Equipo"].append(numero_serie_equipo)
-
-    guardar_estado()
-    df = pd.DataFrame(datos)
-    df["Criticidad"] = [generar_criticidad() for _ in range(len(df))]
-    df = df.apply(ajustar_valores, axis=1)
-    return df
-
-# Función para guardar datos en el archivo CSV
-def guardar_datos(df_nuevos, archivo="data/datos_generados.csv"):
-    os.makedirs(os.path.dirname(archivo), exist_ok=True)
-    try:
-        df_existente = pd.read_csv(archivo)
-        df_final = pd.concat([df_existente, df_nuevos], ignore_index=True)
-    except FileNotFoundError:
-        df_final = df_nuevos
-    df_final.to_csv(archivo, index=False)
+# Números correlativos: se reservan por bloques en data/estado_generador.txt
+asignador = AsignadorSecuencias()
+
+# Función para generar un tramo de días consecutivos con el motor por columnas.
+# Se ejecuta en un proceso hijo: recibe todo lo necesario para ser determinista
+# (numeración inicial y semilla propia del tramo) y no toca el archivo de estado.
+def generar_tramo(inicio, dias, registros_diarios, muestra_inicial, registro_inicial, semilla):
+    rng = crear_generador(semilla)
+    fechas = np.repeat(pd.date_range(start=inicio, periods=dias, freq="D").values, registros_diarios)
+    return generar_lote(len(fechas), rng, fechas=fechas,
+                        muestra_inicial=muestra_inicial, registro_inicial=registro_inicial)
+
+# Función para dividir el rango de fechas en tramos de "dias_por_tramo" días
+def dividir_en_tramos(fecha_inicio, fecha_fin, dias_por_tramo):
+    rango_fechas = pd.date_range(start=fecha_inicio, end=fecha_fin, freq="D")
+    return [(rango_fechas[i], len(rango_fechas[i:i + dias_por_tramo]))
+            for i in range(0, len(rango_fechas), dias_por_tramo)]
+
+# Función para generar datos históricos con distribución de criticidad controlada
+def generar_datos_historicos(fecha_inicio, fecha_fin, semilla=None):
+    dias = len(pd.date_range(start=fecha_inicio, end=fecha_fin, freq="D"))
+    muestra_inicial, registro_inicial = asignador.reservar(dias * num_registros_diarios)
+    return generar_tramo(fecha_inicio, dias, num_registros_diarios, muestra_inicial, registro_inicial, semilla)
+
+# Función que genera un tramo y lo devuelve ya serializado como CSV, para que
+# el formateo de texto (la parte más cara) también se reparta entre los
+# procesos. Las columnas van en el orden de la cabecera del CSV de destino
+# ("columnas", sin repetirla) y Fecha en su formato.
+def generar_tramo_csv(inicio, dias, registros_diarios, muestra_inicial, registro_inicial, semilla, columnas,
+                      fechas_enteras=True):
+    df_tramo = generar_tramo(inicio, dias, registros_diarios, muestra_inicial, registro_inicial, semilla)
+    sobrantes = [c for c in df_tramo.columns if c not in columnas]
+    if sobrantes:
+        raise ValueError(f"El tramo trae columnas que no están en la cabecera del CSV: {sobrantes}")
+    df_tramo = df_tramo.reindex(columns=columnas)
+    return fechas_csv(df_tramo, fechas_enteras).to_csv(header=False, index=False), len(df_tramo)
+
+# Función para rellenar el histórico en paralelo: divide el rango de fechas en
+# tramos, genera cada tramo en un pool de procesos con una semilla derivada
+# (SeedSequence.spawn) y va escribiendo los tramos en orden a medida que terminan.
+# Solo hay "procesos * 2" tramos en memoria a la vez, sin importar el largo del rango.
+def backfill_historico(fecha_inicio, fecha_fin, dias_por_tramo=90, registros_diarios=None,
+                       procesos=None, semilla=None, archivo=ARCHIVO_DATOS):
+    registros_diarios = registros_diarios or num_registros_diarios
+    procesos = procesos or os.cpu_count()
+    tramos = dividir_en_tramos(fecha_inicio, fecha_fin, dias_por_tramo)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tramos))
+
+    # Reservar de una vez toda la numeración del backfill: cada tramo conoce
+    # su número inicial sin depender de los demás
+    total = sum(dias for _, dias in tramos) * registros_diarios
+    muestra_base, registro_base = asignador.reservar(total)
+
+    inicio_reloj = time.perf_counter()
+    with EscritorCSV(archivo, lotes_por_sync=procesos) as escritor, ProcessPoolExecutor(max_workers=procesos) as pool:
+        # La cabecera del CSV (la del esquema si el archivo es nuevo), leída bajo el bloqueo
+        columnas, enteras = escritor.preparar(list(ESQUEMA))
+        pendientes = deque()
+        desplazamiento = 0
+        for (inicio, dias), semilla_tramo in zip(tramos, semillas):
+            pendientes.append(pool.submit(generar_tramo_csv, inicio, dias, registros_diarios,
+                                          muestra_base + desplazamiento, registro_base + desplazamiento,
+                                          semilla_tramo, columnas, enteras))
+            desplazamiento += dias * registros_diarios
+            # Limitar los tramos en vuelo para acotar la memoria
+            if len(pendientes) >= procesos * 2:
+                escritor.escribir_texto(*pendientes.popleft().result())
+        while pendientes:
+            escritor.escribir_texto(*pendientes.popleft().result())
+
+    # El almacén columnar de ese CSV se pone al día con lo que se agregó
+    asegurar_almacen(almacen_del_csv(archivo), archivo)
+
+    escritas = escritor.filas_escritas
+    segundos = time.perf_counter() - inicio_reloj
+    print(f"{escritas} registros en {len(tramos)} tramos, {segundos:.1f} s ({escritas / segundos:,.0f} filas/s)")
+    return escritas
 
 # Bucle principal
 if __name__ == "__main__":
-    fecha_inicio = datetime(2022, 1, 1)  # Fecha inicial
-    fecha_fin = datetime.now()  # Fecha actual
+    parser = argparse.ArgumentParser(description="Genera datos históricos en paralelo por tramos de fechas")
+    parser.add_argument("--desde", default="2022-01-01", help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", default=None, help="Fecha final (AAAA-MM-DD), por defecto hoy")
+    parser.add_argument("--registros-diarios", type=int, default=num_registros_diarios)
+    parser.add_argument("--dias-por-tramo", type=int, default=90)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--semilla", type=int, default=None)
+    args = parser.parse_args()
+
+    fecha_inicio = datetime.fromisoformat(args.desde)  # Fecha inicial
+    fecha_fin = datetime.fromisoformat(args.hasta) if args.hasta else datetime.now()  # Fecha actual
     print("Generando datos históricos...")
-    df_historicos = generar_datos_historicos(fecha_inicio, fecha_fin)
-    guardar_datos(df_historicos)
-    print("Datos históricos generados y guardados.")
\ No newline at end of file
+    backfill_historico(fecha_inicio, fecha_fin, dias_por_tramo=args.dias_por_tramo,
+                       registros_diarios=args.registros_diarios, procesos=args.procesos, semilla=args.semilla)
+    print("Datos históricos generados y guardados.")
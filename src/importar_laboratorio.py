@@ -0,0 +1,350 @@
+import argparse
+import json
+import os
+import re
+import time
+import unicodedata
+import numpy as np
+import pandas as pd
+from rutas import ARCHIVO_DATOS, RAIZ_ALMACEN, RAIZ_INDICE_INFORMES
+from esquema import ESQUEMA, aplicar_esquema
+from criticidad import NIVELES_CRITICIDAD, calcular_criticidad
+from iso4406 import COLUMNAS_ISO, agregar_codigos_iso
+from catalogo import aceite_por_componente
+from secuencias import AsignadorSecuencias
+from escritor_datos import EscritorCSV
+from indice_muestras import IndiceMuestras
+from almacen_columnar import asegurar_almacen
+
+try:
+    import openpyxl  # Solo para importar planillas .xlsx
+except ImportError:
+    openpyxl = None
+
+# Importador de informes de laboratorio (CSV o XLSX exportados por el
+# proveedor) a data/datos_generados.csv.
+#
+# El archivo se lee por bloques de FILAS_POR_BLOQUE filas (read_csv con
+# chunksize, o openpyxl en modo solo lectura para .xlsx), así la memoria no
+# depende del tamaño del archivo. Cada bloque:
+#   1. renombra las columnas del proveedor a las del esquema (nombres del
+#      esquema, alias conocidos o un mapa JSON propio con --mapa);
+#   2. convierte unidades (ppm <-> %, °F -> °C, mg/kg = ppm, mm2/s = cSt)
+#      según la unidad que trae el encabezado, p. ej. "Water (ppm)";
+#   3. valida: fecha, clave del informe, números no negativos que entren en
+#      el tipo del esquema. Los análisis que el informe no trae (o trae
+#      vacíos) quedan vacíos si su columna es decimal; las columnas enteras
+#      no admiten vacíos. Las filas que no pasan van a
+#      "<archivo>.rechazados.csv" con el motivo;
+#   4. completa lo que se puede calcular (códigos ISO 4406, aceite por
+#      componente, Numero Registro desde el asignador de secuencias) y la
+#      criticidad con la tabla de límites del repo (la evaluación del
+#      laboratorio usa otra escala, así que no se toma);
+#   5. se agrega por el mismo camino que el pipeline de ingesta: EscritorCSV
+#      con un índice de muestras, acá con la clave del laboratorio
+#      (CLAVE_INFORME, en data/indice_informes): un informe importado dos veces
+#      no duplica filas. Las repetidas se descartan antes de pedir Numero
+#      Registro, así que solo las filas nuevas consumen números. Al terminar,
+#      el almacén columnar se pone al día con el CSV.
+
+FILAS_POR_BLOQUE = 50_000
+
+# Columnas que identifican una muestra del laboratorio (el número de muestra
+# del informe no es único fuera de su fecha y equipo)
+CLAVE_INFORME = ["Numero Muestra", "Fecha", "Equipo", "nflota", "Componente"]
+
+# Columnas que se pueden calcular si el informe no las trae
+CALCULABLES = ["Aceite Lubricante", *COLUMNAS_ISO, "Numero Registro", "Criticidad"]
+
+# Columnas que el informe tiene que traer: la clave y las enteras del esquema,
+# que no tienen cómo guardar un vacío. Las demás, si faltan, quedan vacías.
+OBLIGATORIAS = CLAVE_INFORME + [c for c, t in ESQUEMA.items() if t.startswith("int") and c not in CALCULABLES]
+
+# Unidad en la que guarda el esquema cada columna con unidad convertible
+UNIDADES = {
+    "Contenido de agua %": "%",
+    "Glicol %": "%",
+    "Hollín %": "%",
+    "Diesel %": "%",
+    "Punto de inflamacion °C": "°c",
+    "Viscosidad 100°C cSt(mm2/s)": "cst",
+    "Viscosidad 40°C cSt(mm2/s)": "cst",
+    "Residuo Ferroso Total mg/kg": "ppm",
+    **{c: "ppm" for c in ESQUEMA if c.endswith(" ppm")},
+}
+
+# Nombres de unidad equivalentes
+_UNIDADES_EQUIVALENTES = {"mg/kg": "ppm", "mg/l": "ppm", "mm2/s": "cst", "mm²/s": "cst", "c": "°c", "ºc": "°c",
+                          "f": "°f", "ºf": "°f", "% vol": "%", "%vol": "%", "% wt": "%"}
+
+# Conversiones (unidad del informe, unidad del esquema) -> función
+CONVERSIONES = {
+    ("ppm", "%"): lambda v: v / 10_000,
+    ("%", "ppm"): lambda v: v * 10_000,
+    ("°f", "°c"): lambda v: (v - 32) * 5 / 9,
+}
+
+# Elementos en inglés (los nombres en castellano y los símbolos salen del esquema)
+_ELEMENTOS_INGLES = {
+    "ag": "silver", "al": "aluminum", "ba": "barium", "b": "boron", "ca": "calcium", "cr": "chromium",
+    "cu": "copper", "fe": "iron", "k": "potassium", "mg": "magnesium", "mo": "molybdenum", "na": "sodium",
+    "ni": "nickel", "pb": "lead", "p": "phosphorus", "si": "silicon", "sn": "tin", "ti": "titanium",
+    "v": "vanadium", "zn": "zinc",
+}
+
+# Alias habituales en los informes de laboratorio (normalizados, ver _normalizar)
+ALIAS = {
+    "fecha muestreo": "Fecha", "fecha de muestreo": "Fecha", "fecha muestra": "Fecha", "sample date": "Fecha",
+    "date sampled": "Fecha",
+    "equipment": "Equipo", "equipment model": "Equipo", "modelo equipo": "Equipo", "unit model": "Equipo",
+    "component": "Componente", "compartment": "Componente", "compartimiento": "Componente",
+    "lubricante": "Aceite Lubricante", "aceite": "Aceite Lubricante", "oil": "Aceite Lubricante",
+    "lubricant": "Aceite Lubricante", "oil type": "Aceite Lubricante",
+    "flota": "nflota", "fleet": "nflota", "unit number": "nflota", "unit id": "nflota",
+    "cambio lubricante": "cambioLubricanate", "oil changed": "cambioLubricanate", "sample type": "cambioLubricanate",
+    "agua": "Contenido de agua %", "water": "Contenido de agua %", "water content": "Contenido de agua %",
+    "flash point": "Punto de inflamacion °C", "punto de inflamacion": "Punto de inflamacion °C",
+    "glycol": "Glicol %", "glicol": "Glicol %",
+    "nitration": "Nitracion A/cm", "nitracion": "Nitracion A/cm",
+    "oxidation": "Oxidación A/cm", "oxidacion": "Oxidación A/cm",
+    "soot": "Hollín %", "hollin": "Hollín %",
+    "sulfation": "Sulfatacion A/cm", "sulfatacion": "Sulfatacion A/cm",
+    "fuel": "Diesel %", "fuel dilution": "Diesel %", "dilucion combustible": "Diesel %",
+    "particles 4um": "N de part >4µm", "particles 4": "N de part >4µm",
+    "particles 6um": "N° de part >6µm", "particles 6": "N° de part >6µm",
+    "particles 14um": "N° de part>14µm", "particles 14": "N° de part>14µm",
+    "visc 100c": "Viscosidad 100°C cSt(mm2/s)", "viscosity 100c": "Viscosidad 100°C cSt(mm2/s)",
+    "viscosity 100 c": "Viscosidad 100°C cSt(mm2/s)", "viscosidad 100 c": "Viscosidad 100°C cSt(mm2/s)",
+    "visc 40c": "Viscosidad 40°C cSt(mm2/s)", "viscosity 40c": "Viscosidad 40°C cSt(mm2/s)",
+    "viscosity 40 c": "Viscosidad 40°C cSt(mm2/s)", "viscosidad 40 c": "Viscosidad 40°C cSt(mm2/s)",
+    "tan": "TAN mg KOH/g", "tbn": "TBN mg KOH/g",
+    "ferrous debris": "Residuo Ferroso Total mg/kg", "residuo ferroso": "Residuo Ferroso Total mg/kg",
+    "sample number": "Numero Muestra", "sample no": "Numero Muestra", "sample id": "Numero Muestra",
+    "n muestra": "Numero Muestra", "numero de muestra": "Numero Muestra",
+    "lab number": "Numero Registro", "lab no": "Numero Registro", "registro": "Numero Registro",
+    "serial number": "Numero Serie Equipo", "serie equipo": "Numero Serie Equipo", "n serie": "Numero Serie Equipo",
+}
+
+# Función para normalizar un encabezado: minúsculas, sin tildes ni signos
+def _normalizar(nombre):
+    texto = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", texto))
+
+# Función para armar la tabla encabezado normalizado -> columna del esquema
+def _nombres_conocidos(mapa=None):
+    conocidos = {_normalizar(c): c for c in ESQUEMA}
+    for columna in ESQUEMA:
+        elemento = re.fullmatch(r"(.+) \((\w+)\) ppm", columna)
+        if elemento:  # "Hierro (Fe) ppm": también "hierro", "fe" e "iron"
+            nombre, simbolo = _normalizar(elemento.group(1)), elemento.group(2).lower()
+            for alias in (nombre, simbolo, _ELEMENTOS_INGLES.get(simbolo)):
+                conocidos.setdefault(alias, columna)
+    conocidos.update(ALIAS)
+    conocidos.update({_normalizar(k): v for k, v in (mapa or {}).items()})
+    return conocidos
+
+# Función para separar la unidad del final de un encabezado: "Water (ppm)" -> ("Water", "ppm")
+def _separar_unidad(encabezado):
+    partes = re.fullmatch(r"\s*(.*?)\s*[\(\[]\s*([^\)\]]+?)\s*[\)\]]\s*", str(encabezado))
+    if not partes:
+        return encabezado, None
+    unidad = partes.group(2).lower()
+    return partes.group(1), _UNIDADES_EQUIVALENTES.get(unidad, unidad)
+
+# Función para decidir a qué columna del esquema va cada columna del informe y
+# con qué conversión de unidad. Devuelve {encabezado: (columna, conversión o None)}.
+def mapear_columnas(encabezados, mapa=None):
+    conocidos = _nombres_conocidos(mapa)
+    asignadas, errores = {}, []
+    for encabezado in encabezados:
+        columna, unidad = conocidos.get(_normalizar(encabezado)), None
+        if columna is None:
+            base, unidad = _separar_unidad(encabezado)
+            columna = conocidos.get(_normalizar(base))
+        if columna is None:
+            continue  # Columnas del informe que no están en el esquema
+        conversion = None
+        destino = UNIDADES.get(columna)
+        if unidad is not None and destino is not None and unidad != destino:
+            conversion = CONVERSIONES.get((unidad, destino))
+            if conversion is None:
+                errores.append(f"{encabezado!r}: no se sabe convertir {unidad} a {destino}")
+        if columna in (c for c, _ in asignadas.values()):
+            errores.append(f"{encabezado!r}: la columna {columna!r} ya viene en otra columna del informe")
+        asignadas[encabezado] = (columna, conversion)
+    presentes = {c for c, _ in asignadas.values()}
+    faltantes = [c for c in OBLIGATORIAS if c not in presentes]
+    if faltantes:
+        errores.append(f"faltan columnas: {faltantes}")
+    if errores:
+        raise ValueError("El informe no se puede importar:\n  " + "\n  ".join(errores))
+    return asignadas
+
+# Función para validar y normalizar un bloque ya renombrado. Devuelve
+# (filas válidas con el esquema, filas rechazadas con la columna "Motivo").
+def normalizar_bloque(bloque, conversiones=None, formato_fecha="ISO8601", decimal="."):
+    conversiones = conversiones or {}
+    motivo = np.full(len(bloque), None, dtype=object)  # Primer motivo de rechazo de cada fila
+    validas = np.ones(len(bloque), dtype=bool)
+
+    def rechazar(mascara, texto):
+        nuevas = np.asarray(mascara) & validas
+        motivo[nuevas] = texto
+        validas[nuevas] = False
+
+    salida = {}
+    fechas = pd.to_datetime(bloque["Fecha"], format=formato_fecha, errors="coerce")
+    rechazar(fechas.isna(), "Fecha inválida")
+    salida["Fecha"] = fechas
+    for columna, tipo in ESQUEMA.items():
+        if columna == "Fecha" or columna not in bloque.columns:
+            continue
+        valores = bloque[columna]
+        if tipo in ("category", "str"):
+            texto = (valores if valores.dtype == "str" else valores.astype("str")).str.strip()
+            vacios = valores.isna() | (texto == "")
+            if columna in CLAVE_INFORME:
+                rechazar(vacios.to_numpy(), f"{columna} vacío")
+            salida[columna] = texto.mask(vacios)
+            continue
+        if decimal != "." and not pd.api.types.is_numeric_dtype(valores):
+            valores = valores.astype("str").str.replace(".", "", regex=False).str.replace(decimal, ".", regex=False)
+        numeros = pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        if columna in conversiones:
+            numeros = conversiones[columna](numeros)
+        if tipo.startswith("int"):
+            rechazar(np.isnan(numeros), f"{columna} vacío o no numérico")
+        else:  # Vacío queda vacío; un texto que no es número se rechaza
+            vacios = (valores.isna() | (valores.astype("str").str.strip() == "")).to_numpy()
+            rechazar(np.isnan(numeros) & ~vacios, f"{columna} no numérico")
+        rechazar(numeros < 0, f"{columna} negativo")
+        if tipo.startswith("int"):
+            numeros = np.round(numeros)
+            rechazar(numeros > np.iinfo(tipo).max, f"{columna} fuera de rango")
+        salida[columna] = numeros
+    if "Criticidad" in salida:
+        rechazar(~salida["Criticidad"].isin(NIVELES_CRITICIDAD).to_numpy(), "Criticidad desconocida")
+
+    df = pd.DataFrame(salida, index=bloque.index)
+    if "Aceite Lubricante" not in df.columns:
+        df["Aceite Lubricante"] = df["Componente"].map(aceite_por_componente())
+        rechazar(df["Aceite Lubricante"].isna().to_numpy(), "Componente sin aceite en el catálogo")
+
+    rechazadas = bloque[~validas].assign(Motivo=motivo[~validas])
+    df = df[validas]
+    enteras = {c: t for c, t in ESQUEMA.items() if c in df.columns and t.startswith("int")}
+    df = df.astype(enteras)
+    if not all(c in df.columns for c in COLUMNAS_ISO):
+        df = agregar_codigos_iso(df.reindex(columns=[c for c in ESQUEMA if c in df.columns]))
+    if "Criticidad" not in df.columns:
+        df["Criticidad"] = calcular_criticidad(df)
+    return df, rechazadas
+
+# Función para leer un CSV del proveedor por bloques. Se mapean los encabezados
+# antes de leer: solo se leen las columnas que van al esquema, las de texto
+# como texto y las numéricas dejando que read_csv las convierta (con el
+# separador decimal del informe); un valor sucio deja esa columna como texto
+# y se valida después.
+def _bloques_csv(archivo, filas_por_bloque, mapa, separador, decimal, codificacion):
+    encabezados = pd.read_csv(archivo, nrows=0, sep=separador, encoding=codificacion).columns
+    asignadas = mapear_columnas(encabezados, mapa)
+    textos = {e: "str" for e, (c, _) in asignadas.items() if c == "Fecha" or ESQUEMA[c] in ("category", "str")}
+    bloques = pd.read_csv(archivo, chunksize=filas_por_bloque, usecols=list(asignadas), dtype=textos,
+                          sep=separador, decimal=decimal, encoding=codificacion)
+    return asignadas, bloques
+
+# Función para leer una planilla .xlsx por bloques, sin cargarla entera (modo solo lectura)
+def _bloques_xlsx(archivo, filas_por_bloque, hoja=None):
+    if openpyxl is None:
+        raise ImportError("Para importar planillas .xlsx hace falta openpyxl (pip install openpyxl)")
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = (libro[hoja] if hoja else libro.active).iter_rows(values_only=True)
+        encabezados = [str(c) if c is not None else "" for c in next(filas, ())]
+        bloque = []
+        for fila in filas:
+            if all(v is None for v in fila):
+                continue  # Filas vacías al final de la planilla
+            bloque.append(fila)
+            if len(bloque) >= filas_por_bloque:
+                yield pd.DataFrame(bloque, columns=encabezados)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezados)
+    finally:
+        libro.close()
+
+# Función para importar un informe completo; devuelve (filas importadas, filas rechazadas)
+def importar(archivo_informe, archivo=ARCHIVO_DATOS, raiz=RAIZ_ALMACEN, mapa=None, formato_fecha="ISO8601",
+             separador=",", decimal=".", codificacion="utf-8", hoja=None, filas_por_bloque=FILAS_POR_BLOQUE):
+    if archivo_informe.lower().endswith((".xlsx", ".xlsm")):
+        asignadas, bloques = None, _bloques_xlsx(archivo_informe, filas_por_bloque, hoja)
+    else:
+        asignadas, bloques = _bloques_csv(archivo_informe, filas_por_bloque, mapa, separador, decimal, codificacion)
+    archivo_rechazos = f"{archivo_informe}.rechazados.csv"
+    if os.path.exists(archivo_rechazos):
+        os.remove(archivo_rechazos)
+
+    asignador = AsignadorSecuencias()
+
+    # Numero Registro solo para las filas que pasaron el índice (bajo el bloqueo del CSV)
+    def numerar(df):
+        _, registro = asignador.reservar(len(df))
+        df = df.assign(**{"Numero Registro": np.arange(registro + 1, registro + len(df) + 1, dtype=np.int64)})
+        return df[list(ESQUEMA)]
+
+    leidas = importadas = rechazadas = repetidas = 0
+    inicio = time.perf_counter()
+    indice = IndiceMuestras(archivo, RAIZ_INDICE_INFORMES, columnas=CLAVE_INFORME)
+    with EscritorCSV(archivo, indice=indice) as escritor:
+        for bloque in bloques:
+            if asignadas is None:
+                asignadas = mapear_columnas(bloque.columns, mapa)
+            bloque = bloque[list(asignadas)].rename(columns={e: c for e, (c, _) in asignadas.items()})
+            conversiones = {c: f for c, f in asignadas.values() if f is not None}
+            df, rechazos = normalizar_bloque(bloque, conversiones, formato_fecha, decimal)
+            leidas += len(bloque)
+
+            trae_registro = "Numero Registro" in df.columns
+            df = aplicar_esquema(df.reindex(columns=[c for c in ESQUEMA if trae_registro or c != "Numero Registro"]))
+            escritas = escritor.escribir_nuevos(df, None if trae_registro else numerar)
+            importadas += len(escritas)
+            repetidas += len(df) - len(escritas)
+
+            if not rechazos.empty:
+                rechazos = rechazos.rename(columns={c: e for e, (c, _) in asignadas.items()})  # Como vinieron
+                rechazos.to_csv(archivo_rechazos, mode="a", header=rechazadas == 0, index=False)
+                rechazadas += len(rechazos)
+            segundos = time.perf_counter() - inicio
+            print(f"{leidas:,} filas leídas | {importadas:,} importadas | {rechazadas:,} rechazadas | "
+                  f"{repetidas:,} ya estaban ({leidas / segundos:,.0f} filas/s)")
+    asignador.liberar()  # Los números del bloque que no se usaron
+    asegurar_almacen(raiz, archivo)
+
+    segundos = time.perf_counter() - inicio
+    print(f"Total: {importadas:,} filas importadas de {archivo_informe} en {segundos:.1f} s "
+          f"({leidas / segundos if segundos else 0:,.0f} filas/s)")
+    if rechazadas:
+        print(f"{rechazadas:,} filas rechazadas, con el motivo, en {archivo_rechazos}")
+    return importadas, rechazadas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa un informe de laboratorio (CSV o XLSX) a los datos de muestras")
+    parser.add_argument("informe", help="Archivo .csv o .xlsx del laboratorio")
+    parser.add_argument("--mapa", default=None, help='JSON con {"columna del informe": "columna del esquema"}')
+    parser.add_argument("--formato-fecha", default="ISO8601", help="Formato strptime de las fechas (p. ej. %%d/%%m/%%Y)")
+    parser.add_argument("--separador", default=",")
+    parser.add_argument("--decimal", default=".", help="Separador decimal del informe")
+    parser.add_argument("--codificacion", default="utf-8")
+    parser.add_argument("--hoja", default=None, help="Hoja de la planilla (por defecto la activa)")
+    parser.add_argument("--filas-por-bloque", type=int, default=FILAS_POR_BLOQUE)
+    parser.add_argument("--archivo", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    args = parser.parse_args()
+
+    mapa = None
+    if args.mapa:
+        with open(args.mapa, encoding="utf-8") as f:
+            mapa = json.load(f)
+    importar(args.informe, args.archivo, args.raiz, mapa, args.formato_fecha, args.separador, args.decimal,
+             args.codificacion, args.hoja, args.filas_por_bloque)
@@ -0,0 +1,265 @@
+import argparse
+import glob
+import io
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from rutas import ARCHIVO_DATOS, RAIZ_ARCHIVO, RAIZ_INDICE
+from esquema import fechas_csv
+from almacen_columnar import leer_dataset
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
+from secuencias import bloqueo_archivo
+
+# Índice persistente de los números de registro ya ingresados, para que la
+# ingesta sea idempotente: si un generador se corta entre guardar el lote y
+# guardar el estado (o al revés) y al reiniciar vuelve a mandar los mismos
+# números, las filas repetidas se descartan antes de escribirlas.
+#
+#   data/indice_muestras/base-<n>.npy        (int64 ordenado, mapeado en memoria)
+#   data/indice_muestras/recientes-<n>.npy   (int64 ordenado, tramo chico)
+#   data/indice_muestras/estado.json         (archivos vigentes, bytes del CSV cubiertos, huella)
+#
+# En memoria, los números nuevos van a un set; al cerrar el escritor se
+# vuelcan ordenados a recientes-<n>.npy, y cuando pasan de LIMITE_RECIENTES
+# se mezclan con la base. Buscar un lote cuesta O(lote): un searchsorted
+# sobre la base mapeada y consultas al set, sin recorrer el CSV.
+#
+# El índice se deriva del CSV (y del archivo histórico) igual que SQLite:
+# estado.json guarda hasta qué byte del CSV está cubierto y, al abrirlo, se
+# leen solo los números de las filas agregadas después (por ejemplo las del
+# backfill, que no pasa por el índice). Si el CSV se reescribió (archivado) o
+# el estado no existe, se reconstruye leyendo solo las columnas de la clave.
+# estado.json se reemplaza de forma atómica después de escribir los .npy, así
+# que un corte a mitad de camino deja el índice anterior, que se pone al día solo.
+#
+# La clave es Numero Registro: el asignador de secuencias lo entrega junto con
+# Numero Muestra y, a diferencia de éste, no lleva una letra sorteada. Con
+# "columnas" el índice usa una clave compuesta (un hash int64 de esas columnas),
+# para filas que llegan sin número propio: p. ej. los informes de laboratorio,
+# que se reconocen por su Numero Muestra, fecha y equipo (data/indice_informes).
+#
+# Todos los métodos que leen o escriben el CSV suponen que quien llama tiene
+# tomado el bloqueo del CSV (EscritorCSV lo hace).
+
+COLUMNA_CLAVE = "Numero Registro"
+LIMITE_RECIENTES = 200_000  # Números en el set antes de mezclarlos con la base
+
+def _leer_estado(raiz):
+    try:
+        with open(os.path.join(raiz, "estado.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _escribir_npy(raiz, nombre, valores):
+    ruta = os.path.join(raiz, nombre)
+    with open(ruta, "wb") as f:
+        np.save(f, valores)
+        f.flush()
+        os.fsync(f.fileno())
+    return nombre
+
+def _leer_npy(raiz, nombre):
+    valores = np.load(os.path.join(raiz, nombre), mmap_mode="r")
+    return valores if len(valores) else np.empty(0, dtype=np.int64)  # np.load no mapea arreglos vacíos
+
+# Función para obtener la clave (int64) de cada fila: Numero Registro o, con
+# una clave compuesta, el hash de sus columnas (Fecha en nanosegundos y el
+# resto como texto, así da lo mismo desde el CSV, el almacén o un lote)
+def claves_filas(df, columnas=(COLUMNA_CLAVE,)):
+    columnas = list(columnas)
+    if columnas == [COLUMNA_CLAVE]:
+        return df[COLUMNA_CLAVE].to_numpy(dtype=np.int64)
+    partes = fechas_csv(df[columnas])
+    partes = partes.astype({c: "str" for c in columnas if c != "Fecha"}).fillna("")
+    return pd.util.hash_pandas_object(partes, index=False).to_numpy().view(np.int64)
+
+# Función para leer las claves de un trozo de CSV (sin cabecera)
+def _claves_texto(texto, cabecera, columnas=(COLUMNA_CLAVE,)):
+    tipos = {c: "int64" if c == COLUMNA_CLAVE else "str" for c in columnas if c != "Fecha"}
+    df = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, usecols=list(columnas), dtype=tipos)
+    return claves_filas(df, columnas)
+
+class IndiceMuestras:
+    def __init__(self, archivo_csv=ARCHIVO_DATOS, raiz=RAIZ_INDICE, raiz_archivo=RAIZ_ARCHIVO,
+                 limite_recientes=LIMITE_RECIENTES, columnas=(COLUMNA_CLAVE,)):
+        self.archivo_csv = archivo_csv
+        self.columnas = list(columnas)
+        self.raiz = raiz
+        self.raiz_archivo = raiz_archivo
+        self.limite_recientes = limite_recientes
+        self.base = np.empty(0, dtype=np.int64)  # Ordenado, sin repetidos
+        self.recientes = set()
+        self.desplazamiento = 0  # Byte del CSV hasta donde están los números en el índice
+        self._huella = None
+        self._archivos = {}  # Archivos .npy vigentes según estado.json
+        self._sin_volcar = False
+        self._cargado = False
+
+    def __len__(self):
+        self._asegurar_cargado()
+        return len(self.base) + len(self.recientes)
+
+    def _asegurar_cargado(self):
+        if not self._cargado:
+            self._cargado = True
+            self._cargar()
+
+    # Función para abrir el índice guardado (o reconstruirlo si no sirve para el CSV actual)
+    def _cargar(self):
+        estado = _leer_estado(self.raiz)
+        if estado is None or not self._cubre(estado["bytes_csv"], estado["huella"]):
+            self._reconstruir()
+            return
+        try:
+            self.base = _leer_npy(self.raiz, estado["base"])
+            self.recientes = set(_leer_npy(self.raiz, estado["recientes"]).tolist())
+        except FileNotFoundError:
+            self._reconstruir()
+            return
+        self._archivos = {"base": estado["base"], "recientes": estado["recientes"]}
+        self.desplazamiento, self._huella = estado["bytes_csv"], estado["huella"]
+        self.actualizar()
+
+    # Función para saber si el CSV actual sigue siendo el que se indexó hasta "bytes_csv"
+    def _cubre(self, bytes_csv, huella):
+        try:
+            tamano = os.path.getsize(self.archivo_csv)
+        except FileNotFoundError:
+            return bytes_csv == 0
+        if bytes_csv == 0:
+            return True
+        return tamano >= bytes_csv and huella_csv(self.archivo_csv, bytes_csv) == huella
+
+    # Función para reconstruir el índice desde el archivo histórico y el CSV completos
+    def _reconstruir(self):
+        inicio = time.perf_counter()
+        partes = []
+        archivadas = leer_dataset(self.columnas, raiz=self.raiz_archivo, asegurar=False)
+        if not archivadas.empty:
+            partes.append(claves_filas(archivadas, self.columnas))
+        self.base, self.recientes, self._archivos = np.empty(0, dtype=np.int64), set(), {}
+        self.desplazamiento, self._huella = 0, None
+        partes.extend(self._leer_cola())
+        self.base = np.unique(np.concatenate(partes)) if partes else self.base
+        self._sin_volcar = True
+        self.volcar(mezclar=True)
+        print(f"Índice de muestras reconstruido: {len(self.base):,} números ({time.perf_counter() - inicio:.2f} s)")
+
+    # Función para leer los números de las filas del CSV posteriores a self.desplazamiento
+    def _leer_cola(self):
+        cabecera = leer_cabecera(self.archivo_csv)
+        if cabecera is None or any(c not in cabecera for c in self.columnas):
+            return []
+        partes = []
+        for texto, siguiente in leer_cola_csv(self.archivo_csv, self.desplazamiento):
+            partes.append(_claves_texto(texto, cabecera, self.columnas))
+            self.desplazamiento = siguiente
+        if partes:
+            self._huella = huella_csv(self.archivo_csv, self.desplazamiento)
+        return partes
+
+    # Función para incorporar lo que otros procesos agregaron al CSV desde la última vez
+    def actualizar(self):
+        self._asegurar_cargado()
+        if not self._cubre(self.desplazamiento, self._huella):
+            self._reconstruir()  # El CSV se reemplazó (archivado) o se truncó
+            return
+        try:
+            if os.path.getsize(self.archivo_csv) == self.desplazamiento:
+                return
+        except FileNotFoundError:
+            return
+        partes = self._leer_cola()
+        for parte in partes:
+            self.recientes.update(parte.tolist())
+        self._sin_volcar = self._sin_volcar or bool(partes)
+
+    # Función para saber qué números ya están en el índice (arreglo de booleanos)
+    def contiene(self, valores):
+        self._asegurar_cargado()
+        valores = np.asarray(valores, dtype=np.int64)
+        encontrados = np.zeros(len(valores), dtype=bool)
+        if len(self.base):
+            posiciones = np.minimum(np.searchsorted(self.base, valores), len(self.base) - 1)
+            encontrados = self.base[posiciones] == valores
+        if self.recientes:
+            encontrados |= np.fromiter((v in self.recientes for v in valores.tolist()), dtype=bool, count=len(valores))
+        return encontrados
+
+    # Función para quitar de un lote las filas cuya clave ya se ingresó (o que
+    # vienen repetidas dentro del mismo lote)
+    def filtrar(self, df):
+        if any(c not in df.columns for c in self.columnas) or df.empty:
+            return df
+        valores = claves_filas(df, self.columnas)
+        repetidas = self.contiene(valores) | pd.Series(valores).duplicated().to_numpy()
+        if not repetidas.any():
+            return df
+        print(f"{int(repetidas.sum())} filas descartadas por {' + '.join(self.columnas)} ya ingresado "
+              f"en {self.archivo_csv}")
+        return df[~repetidas]
+
+    # Función para anotar los números de un lote recién escrito; "bytes_csv" es
+    # el tamaño del CSV después de escribirlo
+    def registrar(self, df, bytes_csv):
+        self._asegurar_cargado()
+        if all(c in df.columns for c in self.columnas):
+            self.recientes.update(claves_filas(df, self.columnas).tolist())
+        self.desplazamiento = bytes_csv
+        self._huella = huella_csv(self.archivo_csv, bytes_csv)
+        self._sin_volcar = True
+
+    # Función para guardar el índice: los recientes ordenados en un .npy chico
+    # y, si pasaron el límite (o mezclar=True), mezclados con la base
+    def volcar(self, mezclar=False):
+        if not self._sin_volcar:
+            return
+        os.makedirs(self.raiz, exist_ok=True)
+        estado = _leer_estado(self.raiz) or {}
+        generacion = estado.get("generacion", 0) + 1
+        # Si otro proceso ya borró la base que tiene mapeada este, se vuelve a escribir
+        base_vigente = "base" in self._archivos and os.path.exists(os.path.join(self.raiz, self._archivos["base"]))
+        if mezclar or not base_vigente or len(self.recientes) > self.limite_recientes:
+            self.base = np.union1d(self.base, np.fromiter(self.recientes, dtype=np.int64, count=len(self.recientes)))
+            self.recientes = set()
+            self._archivos["base"] = _escribir_npy(self.raiz, f"base-{generacion}.npy", self.base)
+        recientes = np.sort(np.fromiter(self.recientes, dtype=np.int64, count=len(self.recientes)))
+        self._archivos["recientes"] = _escribir_npy(self.raiz, f"recientes-{generacion}.npy", recientes)
+
+        temporal = os.path.join(self.raiz, f"estado.json.{os.getpid()}.tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({**self._archivos, "generacion": generacion, "bytes_csv": self.desplazamiento,
+                       "huella": self._huella, "numeros": len(self.base) + len(self.recientes)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, os.path.join(self.raiz, "estado.json"))
+        self._sin_volcar = False
+
+        # Los volcados van bajo el bloqueo del CSV, así que lo que no nombra
+        # estado.json ya no se usa (un proceso que lo tenga mapeado lo sigue leyendo)
+        vigentes = set(self._archivos.values())
+        for ruta in glob.glob(os.path.join(self.raiz, "*.npy")):
+            if os.path.basename(ruta) not in vigentes:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass  # En Windows no se puede borrar un archivo mapeado; se borra la próxima vez
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de números de registro ya ingresados (ingesta idempotente)")
+    parser.add_argument("--archivo-csv", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz", default=RAIZ_INDICE)
+    parser.add_argument("--reconstruir", action="store_true", help="Volver a leer el CSV y el archivo completos")
+    args = parser.parse_args()
+
+    indice = IndiceMuestras(args.archivo_csv, args.raiz)
+    with bloqueo_archivo(args.archivo_csv):
+        if args.reconstruir:
+            indice._reconstruir()
+        else:
+            indice.actualizar()
+            indice.volcar()
+    print(f"{len(indice):,} números de registro en {args.raiz}")
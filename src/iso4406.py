@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Código de limpieza ISO 4406 calculado a partir de los conteos de partículas.
+#
+# Cada conteo (partículas por mL mayores a 4, 6 y 14 µm) se convierte en su
+# número de rango con una búsqueda binaria vectorizada sobre la tabla de la
+# norma. Se guardan los tres números como columnas enteras pequeñas (int8) que
+# se pueden filtrar y agregar; el texto "18/16/13" solo se arma al mostrarlo.
+# Los CSV con la columna de texto anterior se migran con migrar_iso4406.py.
+
+# Tabla de la norma: el rango r corresponde a LIMITES[r-1] < conteo <= LIMITES[r]
+# (partículas por mL). Conteos <= 0,01 quedan en 0 y > 2.500.000 se marcan como 29 (">28").
+LIMITES_ISO4406 = np.array([
+    0.01, 0.02, 0.04, 0.08, 0.16, 0.32, 0.64, 1.3, 2.5, 5, 10,
+    20, 40, 80, 160, 320, 640, 1_300, 2_500, 5_000, 10_000,
+    20_000, 40_000, 80_000, 160_000, 320_000, 640_000, 1_300_000, 2_500_000,
+])
+
+# Conteos de partículas y la columna de código que se deriva de cada uno
+COLUMNAS_PARTICULAS = ["N de part >4µm", "N° de part >6µm", "N° de part>14µm"]
+COLUMNAS_ISO = ["ISO 4406 >4µm", "ISO 4406 >6µm", "ISO 4406 >14µm"]
+
+# Columna de texto que se usaba antes (y que se arma solo para mostrar)
+COLUMNA_TEXTO = "Código ISO 4406"
+
+# Etiquetas precalculadas de cada rango, para no formatear fila a fila
+_ETIQUETAS = np.array([str(r) for r in range(len(LIMITES_ISO4406))] + [">28"], dtype=object)
+
+# Función para obtener el número de rango ISO 4406 de un arreglo de conteos
+def codigo_iso(conteos):
+    conteos = np.asarray(conteos, dtype=np.float64)
+    return np.searchsorted(LIMITES_ISO4406, conteos, side="left").astype(np.int8)
+
+# Función para calcular las tres columnas de código a partir de los conteos.
+# Acepta un DataFrame o un dict de columnas y devuelve un dict {columna: int8}.
+def codigos_iso(columnas):
+    return {iso: codigo_iso(columnas[particulas]) for particulas, iso in zip(COLUMNAS_PARTICULAS, COLUMNAS_ISO)}
+
+# Función para reemplazar el código de texto (si lo hay) por las tres columnas
+# enteras, ubicadas justo después de los conteos de partículas
+def agregar_codigos_iso(df):
+    df = df.drop(columns=[COLUMNA_TEXTO, *COLUMNAS_ISO], errors="ignore")
+    posicion = df.columns.get_loc(COLUMNAS_PARTICULAS[-1]) + 1
+    for desplazamiento, (columna, valores) in enumerate(codigos_iso(df).items()):
+        df.insert(posicion + desplazamiento, columna, valores)
+    return df
+
+# Función para decodificar las tres columnas al texto "r4/r6/r14"
+def texto_iso(df):
+    r4, r6, r14 = (_ETIQUETAS[df[c].to_numpy(dtype=np.intp)] for c in COLUMNAS_ISO)
+    return pd.Series(r4 + "/" + r6 + "/" + r14, index=df.index, name=COLUMNA_TEXTO)
+
+# Función para preparar un DataFrame para mostrarlo: cambia las tres columnas
+# enteras por el texto del código. No modifica el DataFrame original.
+def con_codigo_iso(df):
+    if not all(c in df.columns for c in COLUMNAS_ISO):
+        return df
+    posicion = df.columns.get_loc(COLUMNAS_ISO[0])
+    vista = df.drop(columns=COLUMNAS_ISO)
+    vista.insert(posicion, COLUMNA_TEXTO, texto_iso(df))
+    return vista
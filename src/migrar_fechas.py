@@ -0,0 +1,62 @@
+import argparse
+import io
+import os
+import time
+import pandas as pd
+from rutas import ARCHIVO_DATOS, RAIZ_AGREGADOS, RAIZ_ALMACEN
+from esquema import fechas_csv
+from escritor_datos import fechas_enteras, leer_cabecera, leer_cola_csv
+from secuencias import bloqueo_archivo
+import agregados
+import almacen_columnar
+
+# Migración (una sola vez) de Fecha en el CSV: del texto mezclado que dejaron
+# los generadores (microsegundos en las muestras en vivo, solo la fecha en el
+# backfill) a un entero en nanosegundos desde 1970. Después de migrar, ningún
+# lector vuelve a interpretar fechas: read_csv entrega int64 y aplicar_esquema
+# solo cambia el tipo.
+#
+# El archivo se reescribe por bloques y de forma atómica bajo el bloqueo del CSV
+# (los escritores esperan y luego abren el archivo nuevo). El resto de las
+# columnas se copia tal cual como texto. SQLite, el índice de muestras y el
+# cargador incremental ven que el CSV se reemplazó y se vuelven a cargar; el
+# almacén columnar (ya guarda Fecha como timestamp) y los agregados se ponen al
+# día antes y después solo adoptan el archivo nuevo, porque sus valores no cambian.
+
+# Función para migrar el CSV; devuelve las filas migradas (0 si ya estaba migrado)
+def migrar_csv(archivo=ARCHIVO_DATOS, raiz_agregados=RAIZ_AGREGADOS, raiz=RAIZ_ALMACEN):
+    cabecera = leer_cabecera(archivo)
+    if cabecera is None or "Fecha" not in cabecera:
+        return 0
+    with bloqueo_archivo(archivo):
+        if fechas_enteras(archivo):
+            return 0
+        inicio = time.perf_counter()
+        agregados.sincronizar(archivo, raiz_agregados)  # Al día con el archivo que se va a reemplazar
+        almacen_columnar.asegurar_almacen(raiz, archivo)
+        temporal = f"{archivo}.migrando-{os.getpid()}"
+        filas = 0
+        with open(archivo, "rb") as f, open(temporal, "wb") as salida:
+            salida.write(f.readline())  # La cabecera tal cual
+            for texto, _ in leer_cola_csv(archivo):
+                # Todo como texto, para que el resto de las columnas se copie tal cual
+                bloque = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=str, keep_default_na=False)
+                salida.write(fechas_csv(bloque).to_csv(header=False, index=False).encode("utf-8"))
+                filas += len(bloque)
+            salida.flush()
+            os.fsync(salida.fileno())
+        os.replace(temporal, archivo)
+        agregados.adoptar_csv(archivo, raiz_agregados)
+        almacen_columnar.adoptar_csv(archivo, raiz)
+    print(f"{filas:,} fechas migradas a nanosegundos en {archivo} ({time.perf_counter() - inicio:.2f} s)")
+    return filas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra Fecha del CSV a entero (nanosegundos desde 1970)")
+    parser.add_argument("--archivo", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz-agregados", default=RAIZ_AGREGADOS)
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    args = parser.parse_args()
+    filas = migrar_csv(args.archivo, args.raiz_agregados, args.raiz)
+    if not filas:
+        print("El archivo ya estaba migrado (o no existe)")
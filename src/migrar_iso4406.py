@@ -0,0 +1,54 @@
+import argparse
+import csv
+import io
+import os
+import time
+import pandas as pd
+from rutas import ARCHIVO_DATOS
+from escritor_datos import leer_cabecera, leer_cola_csv
+from iso4406 import COLUMNA_TEXTO, agregar_codigos_iso
+from secuencias import bloqueo_archivo
+
+# Migración (una sola vez) del código ISO 4406 en el CSV: de la columna de
+# texto "18/16/13" a las tres columnas enteras que se derivan de los conteos de
+# partículas (ver iso4406.py).
+#
+# El archivo se reescribe por bloques y de forma atómica bajo el bloqueo del CSV
+# (los escritores esperan y luego abren el archivo nuevo). El resto de las
+# columnas se copia tal cual como texto. Como cambia la cabecera, el almacén
+# columnar, SQLite, los agregados y el índice de muestras se vuelven a construir
+# desde el CSV migrado la próxima vez que se sincronizan.
+
+# Función para migrar el CSV; devuelve las filas migradas (0 si ya estaba migrado)
+def migrar_csv(archivo=ARCHIVO_DATOS):
+    cabecera = leer_cabecera(archivo)
+    if cabecera is None or COLUMNA_TEXTO not in cabecera:
+        return 0
+    with bloqueo_archivo(archivo):
+        cabecera = leer_cabecera(archivo)
+        if COLUMNA_TEXTO not in cabecera:
+            return 0  # Lo migró otro proceso mientras se esperaba el bloqueo
+        inicio = time.perf_counter()
+        temporal = f"{archivo}.migrando-{os.getpid()}"
+        filas = 0
+        with open(temporal, "w", encoding="utf-8", newline="") as salida:
+            nueva = agregar_codigos_iso(pd.DataFrame(columns=cabecera, dtype=str)).columns
+            csv.writer(salida).writerow(nueva)
+            for texto, _ in leer_cola_csv(archivo):
+                # Todo como texto, para que el resto de las columnas se copie tal cual
+                bloque = pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=str, keep_default_na=False)
+                agregar_codigos_iso(bloque).to_csv(salida, header=False, index=False)
+                filas += len(bloque)
+            salida.flush()
+            os.fsync(salida.fileno())
+        os.replace(temporal, archivo)
+    print(f"{filas:,} filas migradas al código ISO 4406 en tres columnas en {archivo} "
+          f"({time.perf_counter() - inicio:.2f} s)")
+    return filas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra el CSV al código ISO 4406 en tres columnas enteras")
+    parser.add_argument("--archivo", default=ARCHIVO_DATOS)
+    args = parser.parse_args()
+    if not migrar_csv(args.archivo):
+        print("El archivo ya estaba migrado (o no existe)")
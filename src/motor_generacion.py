@@ -0,0 +1,159 @@
+import pandas as pd
+import numpy as np
+from iso4406 import codigos_iso
+from esquema import aplicar_esquema
+from catalogo import etiquetas, aceite_por_componente
+from criticidad import NIVELES_CRITICIDAD
+from secuencias import DIGITOS_MUESTRA
+
+# Motor de generación por columnas: en lugar de recorrer las filas con
+# df.apply(...), cada columna se sortea completa de una sola vez con un
+# np.random.Generator, de modo que el costo por fila queda dentro de NumPy.
+
+# Dimensiones desde el catálogo compartido (data/catalogo.json)
+equipos = etiquetas("Equipo")
+nflota = etiquetas("nflota")
+cambioLubricanate = etiquetas("cambioLubricanate")
+componentes = etiquetas("Componente")
+
+# Asociación de componentes con aceites lubricantes
+componentes_aceites = aceite_por_componente()
+
+NUM_MUESTRA_LETRAS = "ABCDE"
+
+# Proporción de cada nivel de criticidad (65% / 20% / 15%)
+PROPORCION_CRITICIDAD = [0.65, 0.20, 0.15]
+
+# Rangos [min, max) por nivel de criticidad (Normal, Atencion, Critico),
+# los mismos que usaba ajustar_valores(row)
+RANGOS_CRITICIDAD = {
+    "Silicio (Si) ppm": [(0, 15), (15, 25), (25, 50)],
+    "Hierro (Fe) ppm": [(0, 100), (100, 200), (200, 300)],
+    "Aluminio (Al) ppm": [(0, 10), (10, 20), (20, 30)],
+    "Cobre (Cu) ppm": [(0, 15), (15, 30), (30, 50)],
+    "TAN mg KOH/g": [(0, 2.0), (2.0, 3.0), (3.0, 4.0)],
+    "Residuo Ferroso Total mg/kg": [(0, 200), (200, 500), (500, 600)],
+}
+# Columnas de RANGOS_CRITICIDAD que se sortean como reales (el resto son enteros)
+COLUMNAS_REALES = {"TAN mg KOH/g"}
+
+# Rangos base [min, max) de cada análisis, en el orden de columnas del CSV.
+# "entero" se sortea con integers(), "real" con uniform() redondeado a 2 decimales.
+RANGOS_BASE = {
+    "Contenido de agua %": ("real", 0, 1),
+    "Punto de inflamacion °C": ("entero", 180, 250),
+    "Glicol %": ("real", 0, 0.5),
+    "Nitracion A/cm": ("entero", 0, 5),
+    "Oxidación A/cm": ("entero", 0, 5),
+    "Hollín %": ("real", 0, 2),
+    "Sulfatacion A/cm": ("entero", 0, 5),
+    "Diesel %": ("real", 0, 1),
+    "N de part >4µm": ("entero", 1000, 10000),
+    "N° de part >6µm": ("entero", 500, 5000),
+    "N° de part>14µm": ("entero", 100, 1000),
+    "ISO 4406 >4µm": None,  # Los tres códigos ISO se calculan a partir de los conteos
+    "ISO 4406 >6µm": None,
+    "ISO 4406 >14µm": None,
+    "Viscosidad 100°C cSt(mm2/s)": ("real", 10, 20),
+    "Viscosidad 40°C cSt(mm2/s)": ("real", 80, 120),
+    "TAN mg KOH/g": ("real", 0, 3),
+    "TBN mg KOH/g": ("entero", 0, 10),
+    "Plata (Ag) ppm": ("entero", 0, 5),
+    "Aluminio (Al) ppm": ("entero", 0, 30),
+    "Bario (Ba) ppm": ("entero", 0, 10),
+    "Boro (B) ppm": ("entero", 0, 10),
+    "Calcio (Ca) ppm": ("entero", 0, 1000),
+    "Cromo (Cr) ppm": ("entero", 0, 10),
+    "Cobre (Cu) ppm": ("entero", 0, 50),
+    "Hierro (Fe) ppm": ("entero", 0, 300),
+    "Potasio (K) ppm": ("entero", 0, 10),
+    "Magnesio (Mg) ppm": ("entero", 0, 10),
+    "Molibdeno (Mo) ppm": ("entero", 0, 10),
+    "Sodio (Na) ppm": ("entero", 0, 30),
+    "Níquel (Ni) ppm": ("entero", 0, 10),
+    "Plomo (Pb) ppm": ("entero", 0, 10),
+    "Fósforo (P) ppm": ("entero", 0, 10),
+    "Silicio (Si) ppm": ("entero", 0, 50),
+    "Estaño (Sn) ppm": ("entero", 0, 10),
+    "Titanio (Ti) ppm": ("entero", 0, 10),
+    "Vanadio (V) ppm": ("entero", 0, 10),
+    "Zinc (Zn) ppm": ("entero", 0, 100),
+    "Residuo Ferroso Total mg/kg": ("entero", 0, 600),
+}
+
+# Tablas precalculadas para no formatear texto fila a fila: números de serie
+# (LAJ000 ... LAJ999)
+_SERIES_EQUIPO = [f"LAJ{i:03d}" for i in range(1000)]
+
+# Función para crear un generador reproducible
+def crear_generador(semilla=None):
+    return np.random.default_rng(semilla)
+
+# Función para sortear una columna completa dentro de [bajo, alto)
+def _sortear(rng, tipo, bajo, alto, n):
+    if tipo == "entero":
+        return rng.integers(bajo, alto, size=n)
+    return np.round(rng.uniform(bajo, alto, size=n), 2)
+
+# Función para sortear el nivel de criticidad de cada fila (códigos 0, 1, 2)
+def sortear_criticidad(rng, n):
+    return rng.choice(len(NIVELES_CRITICIDAD), size=n, p=PROPORCION_CRITICIDAD).astype(np.int8)
+
+# Función para ajustar, en bloque, las columnas que dependen de la criticidad.
+# Equivale a df.apply(ajustar_valores, axis=1) pero sin recorrer filas.
+def ajustar_por_criticidad(columnas, codigos, rng):
+    n = len(codigos)
+    for columna, rangos in RANGOS_CRITICIDAD.items():
+        bajos = np.array([r[0] for r in rangos])[codigos]
+        altos = np.array([r[1] for r in rangos])[codigos]
+        if columna in COLUMNAS_REALES:
+            columnas[columna] = np.round(rng.uniform(bajos, altos, size=n), 2)
+        else:
+            columnas[columna] = rng.integers(bajos, altos, size=n)
+    return columnas
+
+# Función para formatear los números correlativos de muestra y registro
+def numeros_correlativos(rng, n, muestra_inicial=0, registro_inicial=0):
+    letras = np.array(list(NUM_MUESTRA_LETRAS))[rng.integers(0, len(NUM_MUESTRA_LETRAS), size=n)]
+    digitos = np.arange(muestra_inicial + 1, muestra_inicial + n + 1)
+    numero_muestra = np.char.add(letras, np.char.zfill(digitos.astype(str), DIGITOS_MUESTRA))  # A0000001, B0000002, ...
+    numero_registro = np.arange(registro_inicial + 1, registro_inicial + n + 1)
+    return numero_muestra, numero_registro
+
+# Función para armar una columna categórica a partir de códigos enteros
+def _categorica(codigos, categorias):
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+# Función para generar un lote completo de n registros con criticidad controlada
+def generar_lote(n, rng=None, fechas=None, muestra_inicial=0, registro_inicial=0):
+    if rng is None:
+        rng = crear_generador()
+    if fechas is None:
+        # Igual que antes: una muestra cada 5 minutos a partir de ahora
+        fechas = pd.Timestamp.now() + pd.to_timedelta(np.arange(n) * 5, unit="min")
+
+    # Las columnas de texto se guardan como categóricas (códigos enteros + etiquetas)
+    idx_componente = rng.integers(0, len(componentes), size=n)
+    aceites = [componentes_aceites[c] for c in componentes]
+    columnas = {
+        "Fecha": fechas,
+        "Equipo": _categorica(rng.integers(0, len(equipos), size=n), equipos),
+        "Componente": _categorica(idx_componente, componentes),
+        "Aceite Lubricante": pd.Categorical(np.asarray(aceites, dtype=object)[idx_componente]),
+        "nflota": _categorica(rng.integers(0, len(nflota), size=n), nflota),
+        "cambioLubricanate": _categorica(rng.integers(0, len(cambioLubricanate), size=n), cambioLubricanate),
+    }
+    for columna, rango in RANGOS_BASE.items():
+        columnas[columna] = None if rango is None else _sortear(rng, *rango, n)
+    columnas.update(codigos_iso(columnas))  # Mantiene la posición de las columnas en el dict
+
+    codigos = sortear_criticidad(rng, n)
+    ajustar_por_criticidad(columnas, codigos, rng)
+
+    numero_muestra, numero_registro = numeros_correlativos(rng, n, muestra_inicial, registro_inicial)
+    columnas["Numero Muestra"] = numero_muestra
+    columnas["Numero Registro"] = numero_registro
+    columnas["Numero Serie Equipo"] = _categorica(rng.integers(0, len(_SERIES_EQUIPO), size=n), _SERIES_EQUIPO)
+    columnas["Criticidad"] = _categorica(codigos, NIVELES_CRITICIDAD)
+
+    return aplicar_esquema(pd.DataFrame(columnas, copy=False))
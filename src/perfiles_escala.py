@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from motor_generacion import crear_generador, generar_lote, equipos, nflota, componentes, componentes_aceites
+from escritor_datos import EscritorCSV
+from almacen_columnar import asegurar_almacen
+
+# Perfiles de escala: datasets sintéticos reproducibles (misma semilla = mismos
+# datos) para usar como entrada fija en los benchmarks de carga, entrenamiento
+# y dashboards. Cada activo (unidad identificada por su número de serie) tiene
+# un modelo de equipo y un número de flota fijos, tomados del catálogo, y se
+# muestrea cada componente "muestras_por_mes" veces al mes.
+#
+#   data/perfiles/<perfil>/datos_generados.csv
+#   data/perfiles/<perfil>/dataset/            (almacén columnar por mes)
+#   data/perfiles/<perfil>/perfil.json         (parámetros, semilla y filas)
+
+RAIZ_PERFILES = "data/perfiles"
+FECHA_FIN = "2025-01-01"  # Fija, para que el perfil no dependa del día en que se genera
+SEMILLA_PERFILES = 20250101
+
+PERFILES = {
+    "pequeno": {"activos": 20, "anios": 1, "componentes": 12, "muestras_por_mes": 1},
+    "mediano": {"activos": 200, "anios": 3, "componentes": 12, "muestras_por_mes": 1},
+    "flota": {"activos": 1000, "anios": 10, "componentes": 12, "muestras_por_mes": 1},
+}
+
+# Función para obtener las rutas de un perfil
+def rutas_perfil(perfil, raiz=RAIZ_PERFILES):
+    carpeta = os.path.join(raiz, perfil)
+    return {
+        "carpeta": carpeta,
+        "csv": os.path.join(carpeta, "datos_generados.csv"),
+        "almacen": os.path.join(carpeta, "dataset"),
+        "manifiesto": os.path.join(carpeta, "perfil.json"),
+        "sqlite": os.path.join(carpeta, "datos.sqlite"),
+        "cache": os.path.join(carpeta, "cache_columnas"),
+    }
+
+# Función para armar la tabla de activos: modelo de equipo, número de flota y serie
+# (equipo y flota salen del catálogo, así el perfil no agrega etiquetas nuevas)
+def tabla_activos(n_activos, rng):
+    return {
+        "Equipo": np.asarray(equipos, dtype=object)[rng.integers(0, len(equipos), size=n_activos)],
+        "nflota": np.asarray(nflota, dtype=object)[rng.integers(0, len(nflota), size=n_activos)],
+        "Numero Serie Equipo": np.array([f"LAJ{i:04d}" for i in range(n_activos)], dtype=object),
+    }
+
+# Función para generar un mes completo del perfil (todos los activos y componentes)
+def generar_mes(mes, parametros, activos, registro_inicial, semilla):
+    rng = crear_generador(semilla)
+    n_activos = len(activos["Equipo"])
+    comps = componentes[:parametros["componentes"]]
+    repeticiones = parametros["muestras_por_mes"]
+    n = n_activos * len(comps) * repeticiones
+
+    # Una fila por (activo, componente, muestra), con fecha al azar dentro del mes
+    idx_activo = np.repeat(np.arange(n_activos), len(comps) * repeticiones)
+    idx_componente = np.tile(np.repeat(np.arange(len(comps)), repeticiones), n_activos)
+    inicio = pd.Timestamp(mes)
+    segundos_mes = int((inicio + pd.offsets.MonthBegin(1) - inicio).total_seconds())
+    desplazamientos = rng.integers(0, segundos_mes, size=n)
+    orden = np.argsort(desplazamientos, kind="stable")  # Filas en orden cronológico
+    fechas = inicio + pd.to_timedelta(desplazamientos[orden], unit="s")
+    idx_activo, idx_componente = idx_activo[orden], idx_componente[orden]
+
+    df = generar_lote(n, rng, fechas=fechas, muestra_inicial=registro_inicial, registro_inicial=registro_inicial)
+    componente = np.asarray(comps, dtype=object)[idx_componente]
+    aceite = np.asarray([componentes_aceites[c] for c in comps], dtype=object)[idx_componente]
+    df["Equipo"] = pd.Categorical(activos["Equipo"][idx_activo], categories=equipos)
+    df["nflota"] = pd.Categorical(activos["nflota"][idx_activo], categories=nflota)
+    df["Numero Serie Equipo"] = pd.Categorical(activos["Numero Serie Equipo"][idx_activo],
+                                               categories=activos["Numero Serie Equipo"])
+    df["Componente"] = pd.Categorical(componente, categories=componentes)
+    df["Aceite Lubricante"] = pd.Categorical(aceite)
+    return df
+
+# Función para generar (o regenerar) un perfil completo
+def generar_perfil(perfil, semilla=SEMILLA_PERFILES, raiz=RAIZ_PERFILES):
+    parametros = PERFILES[perfil]
+    rutas = rutas_perfil(perfil, raiz)
+    shutil.rmtree(rutas["carpeta"], ignore_errors=True)
+    os.makedirs(rutas["carpeta"])
+
+    meses = pd.period_range(end=pd.Period(FECHA_FIN, freq="M") - 1, periods=12 * parametros["anios"], freq="M")
+    semillas = np.random.SeedSequence(semilla).spawn(len(meses) + 1)
+    activos = tabla_activos(parametros["activos"], crear_generador(semillas[0]))
+
+    inicio_reloj = time.perf_counter()
+    filas = 0
+    with EscritorCSV(rutas["csv"], lotes_por_sync=12) as escritor:
+        for mes, semilla_mes in zip(meses, semillas[1:]):
+            df = generar_mes(mes.start_time, parametros, activos, filas, semilla_mes)
+            escritor.escribir(df)
+            filas += len(df)
+    asegurar_almacen(rutas["almacen"], rutas["csv"])
+    segundos = time.perf_counter() - inicio_reloj
+
+    manifiesto = {"perfil": perfil, "semilla": semilla, "filas": filas, "fecha_fin": FECHA_FIN, **parametros}
+    with open(rutas["manifiesto"], "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    print(f"Perfil '{perfil}': {filas:,} filas en {segundos:.1f} s ({filas / segundos:,.0f} filas/s) -> {rutas['carpeta']}")
+    return rutas
+
+# Función para usar un perfil como entrada de un benchmark: lo genera solo si
+# no existe o si fue generado con otra semilla
+def asegurar_perfil(perfil, semilla=SEMILLA_PERFILES, raiz=RAIZ_PERFILES):
+    rutas = rutas_perfil(perfil, raiz)
+    try:
+        with open(rutas["manifiesto"], encoding="utf-8") as f:
+            if json.load(f).get("semilla") == semilla:
+                return rutas
+    except FileNotFoundError:
+        pass
+    return generar_perfil(perfil, semilla, raiz)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos reproducibles por perfil de escala")
+    parser.add_argument("perfiles", nargs="+", choices=list(PERFILES))
+    parser.add_argument("--semilla", type=int, default=SEMILLA_PERFILES)
+    parser.add_argument("--raiz", default=RAIZ_PERFILES)
+    args = parser.parse_args()
+    for nombre in args.perfiles:
+        generar_perfil(nombre, args.semilla, args.raiz)
@@ -0,0 +1,153 @@
+import argparse
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+from motor_generacion import crear_generador, generar_lote
+from secuencias import AsignadorSecuencias
+from escritor_datos import EscritorCSV
+from indice_muestras import IndiceMuestras
+from almacen_columnar import asegurar_almacen
+from rutas import ARCHIVO_DATOS, ARCHIVO_ESTADO, RAIZ_ALMACEN
+
+# Pipeline de ingesta con varios productores y un único escritor.
+#
+#   productor 1 ─┐
+#   productor 2 ─┼─> cola acotada ──> escritor (junta lotes y escribe en bloque)
+#   productor N ─┘
+#
+# Los productores (hilos o procesos) generan lotes y los ponen en la cola; si
+# la cola está llena, put() se bloquea y el productor espera (contrapresión).
+# Solo el escritor toca el CSV, y agrupa varios lotes pequeños en una escritura
+# secuencial grande. Las filas cuyo Numero Registro ya está en el CSV (un lote
+# reenviado tras un corte) se descartan al escribir. Al terminar, el almacén
+# columnar se pone al día con lo escrito (se deriva del CSV).
+
+class EstadoPipeline:
+    # Contadores compartidos entre productores, escritor y monitor
+    def __init__(self, contexto):
+        self.lotes_en_cola = contexto.Value("q", 0)
+        self.filas_producidas = contexto.Value("q", 0)
+        self.filas_escritas = contexto.Value("q", 0)
+        self.escrituras = contexto.Value("q", 0)
+
+    @staticmethod
+    def sumar(contador, valor):
+        with contador.get_lock():
+            contador.value += valor
+
+# Función de cada productor: genera "lotes" lotes de "filas_por_lote" filas
+def productor(cola, estado, lotes, filas_por_lote, semilla, pausa, archivo_estado):
+    rng = crear_generador(semilla)
+    asignador = AsignadorSecuencias(archivo_estado)
+    for _ in range(lotes):
+        muestra_inicial, registro_inicial = asignador.reservar(filas_por_lote)
+        df = generar_lote(filas_por_lote, rng, muestra_inicial=muestra_inicial, registro_inicial=registro_inicial)
+        EstadoPipeline.sumar(estado.filas_producidas, len(df))
+        cola.put(df)  # Se bloquea si la cola está llena
+        EstadoPipeline.sumar(estado.lotes_en_cola, 1)
+        if pausa:
+            time.sleep(pausa)
+    asignador.liberar()  # Los procesos hijos no corren atexit
+    cola.put(None)  # Aviso de fin para el escritor
+
+# Función del escritor: junta lotes hasta "filas_por_escritura" filas (o hasta
+# que pasen "espera_maxima" segundos) y los escribe de una vez
+def escritor(cola, estado, productores, filas_por_escritura, espera_maxima, archivo, raiz):
+    terminados = 0
+    pendientes = []
+    filas_pendientes = 0
+    ultima_escritura = time.monotonic()
+    with EscritorCSV(archivo, indice=IndiceMuestras(archivo)) as csv:
+        while terminados < productores:
+            try:
+                df = cola.get(timeout=espera_maxima)
+                if df is None:
+                    terminados += 1
+                else:
+                    EstadoPipeline.sumar(estado.lotes_en_cola, -1)
+                    pendientes.append(df)
+                    filas_pendientes += len(df)
+            except queue.Empty:
+                pass
+
+            vencido = time.monotonic() - ultima_escritura >= espera_maxima
+            if pendientes and (filas_pendientes >= filas_por_escritura or vencido or terminados == productores):
+                bloque = csv.escribir_nuevos(pd.concat(pendientes, ignore_index=True))
+                EstadoPipeline.sumar(estado.filas_escritas, len(bloque))
+                EstadoPipeline.sumar(estado.escrituras, 1)
+                pendientes, filas_pendientes = [], 0
+                ultima_escritura = time.monotonic()
+    asegurar_almacen(raiz, archivo)
+
+# Función para mostrar los contadores cada "intervalo" segundos mientras corre el pipeline
+def monitorear(estado, activos, intervalo):
+    inicio = time.monotonic()
+    anteriores, anterior_t = 0, inicio
+    while any(p.is_alive() for p in activos):
+        time.sleep(intervalo)
+        ahora = time.monotonic()
+        escritas = estado.filas_escritas.value
+        print(f"[{ahora - inicio:6.1f} s] cola: {estado.lotes_en_cola.value} lotes | "
+              f"producidas: {estado.filas_producidas.value:,} | escritas: {escritas:,} "
+              f"({(escritas - anteriores) / (ahora - anterior_t):,.0f} filas/s) | escrituras: {estado.escrituras.value}")
+        anteriores, anterior_t = escritas, ahora
+
+# Función para correr el pipeline completo. modo: "procesos" o "hilos" para productores y escritor.
+def ejecutar_pipeline(productores=4, lotes=100, filas_por_lote=50, capacidad_cola=64,
+                      filas_por_escritura=5_000, espera_maxima=1.0, pausa=0.0, modo="procesos",
+                      semilla=None, intervalo_monitor=1.0, archivo=ARCHIVO_DATOS, raiz=RAIZ_ALMACEN,
+                      archivo_estado=ARCHIVO_ESTADO):
+    contexto = mp.get_context()
+    estado = EstadoPipeline(contexto)
+    if modo == "hilos":
+        cola = queue.Queue(maxsize=capacidad_cola)
+        crear = threading.Thread
+    else:
+        cola = contexto.Queue(maxsize=capacidad_cola)
+        crear = contexto.Process
+    semillas = np.random.SeedSequence(semilla).spawn(productores)
+
+    # Un único escritor: proceso propio (o hilo, si los productores son hilos)
+    proceso_escritor = crear(target=escritor, args=(cola, estado, productores, filas_por_escritura,
+                                                               espera_maxima, archivo, raiz))
+    proceso_escritor.start()
+    trabajadores = [crear(target=productor, args=(cola, estado, lotes, filas_por_lote, s, pausa, archivo_estado))
+                    for s in semillas]
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.start()
+
+    monitorear(estado, trabajadores + [proceso_escritor], intervalo_monitor)
+    for t in trabajadores:
+        t.join()
+    proceso_escritor.join()
+
+    segundos = time.perf_counter() - inicio
+    escritas = estado.filas_escritas.value
+    print(f"Total: {escritas:,} filas en {estado.escrituras.value} escrituras, "
+          f"{segundos:.1f} s ({escritas / segundos:,.0f} filas/s)")
+    return escritas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline de ingesta con N productores y un escritor")
+    parser.add_argument("--productores", type=int, default=os.cpu_count())
+    parser.add_argument("--modo", choices=["procesos", "hilos"], default="procesos")
+    parser.add_argument("--lotes", type=int, default=100, help="Lotes por productor")
+    parser.add_argument("--filas-por-lote", type=int, default=50)
+    parser.add_argument("--capacidad-cola", type=int, default=64, help="Lotes máximos en cola antes de frenar a los productores")
+    parser.add_argument("--filas-por-escritura", type=int, default=5_000)
+    parser.add_argument("--espera-maxima", type=float, default=1.0, help="Segundos máximos antes de escribir lo acumulado")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos de espera entre lotes de cada productor")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--archivo", default=ARCHIVO_DATOS)
+    parser.add_argument("--raiz", default=RAIZ_ALMACEN)
+    args = parser.parse_args()
+
+    ejecutar_pipeline(productores=args.productores, lotes=args.lotes, filas_por_lote=args.filas_por_lote,
+                      capacidad_cola=args.capacidad_cola, filas_por_escritura=args.filas_por_escritura,
+                      espera_maxima=args.espera_maxima, pausa=args.pausa, modo=args.modo,
+                      semilla=args.semilla, archivo=args.archivo, raiz=args.raiz)
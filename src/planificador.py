@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+# Planificador único (asyncio) para generación, reentrenamiento y mantenimiento.
+#
+# Reemplaza los bucles "while True: ...; time.sleep(7200)" de cada script. Las
+# tareas se definen con expresiones tipo cron y las pesadas corren en un pool de
+# procesos que vive todo el tiempo, así pandas, sklearn y el estado de cada
+# módulo (generador aleatorio, asignador de números, etc.) quedan cargados entre
+# una ejecución y la siguiente. Si una tarea sigue corriendo cuando le toca de
+# nuevo, esa ejecución se omite.
+
+# Rangos válidos de cada campo cron: minuto, hora, día del mes, mes, día de la semana
+_RANGOS_CRON = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+class ExpresionCron:
+    # Formato clásico de 5 campos: "min hora dia mes dia_semana" (0 = domingo).
+    # Cada campo admite "*", "*/n", "a", "a-b", "a-b/n" y listas separadas por comas.
+    def __init__(self, texto):
+        campos = texto.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expresión cron inválida (se esperan 5 campos): {texto!r}")
+        self.texto = texto
+        self.campos = [self._expandir(c, *r) for c, r in zip(campos, _RANGOS_CRON)]
+        # Si día del mes y día de la semana están restringidos, basta con que coincida uno
+        self._dia_libre = campos[2] == "*"
+        self._semana_libre = campos[4] == "*"
+
+    @staticmethod
+    def _expandir(campo, minimo, maximo):
+        valores = set()
+        for parte in campo.split(","):
+            rango, _, paso = parte.partition("/")
+            paso = int(paso) if paso else 1
+            if rango == "*":
+                inicio, fin = minimo, maximo
+            elif "-" in rango:
+                inicio, fin = (int(x) for x in rango.split("-"))
+            else:
+                inicio = fin = int(rango)
+            if inicio < minimo or fin > maximo:
+                raise ValueError(f"Valor fuera de rango en el campo cron {campo!r}")
+            valores.update(range(inicio, fin + 1, paso))
+        return valores
+
+    def coincide(self, fecha):
+        minutos, horas, dias, meses, semana = self.campos
+        if fecha.minute not in minutos or fecha.hour not in horas or fecha.month not in meses:
+            return False
+        dia_ok = fecha.day in dias
+        semana_ok = (fecha.weekday() + 1) % 7 in semana
+        if self._dia_libre or self._semana_libre:
+            return dia_ok and semana_ok
+        return dia_ok or semana_ok
+
+class Tarea:
+    # funcion: "modulo:funcion" (se importa dentro del proceso que la ejecuta).
+    # en_proceso: True para tareas pesadas (pool de procesos), False para correrla en un hilo.
+    def __init__(self, nombre, cron, funcion, en_proceso=True):
+        self.nombre = nombre
+        self.cron = ExpresionCron(cron)
+        self.funcion = funcion
+        self.en_proceso = en_proceso
+        self.corriendo = False
+        self.ejecuciones = 0
+        self.omitidas = 0
+
+# Tareas por defecto: la misma frecuencia que los bucles originales (cada 2 horas),
+# desfasadas para que generación y reentrenamiento no se pisen
+TAREAS = [
+    Tarea("generacion", "0 */2 * * *", "generar_datos_Mejorado_crit:ciclo_generacion"),
+    Tarea("reentrenamiento", "30 */2 * * *", "train_model:entrenar_modelo"),
+    Tarea("compactacion", "15 3 * * *", "almacen_columnar:compactar"),
+    # Pasa al almacén columnar la cola nueva del CSV y arma su caché de columnas
+    # .npy; así los dashboards casi nunca sincronizan ni construyen el caché
+    Tarea("almacen", "*/10 * * * *", "cache_columnas:actualizar_cache"),
+    # Resume solo las muestras nuevas en los agregados diarios y semanales
+    Tarea("agregados", "5-59/10 * * * *", "agregados:sincronizar"),
+    # Mueve al archivo comprimido las muestras que salieron de la ventana caliente
+    Tarea("archivado", "45 3 * * *", "archivo_historico:archivar"),
+]
+
+# Función que corre dentro del proceso (o hilo) trabajador: importa el módulo una
+# sola vez (queda en sys.modules) y devuelve el resultado y la duración
+def ejecutar_funcion(ruta):
+    nombre_modulo, nombre_funcion = ruta.split(":")
+    funcion = getattr(importlib.import_module(nombre_modulo), nombre_funcion)
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+def registrar(mensaje):
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} | {mensaje}", flush=True)
+
+class Planificador:
+    def __init__(self, tareas=TAREAS, procesos=None):
+        self.tareas = tareas
+        self.pool = ProcessPoolExecutor(max_workers=procesos or min(len(tareas), os.cpu_count()))
+        self._tareas = set()  # asyncio guarda solo referencias débiles a las tareas en curso
+
+    # Función para lanzar una tarea (sin esperar a que termine)
+    def lanzar(self, tarea):
+        if tarea.corriendo:
+            tarea.omitidas += 1
+            registrar(f"{tarea.nombre}: omitida, la ejecución anterior sigue en curso")
+            return None
+        tarea.corriendo = True
+        tarea_async = asyncio.create_task(self._correr(tarea))
+        self._tareas.add(tarea_async)
+        tarea_async.add_done_callback(self._tareas.discard)
+        return tarea_async
+
+    async def _correr(self, tarea):
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        registrar(f"{tarea.nombre}: inicio")
+        try:
+            if tarea.en_proceso:
+                resultado, duracion = await loop.run_in_executor(self.pool, ejecutar_funcion, tarea.funcion)
+            else:
+                resultado, duracion = await asyncio.to_thread(ejecutar_funcion, tarea.funcion)
+            tarea.ejecuciones += 1
+            registrar(f"{tarea.nombre}: terminada en {duracion:.2f} s "
+                      f"(total con espera {time.perf_counter() - inicio:.2f} s), resultado: {resultado}")
+        except Exception as e:
+            registrar(f"{tarea.nombre}: error después de {time.perf_counter() - inicio:.2f} s: {e!r}")
+        finally:
+            tarea.corriendo = False
+
+    # Bucle principal: al comienzo de cada minuto lanza las tareas que corresponden
+    async def ejecutar(self):
+        registrar("Planificador iniciado: " + ", ".join(f"{t.nombre} [{t.cron.texto}]" for t in self.tareas))
+        try:
+            while True:
+                ahora = datetime.now()
+                siguiente = (ahora + timedelta(minutes=1)).replace(second=0, microsecond=0)
+                await asyncio.sleep((siguiente - ahora).total_seconds())
+                for tarea in self.tareas:
+                    if tarea.cron.coincide(siguiente):
+                        self.lanzar(tarea)
+        finally:
+            if self._tareas:  # Las que siguen en curso terminan antes de cerrar el pool
+                await asyncio.gather(*self._tareas, return_exceptions=True)
+            self.pool.shutdown(wait=True)
+
+    # Función para correr una tarea de inmediato (útil para probar)
+    async def ejecutar_ahora(self, nombre):
+        tarea = next(t for t in self.tareas if t.nombre == nombre)
+        try:
+            await self.lanzar(tarea)
+        finally:
+            self.pool.shutdown(wait=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planificador de generación, reentrenamiento y mantenimiento")
+    parser.add_argument("--ahora", choices=[t.nombre for t in TAREAS], help="Ejecutar solo esta tarea una vez y salir")
+    parser.add_argument("--procesos", type=int, default=None)
+    args = parser.parse_args()
+
+    planificador = Planificador(procesos=args.procesos)
+    if args.ahora:
+        asyncio.run(planificador.ejecutar_ahora(args.ahora))
+    else:
+        asyncio.run(planificador.ejecutar())
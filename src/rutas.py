@@ -0,0 +1,13 @@
+# Rutas de los archivos de datos compartidos por generadores, dashboards y
+# entrenamiento (relativas a src/, igual que el resto de los scripts)
+
+ARCHIVO_DATOS = "data/datos_generados.csv"
+RAIZ_ALMACEN = "data/dataset"
+ARCHIVO_ESTADO = "data/estado_generador.txt"
+ARCHIVO_CATALOGO = "data/catalogo.json"
+ARCHIVO_SQLITE = "data/datos.sqlite"
+RAIZ_CACHE = "data/cache_columnas"
+RAIZ_AGREGADOS = "data/agregados"
+RAIZ_ARCHIVO = "data/archivo"
+RAIZ_INDICE = "data/indice_muestras"
+RAIZ_INDICE_INFORMES = "data/indice_informes"
@@ -0,0 +1,112 @@
+import atexit
+import os
+from contextlib import contextmanager
+from rutas import ARCHIVO_ESTADO
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Asignador de números correlativos (Numero Muestra / Numero Registro) que
+# permite correr varios generadores a la vez sin repetir números.
+#
+# data/estado_generador.txt guarda el último número *reservado* (dos líneas:
+# muestra y registro). Cada proceso reserva un bloque completo (por defecto
+# 1.000 números) bajo un bloqueo de archivo del sistema operativo y luego
+# entrega números de ese bloque sin volver a tocar el archivo. Al terminar
+# normalmente, el proceso devuelve lo que no usó si nadie reservó después que
+# él; si se corta, quedan huecos en la numeración, nunca números repetidos.
+
+TAMANO_BLOQUE = 1_000
+
+# Dígitos de Numero Muestra (letra + número con ceros a la izquierda: A0000001)
+DIGITOS_MUESTRA = 7
+
+# Bloqueo exclusivo sobre "<archivo>.lock", compartido entre procesos
+@contextmanager
+def bloqueo_archivo(archivo):
+    carpeta = os.path.dirname(archivo)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(archivo + ".lock", "a+") as f:
+        if os.name == "nt":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+# Función para leer el estado (último número de muestra y de registro reservados)
+def leer_estado(archivo=ARCHIVO_ESTADO):
+    try:
+        with open(archivo, "r") as f:
+            lineas = f.readlines()
+        if len(lineas) >= 2:
+            return int(lineas[0].strip()), int(lineas[1].strip())
+    except FileNotFoundError:
+        pass
+    return 0, 0
+
+# Función para escribir el estado de forma atómica (temporal + fsync + rename)
+def escribir_estado(muestra, registro, archivo=ARCHIVO_ESTADO):
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    with open(temporal, "w") as f:
+        f.write(f"{muestra}\n")
+        f.write(f"{registro}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, archivo)
+
+class AsignadorSecuencias:
+    def __init__(self, archivo=ARCHIVO_ESTADO, tamano_bloque=TAMANO_BLOQUE):
+        self.archivo = archivo
+        self.tamano_bloque = tamano_bloque
+        self._muestra = 0  # Último número de muestra entregado
+        self._registro = 0  # Último número de registro entregado
+        self._disponibles = 0  # Números que quedan en el bloque actual
+        atexit.register(self.liberar)
+
+    # Función para reservar "cantidad" números en el archivo de estado
+    def _reservar_en_archivo(self, cantidad):
+        with bloqueo_archivo(self.archivo):
+            muestra, registro = leer_estado(self.archivo)
+            escribir_estado(muestra + cantidad, registro + cantidad, self.archivo)
+        return muestra, registro
+
+    # Función para pedir n números consecutivos. Devuelve el último número de
+    # muestra y de registro *anterior* al tramo (el primero entregado es +1),
+    # igual que muestra_inicial / registro_inicial de generar_lote.
+    def reservar(self, n):
+        if n >= self.tamano_bloque:
+            # Pedidos grandes (backfill): se reservan exactos, sin tocar el bloque en curso
+            return self._reservar_en_archivo(n)
+        if n > self._disponibles:
+            # Lo que quede del bloque anterior se descarta para que el tramo sea consecutivo
+            self._muestra, self._registro = self._reservar_en_archivo(self.tamano_bloque)
+            self._disponibles = self.tamano_bloque
+        inicio = (self._muestra, self._registro)
+        self._muestra += n
+        self._registro += n
+        self._disponibles -= n
+        return inicio
+
+    # Función para devolver la parte no usada del bloque actual. Solo se puede
+    # si el bloque sigue siendo el último reservado en el archivo; si otro
+    # proceso reservó después, esos números quedan como hueco.
+    def liberar(self):
+        if not self._disponibles:
+            return 0
+        devueltos, self._disponibles = self._disponibles, 0
+        with bloqueo_archivo(self.archivo):
+            if leer_estado(self.archivo) != (self._muestra + devueltos, self._registro + devueltos):
+                return 0
+            escribir_estado(self._muestra, self._registro, self.archivo)
+        return devueltos
@@ -1,49 +1,254 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
 import joblib
 import time
+from datetime import datetime
+from rutas import ARCHIVO_DATOS
+from almacen_columnar import almacen_del_csv, asegurar_almacen, leer_dataset, columnas_disponibles, meses_disponibles
+from criticidad import calcular_criticidad
+from caracteristicas import PipelineCaracteristicas
+from bosque_compacto import ARCHIVO_BOSQUE, exportar_bosque
+from esquema import aplicar_esquema, dtypes_csv
+from escritor_datos import huella_csv, leer_cabecera, leer_cola_csv
 
-def entrenar_modelo():
-    # Paso 1: Cargar los datos
+# Entrenamiento del modelo de criticidad, completo o incremental.
+#
+# El entrenamiento completo lee todo el almacén y ajusta un bosque nuevo. El
+# incremental (el de cada ciclo) lee solo las filas agregadas al CSV desde el
+# último punto de control (data/entrenamiento.json guarda el byte del CSV y su
+# huella) y le agrega ARBOLES_POR_LOTE árboles entrenados con ellas
+# (warm_start); antes de ajustarlos, mide el modelo actual sobre esas filas
+# nuevas, que todavía no vio. Si llegaron pocas filas, o no traen todas las
+# clases, se esperan al próximo ciclo.
+#
+# Se vuelve al entrenamiento completo cuando no hay punto de control, cuando el
+# CSV se reescribió (archivado, migración), cuando el bosque llega a MAX_ARBOLES
+# o cuando el último completo tiene más de DIAS_REENTRENAMIENTO_COMPLETO días.
+# Cada entrenamiento agrega una línea a data/entrenamientos.csv con su duración.
+#
+# El completo también ajusta y guarda el pipeline de características
+# (caracteristicas.py) junto al modelo; el incremental y los dashboards lo usan
+# tal cual, así que el bosque siempre ve las mismas columnas en el mismo orden.
+# Cada vez que se guarda el modelo también se exporta a arreglos NumPy
+# (bosque_compacto.py), que es lo que cargan los dashboards para predecir.
+#
+# El bosque del completo usa los hiperparámetros de data/hiperparametros.json si
+# existe (ver busqueda_hiperparametros.py, o --ajustar), si no los de sklearn.
+#
+# Junto al punto de control se guarda una huella de los datos (filas y máximo
+# Numero Registro según los metadatos del almacén, y un hash del final del CSV),
+# que se calcula sin leer datos. Si no cambió desde el último entrenamiento, el
+# ciclo no ajusta ni vuelve a escribir el modelo, aunque tocara uno completo.
+
+ARCHIVO_MODELO = "data/modelo_entrenado.joblib"
+ARCHIVO_PIPELINE = "data/pipeline_caracteristicas.joblib"
+ARCHIVO_PUNTO_CONTROL = "data/entrenamiento.json"
+ARCHIVO_REGISTRO = "data/entrenamientos.csv"
+ARCHIVO_HIPERPARAMETROS = "data/hiperparametros.json"  # Lo escribe busqueda_hiperparametros.py
+
+ARBOLES_INICIALES = 100  # Igual que el valor por defecto de RandomForestClassifier
+ARBOLES_POR_LOTE = 10
+MAX_ARBOLES = 300
+FILAS_MINIMAS_INCREMENTAL = 200
+DIAS_REENTRENAMIENTO_COMPLETO = 7
+
+# Columnas irrelevantes para el modelo (no se leen del almacén)
+columnas_a_eliminar = [
+    "Fecha",  # No es relevante para el modelo
+    "nflota",  # Identificador no útil para la predicción
+    "cambioLubricanate",  # Variable binaria que puede no ser relevante
+    "ISO 4406 >4µm",  # Códigos derivados de los conteos de partículas (ya incluidos)
+    "ISO 4406 >6µm",
+    "ISO 4406 >14µm",
+    "Numero Muestra",  # Identificador único
+    "Numero Registro",  # Identificador único
+    "Numero Serie Equipo"  # Identificador único
+]
+
+# Función para leer el punto de control del entrenamiento incremental
+def leer_punto_control(archivo=ARCHIVO_PUNTO_CONTROL):
+    try:
+        with open(archivo, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _escribir_punto_control(punto, archivo=ARCHIVO_PUNTO_CONTROL):
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(punto, f)
+    os.replace(temporal, archivo)
+
+# Función para leer los hiperparámetros elegidos por la búsqueda (vacío si no hay)
+def leer_hiperparametros(archivo=ARCHIVO_HIPERPARAMETROS):
     try:
-        df = pd.read_csv("data/datos_generados.csv")
-        print("Datos cargados correctamente.")
+        with open(archivo, encoding="utf-8") as f:
+            return json.load(f)["parametros"]
     except FileNotFoundError:
-        print("Error: El archivo 'data/datos_generados.csv' no existe.")
+        return {}
+
+# Función para agregar una línea al registro de entrenamientos (modo, filas, árboles, duración)
+def _registrar_entrenamiento(modo, filas, arboles, segundos, exactitud):
+    nuevo = not os.path.exists(ARCHIVO_REGISTRO)
+    with open(ARCHIVO_REGISTRO, "a", encoding="utf-8") as f:
+        if nuevo:
+            f.write("fecha,modo,filas,arboles,segundos_ajuste,exactitud\n")
+        f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S},{modo},{filas},{arboles},{segundos:.3f},{exactitud:.4f}\n")
+    print(f"Entrenamiento {modo}: {filas:,} filas, {arboles} árboles, ajuste en {segundos:.2f} s, exactitud {exactitud:.1%}")
+
+# Función para obtener el byte donde termina la última línea completa del CSV
+def _fin_lineas_completas(archivo_csv, bytes_busqueda=1024 * 1024):
+    tamano = os.path.getsize(archivo_csv)
+    with open(archivo_csv, "rb") as f:
+        f.seek(max(0, tamano - bytes_busqueda))
+        final = f.read()
+    return tamano - len(final) + final.rfind(b"\n") + 1
+
+# Función para calcular la huella de los datos sin leerlos: filas y máximo
+# Numero Registro (metadatos y estadísticas de los Parquet, no cambian al
+# compactar) y hash de los últimos bytes_cola bytes de líneas completas del CSV.
+# El almacén del CSV se pone al día antes, para que sus metadatos cuenten lo que tiene el CSV.
+def huella_datos(archivo_csv=ARCHIVO_DATOS, bytes_cola=64 * 1024):
+    raiz = almacen_del_csv(archivo_csv)
+    asegurar_almacen(raiz, archivo_csv)
+    filas, maximo = 0, None
+    for mes in meses_disponibles(raiz):
+        for archivo in glob.glob(os.path.join(raiz, mes, "*.parquet")):
+            metadatos = pq.ParquetFile(archivo).metadata
+            filas += metadatos.num_rows
+            columna = metadatos.schema.to_arrow_schema().get_field_index("Numero Registro")
+            for i in range(metadatos.num_row_groups if columna >= 0 else 0):
+                estadisticas = metadatos.row_group(i).column(columna).statistics
+                if estadisticas is not None and estadisticas.has_min_max:
+                    maximo = estadisticas.max if maximo is None else max(maximo, estadisticas.max)
+    cola = None
+    if os.path.exists(archivo_csv):
+        hasta = _fin_lineas_completas(archivo_csv)
+        with open(archivo_csv, "rb") as f:
+            f.seek(max(0, hasta - bytes_cola))
+            cola = hashlib.sha1(f.read(hasta - f.tell())).hexdigest()
+    return {"filas": filas, "max_registro": maximo, "cola_csv": cola}
+
+# Función para armar X (matriz NumPy) e y con el pipeline de características
+def _preparar(df, pipeline):
+    return pipeline.transformar(df), df["Criticidad"]
+
+# Función para decidir si toca un entrenamiento completo (y por qué)
+def _motivo_completo(punto, archivo_csv):
+    if punto is None or not os.path.exists(ARCHIVO_MODELO) or not os.path.exists(ARCHIVO_PIPELINE):
+        return "no hay un modelo con punto de control"
+    if not os.path.exists(archivo_csv) or os.path.getsize(archivo_csv) < punto["bytes_csv"] \
+            or huella_csv(archivo_csv, punto["bytes_csv"]) != punto["huella"]:
+        return "el CSV se reescribió desde el último entrenamiento"
+    if punto["arboles"] + ARBOLES_POR_LOTE > MAX_ARBOLES:
+        return f"el bosque llegó a {punto['arboles']} árboles"
+    if datetime.now() - datetime.fromisoformat(punto["ultimo_completo"]) > pd.Timedelta(days=DIAS_REENTRENAMIENTO_COMPLETO):
+        return f"el último entrenamiento completo tiene más de {DIAS_REENTRENAMIENTO_COMPLETO} días"
+    return None
+
+# Función para entrenar: incremental si se puede, completo si hace falta (o si completo=True)
+def entrenar_modelo(completo=False, archivo_csv=ARCHIVO_DATOS):
+    punto = leer_punto_control()
+    if os.path.exists(ARCHIVO_MODELO) and not os.path.exists(ARCHIVO_BOSQUE):
+        exportar_bosque(joblib.load(ARCHIVO_MODELO))  # Modelo anterior al bosque compacto
+    huella = huella_datos(archivo_csv)
+    if not completo and punto is not None and punto.get("huella_datos") == huella \
+            and os.path.exists(ARCHIVO_MODELO) and os.path.exists(ARCHIVO_PIPELINE):
+        print("Los datos no cambiaron desde el último entrenamiento; no se reentrena.")
+        return 0
+    motivo = "pedido explícitamente" if completo else _motivo_completo(punto, archivo_csv)
+    if motivo is None:
+        return entrenar_incremental(punto, huella, archivo_csv)
+    print(f"Entrenamiento completo: {motivo}.")
+    return entrenar_completo(huella, archivo_csv)
+
+# Función para entrenar solo con las filas agregadas al CSV desde el punto de control
+def entrenar_incremental(punto, huella, archivo_csv=ARCHIVO_DATOS):
+    cabecera = leer_cabecera(archivo_csv)
+    tipos = dtypes_csv(cabecera)
+    bloques, hasta = [], punto["bytes_csv"]
+    for texto, hasta in leer_cola_csv(archivo_csv, punto["bytes_csv"]):
+        bloques.append(pd.read_csv(io.StringIO(texto), names=cabecera, header=None, dtype=tipos))
+    filas = sum(len(b) for b in bloques)
+    if filas == 0 and punto.get("huella_datos") != huella:
+        # El modelo ya vio todo (punto de control anterior a la huella): se anota para los próximos ciclos
+        _escribir_punto_control({**punto, "huella_datos": huella})
+    if filas < FILAS_MINIMAS_INCREMENTAL:
+        print(f"{filas} filas nuevas desde el último entrenamiento; se espera a tener {FILAS_MINIMAS_INCREMENTAL}.")
+        return 0
+
+    model = joblib.load(ARCHIVO_MODELO)
+    pipeline = joblib.load(ARCHIVO_PIPELINE)
+    df = aplicar_esquema(pd.concat(bloques, ignore_index=True))
+    df = df[[c for c in punto["columnas"] if c in df.columns]]
+    X, y = _preparar(df, pipeline)
+    faltantes = set(model.classes_) - set(y.astype(str))
+    if faltantes:
+        # Los árboles nuevos tienen que conocer las mismas clases que el resto del bosque
+        print(f"Las filas nuevas no traen las clases {sorted(faltantes)}; se espera al próximo ciclo.")
+        return 0
+
+    # Exactitud del modelo actual sobre filas que todavía no vio
+    exactitud = model.score(X, y)
+    inicio = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + ARBOLES_POR_LOTE)
+    model.fit(X, y)
+    segundos = time.perf_counter() - inicio
+
+    joblib.dump(model, ARCHIVO_MODELO)
+    exportar_bosque(model)
+    _escribir_punto_control({**punto, "bytes_csv": hasta, "huella": huella_csv(archivo_csv, hasta),
+                             "arboles": model.n_estimators, "huella_datos": huella})
+    _registrar_entrenamiento("incremental", filas, model.n_estimators, segundos, exactitud)
+    return filas
+
+# Función para el entrenamiento completo: todo el almacén del CSV y un bosque nuevo
+def entrenar_completo(huella=None, archivo_csv=ARCHIVO_DATOS):
+    raiz = almacen_del_csv(archivo_csv)
+    # Hasta dónde llega el CSV antes de leer: lo que se agregue después lo toma el incremental
+    hasta = _fin_lineas_completas(archivo_csv) if os.path.exists(archivo_csv) else 0
+
+    # Paso 1: Cargar los datos (solo las columnas que usa el modelo)
+    columnas = [c for c in columnas_disponibles(raiz) if c not in columnas_a_eliminar]
+    if not columnas:
+        print("Error: El almacén de datos está vacío.")
         return
+    df = leer_dataset(columnas=columnas, raiz=raiz)
+    print("Datos cargados correctamente.")
 
-    # Paso 2: Preprocesamiento
-    # Eliminar columnas irrelevantes
-    columnas_a_eliminar = [
-        "Fecha",  # No es relevante para el modelo
-        "nflota",  # Identificador no útil para la predicción
-        "cambioLubricanate",  # Variable binaria que puede no ser relevante
-        "Código ISO 4406",  # Código categórico sin relación directa con criticidad
-        "Numero Muestra",  # Identificador único
-        "Numero Registro",  # Identificador único
-        "Numero Serie Equipo"  # Identificador único
-    ]
-    df = df.drop(columns=columnas_a_eliminar, errors="ignore")
-
-    # Codificar variables categóricas
-    df_encoded = pd.get_dummies(df, columns=["Equipo", "Componente", "Aceite Lubricante"])
-
-    # Separar características (X) y etiquetas (y)
-    X = df_encoded.drop(columns=["Criticidad"], errors="ignore")  # Variables independientes
-    y = df_encoded["Criticidad"]  # Variable dependiente (objetivo)
-
-    if X.empty or y.empty:
+    # Verificar que las etiquetas sigan la tabla de límites de criticidad
+    if "Criticidad" in df.columns:
+        concordancia = (pd.Series(calcular_criticidad(df), index=df.index).astype(str) == df["Criticidad"].astype(str)).mean()
+        print(f"Etiquetas que coinciden con la tabla de límites: {concordancia:.1%}")
+
+    if df.empty:
         print("Error: No hay suficientes datos para entrenar el modelo.")
         return
 
-    # Dividir en entrenamiento y prueba
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Paso 2: Preprocesamiento
+    # Dividir en entrenamiento y prueba (la misma partición que la búsqueda de
+    # hiperparámetros) y ajustar el pipeline solo con las filas de entrenamiento
+    entrenamiento, prueba = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    pipeline = PipelineCaracteristicas.ajustar(df.iloc[entrenamiento])
+    # Codificar variables categóricas y separar características (X) y etiquetas (y)
+    X_train, y_train = _preparar(df.iloc[entrenamiento], pipeline)
+    X_test, y_test = _preparar(df.iloc[prueba], pipeline)
 
     # Paso 3: Entrenar el modelo
-    model = RandomForestClassifier(random_state=42)
+    model = RandomForestClassifier(**{"n_estimators": ARBOLES_INICIALES, **leer_hiperparametros()}, random_state=42)
+    inicio = time.perf_counter()
     model.fit(X_train, y_train)
+    segundos = time.perf_counter() - inicio
 
     # Evaluar el modelo
     y_pred = model.predict(X_test)
@@ -53,23 +258,42 @@ def entrenar_modelo():
     # Mostrar Importancia de Características
     print("\nImportancia de las Características:")
     feature_importances = pd.DataFrame({
-        "Característica": X.columns,
+        "Característica": pipeline.nombres,
         "Importancia": model.feature_importances_
     }).sort_values(by="Importancia", ascending=False)
     print(feature_importances)
 
     # Paso 4: Guardar el modelo entrenado
-    joblib.dump(model, "data/modelo_entrenado.joblib")
-    print("Modelo entrenado y guardado en 'data/modelo_entrenado.joblib'")
+    joblib.dump(model, ARCHIVO_MODELO)
+    exportar_bosque(model)
+    print(f"Modelo entrenado y guardado en '{ARCHIVO_MODELO}' (compacto en '{ARCHIVO_BOSQUE}')")
+
+    # Guardar el pipeline de características para el incremental y los dashboards
+    joblib.dump(pipeline, ARCHIVO_PIPELINE)
+    print(f"Pipeline de características guardado en '{ARCHIVO_PIPELINE}'")
 
-    # Guardar las características usadas para facilitar la integración con Streamlit
-    joblib.dump(X.columns.tolist(), "data/feature_names.joblib")
-    print("Nombres de características guardados en 'data/feature_names.joblib'")
+    _escribir_punto_control({"bytes_csv": hasta, "huella": huella_csv(archivo_csv, hasta) if hasta else None,
+                             "arboles": model.n_estimators, "columnas": columnas,
+                             "ultimo_completo": datetime.now().isoformat(timespec="seconds"),
+                             "huella_datos": huella if huella is not None else huella_datos(archivo_csv)})
+    _registrar_entrenamiento("completo", len(X_train), model.n_estimators, segundos, (y_pred == y_test).mean())
+    return len(df)
 
 # Bucle principal para ejecutar el entrenamiento cada 2 horas
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de criticidad cada 2 horas")
+    parser.add_argument("--completo", action="store_true", help="Forzar un entrenamiento completo en el primer ciclo")
+    parser.add_argument("--ajustar", action="store_true",
+                        help="Buscar hiperparámetros antes del primer ciclo (que pasa a ser completo)")
+    parser.add_argument("--presupuesto", type=float, default=600, help="Segundos de reloj para la búsqueda")
+    args = parser.parse_args()
+    completo = args.completo
+    if args.ajustar:
+        from busqueda_hiperparametros import buscar
+        completo = buscar(args.presupuesto) is not None or completo
     while True:
         print("\nIniciando proceso de entrenamiento...")
-        entrenar_modelo()
+        entrenar_modelo(completo)
+        completo = False
         print("Esperando 2 horas antes del próximo entrenamiento...\n")
         time.sleep(7200)  # Esperar 2 horas (7200 segundos)
\ No newline at end of file
@@ -0,0 +1,20 @@
+import os
+import shutil
+import sys
+import pytest
+
+# Los módulos del repo se importan por nombre, como cuando se corren desde src/
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+
+# Carpeta de trabajo temporal con data/catalogo.json, para que las rutas
+# relativas (data/...) nunca toquen los datos del repo
+@pytest.fixture
+def carpeta_datos(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / "data")
+    shutil.copy(os.path.join(SRC, "data", "catalogo.json"), tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    import catalogo
+    catalogo._catalogos.clear()
+    yield tmp_path
+    catalogo._catalogos.clear()
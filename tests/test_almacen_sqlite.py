@@ -0,0 +1,22 @@
+import json
+import sqlite3
+import pandas as pd
+
+def test_valores_dimension_con_claves_desconocidas_y_nuevas(carpeta_datos):
+    from almacen_sqlite import TABLA, sincronizar, valores_dimension
+    from catalogo import etiquetas
+    from escritor_datos import guardar_datos
+    conocido = etiquetas("Equipo")[0]
+    guardar_datos(pd.DataFrame({"Fecha": [pd.Timestamp("2025-01-01")], "Equipo": [conocido], "Numero Registro": [1]}))
+    sincronizar()
+
+    # Otro proceso registra una etiqueta y escribe su clave; además una fila con clave desconocida (-1)
+    with open("data/catalogo.json", encoding="utf-8") as f:
+        catalogo = json.load(f)
+    catalogo["Equipo"].append("EQUIPO NUEVO")
+    with open("data/catalogo.json", "w", encoding="utf-8") as f:
+        json.dump(catalogo, f)
+    with sqlite3.connect("data/datos.sqlite") as conexion:
+        conexion.executemany(f'INSERT INTO {TABLA} ("Equipo") VALUES (?)', [(len(catalogo["Equipo"]) - 1,), (-1,)])
+
+    assert valores_dimension("Equipo") == [conocido, "EQUIPO NUEVO"]
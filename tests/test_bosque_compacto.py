@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+# Datos al azar con tres clases y valores faltantes en algunas columnas
+def _datos(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    X = rng.normal(size=(filas, 6)).astype(np.float32)
+    y = np.array(["Normal", "Atencion", "Critico"])[(X[:, 0] + X[:, 1] > 0).astype(int) + (X[:, 2] > 1)]
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+@pytest.mark.parametrize("max_depth", [None, 4])
+def test_igual_que_sklearn(max_depth, tmp_path):
+    from bosque_compacto import BosqueCompacto, exportar_bosque
+    X, y = _datos(600)
+    modelo = RandomForestClassifier(n_estimators=15, max_depth=max_depth, random_state=42).fit(X, y)
+    bosque = BosqueCompacto.cargar(exportar_bosque(modelo, str(tmp_path / "modelo.npz")))
+    X_prueba, _ = _datos(700, semilla=1)  # Más de FILAS_POR_BLOQUE filas
+    assert np.array_equal(bosque.predict_proba(X_prueba), modelo.predict_proba(X_prueba))
+    assert np.array_equal(bosque.predict(X_prueba), modelo.predict(X_prueba))
+    # Una sola fila, con y sin faltantes
+    for fila in (X_prueba[:1], np.full((1, 6), np.nan, dtype=np.float32), np.zeros((1, 6), dtype=np.float32)):
+        assert np.array_equal(bosque.predict_proba(fila), modelo.predict_proba(fila))
@@ -0,0 +1,34 @@
+import numpy as np
+
+# Función para saber si una columna está respaldada por un archivo mapeado en memoria
+def _mapeada(serie):
+    arreglo = np.asarray(serie)
+    while arreglo is not None:
+        if isinstance(arreglo, np.memmap):
+            return True
+        arreglo = getattr(arreglo, "base", None)
+    return False
+
+def _ordenado(df):
+    return df.sort_values("Numero Registro", ignore_index=True)
+
+def test_carga_del_cache_y_cola_del_csv(carpeta_datos):
+    from almacen_columnar import asegurar_almacen, leer_dataset
+    from carga_incremental import CargadorIncremental
+    from generar_datos_historicos import backfill_historico
+    backfill_historico("2024-01-01", "2024-02-29", procesos=1, semilla=1)
+    cargador = CargadorIncremental()
+    df = cargador.actualizar()
+    assert _mapeada(df["Hierro (Fe) ppm"])  # Respaldado por el caché .npy
+    assert _ordenado(df).astype(str).equals(_ordenado(leer_dataset()).astype(str))
+
+    # Lo agregado después se lee de la cola del CSV
+    backfill_historico("2024-03-01", "2024-03-10", procesos=1, semilla=2)
+    assert len(cargador.actualizar()) == 350 and cargador.recargas == 1
+    assert cargador.lecturas_cola == 1
+
+    # Con el almacén ya al día, vuelve al caché
+    asegurar_almacen()
+    df = cargador.actualizar()
+    assert cargador.recargas == 2 and len(df) == 350
+    assert _mapeada(df["Hierro (Fe) ppm"])
@@ -0,0 +1,41 @@
+import json
+import os
+import pandas as pd
+
+def test_lectura_no_registra_etiquetas(carpeta_datos):
+    from catalogo import a_claves, etiquetas
+    antes = os.stat("data/catalogo.json").st_mtime_ns
+    df = a_claves(pd.DataFrame({"Equipo": [etiquetas("Equipo")[0], "EQUIPO NUEVO", None]}), registrar=False)
+    assert df["Equipo"].tolist() == [0, -1, -1]
+    assert "EQUIPO NUEVO" not in etiquetas("Equipo")
+    assert os.stat("data/catalogo.json").st_mtime_ns == antes
+
+def test_lectura_ve_etiquetas_de_otro_proceso(carpeta_datos):
+    from catalogo import claves, etiquetas
+    cantidad = len(etiquetas("Equipo"))  # Ya en el caché del proceso
+    with open("data/catalogo.json", encoding="utf-8") as f:
+        catalogo = json.load(f)
+    catalogo["Equipo"].append("EQUIPO NUEVO")  # Lo que haría otro proceso escritor
+    with open("data/catalogo.json", "w", encoding="utf-8") as f:
+        json.dump(catalogo, f)
+    assert claves("Equipo", ["EQUIPO NUEVO"], registrar=False).tolist() == [cantidad]
+
+def test_escritor_registra_etiquetas(carpeta_datos):
+    from catalogo import cargar_catalogo, etiquetas
+    from escritor_datos import EscritorCSV
+    df = pd.DataFrame({"Fecha": [pd.Timestamp("2025-01-01")], "Equipo": ["EQUIPO NUEVO"], "Numero Registro": [1]})
+    with EscritorCSV("data/datos_generados.csv") as escritor:
+        escritor.escribir(df)
+    assert "EQUIPO NUEVO" in etiquetas("Equipo")
+    assert "EQUIPO NUEVO" in cargar_catalogo(recargar=True)["Equipo"]
+
+def test_lote_rechazado_no_registra_etiquetas(carpeta_datos):
+    import pytest
+    from catalogo import cargar_catalogo
+    from escritor_datos import EscritorCSV
+    df = pd.DataFrame({"Fecha": [pd.Timestamp("2025-01-01")], "Equipo": ["EQUIPO NUEVO"], "Numero Registro": [1]})
+    with EscritorCSV("data/datos_generados.csv") as escritor:
+        escritor.escribir(df)
+        with pytest.raises(ValueError):
+            escritor.escribir(df.assign(**{"Equipo": "OTRO EQUIPO", "Hierro (ppm)": 1}))
+    assert "OTRO EQUIPO" not in cargar_catalogo(recargar=True)["Equipo"]
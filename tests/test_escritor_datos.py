@@ -0,0 +1,39 @@
+import pandas as pd
+
+def _lote(registro):
+    return pd.DataFrame({"Fecha": [pd.Timestamp("2025-01-01")], "Numero Registro": [registro]})
+
+def test_dos_escritores_sobre_archivo_nuevo_una_sola_cabecera(carpeta_datos):
+    from escritor_datos import EscritorCSV
+    with EscritorCSV("data/nuevo.csv") as primero, EscritorCSV("data/nuevo.csv") as segundo:
+        primero.escribir(_lote(1))
+        segundo.escribir(_lote(2))
+        primero.escribir(_lote(3))
+    assert pd.read_csv("data/nuevo.csv")["Numero Registro"].tolist() == [1, 2, 3]
+
+def test_no_toca_el_archivo_hasta_el_primer_lote(carpeta_datos):
+    from escritor_datos import EscritorCSV
+    with open("data/nuevo.csv", "w", encoding="utf-8") as f:
+        f.write("Fecha,Numero Registro\n1,1\n2,")  # Otro proceso a mitad de una línea
+    escritor = EscritorCSV("data/nuevo.csv")
+    with open("data/nuevo.csv", "a", encoding="utf-8") as f:
+        f.write("2\n")  # ... que la termina
+    escritor.escribir(_lote(3))
+    escritor.cerrar()
+    assert pd.read_csv("data/nuevo.csv")["Numero Registro"].tolist() == [1, 2, 3]
+
+def test_backfill_sobre_archivo_nuevo(carpeta_datos):
+    from generar_datos_historicos import backfill_historico
+    assert backfill_historico("2024-01-01", "2024-01-10", dias_por_tramo=4, procesos=1, semilla=1) == 50
+    df = pd.read_csv("data/datos_generados.csv")
+    assert len(df) == 50 and df["Numero Registro"].is_unique
+
+def test_backfill_de_otro_csv_no_toca_el_almacen_principal(carpeta_datos):
+    import os
+    from generar_datos_historicos import backfill_historico
+    from almacen_columnar import leer_dataset
+    backfill_historico("2024-01-01", "2024-01-04", procesos=1, semilla=1)
+    os.makedirs("data/otro")
+    backfill_historico("2024-02-01", "2024-02-02", procesos=1, semilla=2, archivo="data/otro/datos.csv")
+    assert len(leer_dataset(asegurar=False)) == 20
+    assert len(leer_dataset(raiz="data/otro/dataset", asegurar=False)) == 10
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# Informe de laboratorio en CSV con las primeras "n" de 30 muestras, sin las columnas calculables
+def _informe(ruta, n):
+    from motor_generacion import crear_generador, generar_lote
+    from importar_laboratorio import CALCULABLES
+    fechas = pd.Timestamp("2025-03-01") + pd.to_timedelta(np.arange(30), unit="h")
+    lote = generar_lote(30, crear_generador(3), fechas).head(n)
+    lote.drop(columns=CALCULABLES).to_csv(ruta, index=False)
+    return ruta
+
+def test_reimportar_no_agrega_filas_ni_consume_numeros(carpeta_datos):
+    from importar_laboratorio import importar
+    from secuencias import leer_estado
+    informe = _informe("informe.csv", 30)
+    assert importar(informe) == (30, 0)
+    estado = leer_estado()
+    datos = pd.read_csv("data/datos_generados.csv")
+    assert datos["Numero Registro"].tolist() == list(range(1, 31))
+
+    assert importar(informe) == (0, 0)
+    assert len(pd.read_csv("data/datos_generados.csv")) == 30
+    assert leer_estado() == estado
+
+def test_informe_con_muestras_nuevas_y_repetidas(carpeta_datos):
+    from importar_laboratorio import importar
+    importar(_informe("informe.csv", 10))
+    # El informe siguiente repite las 10 anteriores y trae 5 nuevas
+    assert importar(_informe("informe.csv", 15)) == (5, 0)
+    datos = pd.read_csv("data/datos_generados.csv")
+    assert datos["Numero Registro"].tolist() == list(range(1, 16))
+    assert not datos["Numero Muestra"].duplicated().any()
+
+def test_informe_sin_algunos_analisis(carpeta_datos):
+    from importar_laboratorio import importar, mapear_columnas
+    informe = pd.read_csv(_informe("informe.csv", 10)).drop(columns=["Glicol %", "Diesel %", "Numero Serie Equipo"])
+    informe.loc[:4, "TAN mg KOH/g"] = np.nan
+    informe.to_csv("informe.csv", index=False)
+    assert importar("informe.csv") == (10, 0)
+    datos = pd.read_csv("data/datos_generados.csv")
+    assert datos[["Glicol %", "Diesel %", "Numero Serie Equipo"]].isna().all().all()
+    assert datos["TAN mg KOH/g"].isna().sum() == 5
+
+    # Sin una columna de la clave el informe no se importa
+    with pytest.raises(ValueError, match="Equipo"):
+        mapear_columnas(informe.drop(columns=["Equipo"]).columns)
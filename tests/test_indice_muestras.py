@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# Lote de "n" muestras con fechas desde "inicio", una por hora
+def _lote(n, inicio, registro_inicial):
+    from motor_generacion import crear_generador, generar_lote
+    fechas = pd.Timestamp(inicio) + pd.to_timedelta(np.arange(n), unit="h")
+    return generar_lote(n, crear_generador(7), fechas, registro_inicial, registro_inicial)
+
+def test_descarta_repetidas_del_archivo_y_del_csv(carpeta_datos):
+    from archivo_historico import archivar
+    from escritor_datos import guardar_datos
+    from indice_muestras import IndiceMuestras
+    hoy = pd.Timestamp.today().normalize()
+    guardar_datos(pd.concat([_lote(50, hoy - pd.Timedelta(days=400), 0), _lote(50, hoy, 50)]))
+    assert archivar(dias=30) == 50
+
+    # Una reentrega con números de los dos niveles y de nuevo repetidos dentro del lote
+    reenvio = pd.concat([_lote(10, hoy, 20), _lote(10, hoy, 90), _lote(5, hoy, 100), _lote(5, hoy, 100)])
+    nuevas = IndiceMuestras().filtrar(reenvio)
+    assert nuevas["Numero Registro"].tolist() == list(range(101, 106))
+
+    # Reconstruido desde cero da lo mismo
+    indice = IndiceMuestras(raiz="data/otro_indice")
+    assert len(indice) == 100
+    assert indice.contiene([1, 50, 51, 100, 101]).tolist() == [True, True, True, True, False]
+
+def test_escribir_nuevos_es_idempotente(carpeta_datos):
+    from escritor_datos import guardar_datos, leer_cabecera
+    from indice_muestras import IndiceMuestras
+    hoy = pd.Timestamp.today().normalize()
+    lote = _lote(20, hoy, 0)
+    assert guardar_datos(lote, indice=IndiceMuestras()) == 20
+    assert guardar_datos(lote, indice=IndiceMuestras()) == 0
+    assert leer_cabecera("data/datos_generados.csv") is not None
+    assert len(pd.read_csv("data/datos_generados.csv")) == 20
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+from iso4406 import COLUMNA_TEXTO, COLUMNAS_ISO, LIMITES_ISO4406, codigo_iso, codigos_iso, con_codigo_iso
+
+def test_limites_de_la_tabla():
+    # Cada límite pertenece a su rango (LIMITES[r-1] < conteo <= LIMITES[r]) y el siguiente valor al próximo
+    rangos = np.arange(len(LIMITES_ISO4406))
+    assert codigo_iso(LIMITES_ISO4406).tolist() == rangos.tolist()
+    assert codigo_iso(np.nextafter(LIMITES_ISO4406, np.inf)).tolist() == (rangos + 1).tolist()
+
+def test_extremos():
+    assert codigo_iso([0, 0.01, 0.0100001]).tolist() == [0, 0, 1]
+    assert codigo_iso([2_500_000, 2_500_001, 10**9]).tolist() == [28, 29, 29]
+    assert codigo_iso([5, 5.1, 80, 81, 1_300, 1_301]).tolist() == [9, 10, 13, 14, 17, 18]
+    assert codigo_iso([]).dtype == np.int8
+
+def test_tres_columnas_y_texto():
+    df = pd.DataFrame({"N de part >4µm": [2_000, 3_000_000], "N° de part >6µm": [600, 5], "N° de part>14µm": [50, 0]})
+    df = df.assign(**codigos_iso(df))
+    assert df[COLUMNAS_ISO].to_numpy().tolist() == [[18, 16, 13], [29, 9, 0]]
+    assert con_codigo_iso(df)[COLUMNA_TEXTO].tolist() == ["18/16/13", ">28/9/0"]
@@ -0,0 +1,51 @@
+import multiprocessing as mp
+from secuencias import AsignadorSecuencias, leer_estado
+
+# Proceso que pide "pedidos" tramos de "n" números y devuelve los registros entregados
+def _pedir(archivo, tamano_bloque, pedidos, n, salida):
+    asignador = AsignadorSecuencias(archivo, tamano_bloque)
+    entregados = []
+    for _ in range(pedidos):
+        _, registro = asignador.reservar(n)
+        entregados.extend(range(registro + 1, registro + n + 1))
+    asignador.liberar()
+    salida.put(entregados)
+
+def test_procesos_concurrentes_no_repiten_numeros(tmp_path):
+    archivo = str(tmp_path / "estado_generador.txt")
+    salida = mp.Queue()
+    procesos = [mp.Process(target=_pedir, args=(archivo, 100, 30, 7, salida)) for _ in range(4)]
+    for p in procesos:
+        p.start()
+    entregados = [numero for _ in procesos for numero in salida.get(timeout=60)]
+    for p in procesos:
+        p.join()
+    assert len(entregados) == 4 * 30 * 7
+    assert len(set(entregados)) == len(entregados)
+    muestra, registro = leer_estado(archivo)
+    assert muestra == registro >= max(entregados)
+
+def test_liberar_devuelve_el_resto_del_bloque(tmp_path):
+    archivo = str(tmp_path / "estado_generador.txt")
+    asignador = AsignadorSecuencias(archivo, 1000)
+    assert asignador.reservar(50) == (0, 0)
+    assert leer_estado(archivo) == (1000, 1000)
+    assert asignador.liberar() == 950
+    assert leer_estado(archivo) == (50, 50)
+    assert AsignadorSecuencias(archivo, 1000).reservar(10) == (50, 50)
+
+def test_liberar_no_pisa_un_bloque_posterior(tmp_path):
+    archivo = str(tmp_path / "estado_generador.txt")
+    primero, segundo = AsignadorSecuencias(archivo, 1000), AsignadorSecuencias(archivo, 1000)
+    primero.reservar(50)
+    assert segundo.reservar(50) == (1000, 1000)
+    assert primero.liberar() == 0  # Queda como hueco
+    assert leer_estado(archivo) == (2000, 2000)
+    assert segundo.liberar() == 950
+    assert leer_estado(archivo) == (1050, 1050)
+
+def test_pedido_grande_se_reserva_exacto(tmp_path):
+    archivo = str(tmp_path / "estado_generador.txt")
+    asignador = AsignadorSecuencias(archivo, 1000)
+    assert asignador.reservar(5000) == (0, 0)
+    assert leer_estado(archivo) == (5000, 5000)